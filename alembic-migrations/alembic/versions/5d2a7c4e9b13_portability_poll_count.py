@@ -0,0 +1,30 @@
+"""portability_requests poll_count
+
+Revision ID: 5d2a7c4e9b13
+Revises: 0b1e32600ebd
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a7c4e9b13'
+down_revision: Union[str, Sequence[str], None] = '0b1e32600ebd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('portability_requests',
+                  sa.Column('poll_count', sa.Integer(), server_default=sa.text('0'), nullable=False,
+                            comment='Consecutive NC status checks without status change'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('portability_requests', 'poll_count')
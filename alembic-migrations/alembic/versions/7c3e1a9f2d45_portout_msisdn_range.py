@@ -0,0 +1,80 @@
+"""portout_msisdn_range
+
+Revision ID: 7c3e1a9f2d45
+Revises: 5d2a7c4e9b13
+Create Date: 2026-10-19 11:04:27.530916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e1a9f2d45'
+down_revision: Union[str, Sequence[str], None] = '5d2a7c4e9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Existing portout_request rows: one row per msisdn_ranges object and per msisdn_single entry
+BACKFILL_RANGES = """
+    INSERT INTO portout_msisdn_range (portout_request_id, reference_code, range_start, range_end, span)
+    SELECT p.id, p.reference_code,
+           LEAST(CAST(r.initial_value AS SIGNED), CAST(r.final_value AS SIGNED)),
+           GREATEST(CAST(r.initial_value AS SIGNED), CAST(r.final_value AS SIGNED)),
+           GREATEST(CAST(r.initial_value AS SIGNED), CAST(r.final_value AS SIGNED))
+             - LEAST(CAST(r.initial_value AS SIGNED), CAST(r.final_value AS SIGNED))
+    FROM portout_request p,
+         JSON_TABLE(p.msisdn_ranges, '$[*]' COLUMNS (
+             initial_value VARCHAR(20) PATH '$.initial_value',
+             final_value VARCHAR(20) PATH '$.final_value'
+         )) r
+    WHERE p.msisdn_ranges IS NOT NULL
+      AND r.initial_value REGEXP '^[0-9]+$' AND r.final_value REGEXP '^[0-9]+$'
+"""
+
+BACKFILL_SINGLES = """
+    INSERT INTO portout_msisdn_range (portout_request_id, reference_code, range_start, range_end, span)
+    SELECT p.id, p.reference_code, CAST(s.msisdn AS SIGNED), CAST(s.msisdn AS SIGNED), 0
+    FROM portout_request p,
+         JSON_TABLE(p.msisdn_single, '$[*]' COLUMNS (msisdn VARCHAR(20) PATH '$')) s
+    WHERE p.msisdn_single IS NOT NULL AND s.msisdn REGEXP '^[0-9]+$'
+"""
+
+BACKFILL_LEGACY_MSISDN = """
+    INSERT INTO portout_msisdn_range (portout_request_id, reference_code, range_start, range_end, span)
+    SELECT p.id, p.reference_code, CAST(p.MSISDN AS SIGNED), CAST(p.MSISDN AS SIGNED), 0
+    FROM portout_request p
+    WHERE p.msisdn_single IS NULL AND p.MSISDN REGEXP '^[0-9]+$'
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('portout_msisdn_range',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('portout_request_id', sa.BigInteger(), nullable=False),
+    sa.Column('reference_code', sa.String(length=50), nullable=True),
+    sa.Column('range_start', sa.BigInteger(), nullable=False, comment='First MSISDN of the range as a number'),
+    sa.Column('range_end', sa.BigInteger(), nullable=False, comment='Last MSISDN of the range, equal to range_start for single MSISDNs'),
+    sa.Column('span', sa.BigInteger(), server_default=sa.text('0'), nullable=False, comment='range_end - range_start'),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.ForeignKeyConstraint(['portout_request_id'], ['portout_request.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_charset='utf8mb4',
+    mysql_engine='InnoDB'
+    )
+    op.create_index('idx_range_start_end', 'portout_msisdn_range', ['range_start', 'range_end'], unique=False)
+    op.create_index('idx_range_span', 'portout_msisdn_range', ['span'], unique=False)
+    op.create_index('idx_range_portout_request', 'portout_msisdn_range', ['portout_request_id'], unique=False)
+
+    op.execute(BACKFILL_RANGES)
+    op.execute(BACKFILL_SINGLES)
+    op.execute(BACKFILL_LEGACY_MSISDN)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('portout_msisdn_range')
@@ -0,0 +1,48 @@
+"""bss_outbox
+
+Revision ID: 9a4f6b2c8e17
+Revises: 7c3e1a9f2d45
+Create Date: 2026-10-19 14:22:09.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6b2c8e17'
+down_revision: Union[str, Sequence[str], None] = '7c3e1a9f2d45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('bss_outbox',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('endpoint', sa.String(length=20), nullable=False, comment='port_in, port_out or return'),
+    sa.Column('ordering_key', sa.String(length=64), nullable=False, comment='Callbacks with the same key are delivered in id order'),
+    sa.Column('payload', sa.JSON(), nullable=False, comment='Webhook JSON body'),
+    sa.Column('source_id', sa.BigInteger(), nullable=True, comment='portability_requests.id / portout_request.id updated on delivery'),
+    sa.Column('status_bss', sa.String(length=50), nullable=True, comment='status_bss written to the source row on delivery'),
+    sa.Column('status', sa.String(length=20), server_default=sa.text("'PENDING'"), nullable=False, comment='PENDING, DELIVERED or FAILED'),
+    sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('next_attempt_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False, comment='Due time, pushed forward while claimed'),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('delivered_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_charset='utf8mb4',
+    mysql_engine='InnoDB'
+    )
+    op.create_index('idx_outbox_due', 'bss_outbox', ['status', 'next_attempt_at'], unique=False)
+    op.create_index('idx_outbox_ordering', 'bss_outbox', ['endpoint', 'ordering_key', 'status'], unique=False)
+    op.create_index('idx_outbox_source', 'bss_outbox', ['endpoint', 'status', 'source_id'], unique=False)
+    op.create_index('idx_outbox_delivered', 'bss_outbox', ['status', 'delivered_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('bss_outbox')
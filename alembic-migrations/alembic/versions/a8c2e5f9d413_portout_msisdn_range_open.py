@@ -0,0 +1,54 @@
+"""portout_msisdn_range closed and port_window_date
+
+Revision ID: a8c2e5f9d413
+Revises: f1b7d4a9c062
+Create Date: 2026-10-19 23:12:45.806113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c2e5f9d413'
+down_revision: Union[str, Sequence[str], None] = 'f1b7d4a9c062'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Existing ranges: port window of their port-out, closed when rejected or past the window
+BACKFILL_OPEN = """
+    UPDATE portout_msisdn_range r
+    JOIN portout_request p ON p.id = r.portout_request_id
+    SET r.port_window_date = p.port_window_date,
+        r.closed = (COALESCE(p.confirm_reject, 0) = 2 OR p.port_window_date < NOW())
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('portout_msisdn_range',
+                  sa.Column('port_window_date', sa.DateTime(), nullable=True,
+                            comment='Port window of the port-out; the range is closed once it has passed'))
+    op.add_column('portout_msisdn_range',
+                  sa.Column('closed', sa.Boolean(), server_default=sa.text('0'), nullable=False,
+                            comment='1 once rejected or past the port window'))
+    op.execute(BACKFILL_OPEN)
+    op.drop_index('idx_range_start_end', table_name='portout_msisdn_range')
+    op.drop_index('idx_range_span', table_name='portout_msisdn_range')
+    op.create_index('idx_range_open_start_end', 'portout_msisdn_range', ['closed', 'range_start', 'range_end'], unique=False)
+    op.create_index('idx_range_open_span', 'portout_msisdn_range', ['closed', 'span'], unique=False)
+    op.create_index('idx_range_window', 'portout_msisdn_range', ['closed', 'port_window_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_range_window', table_name='portout_msisdn_range')
+    op.drop_index('idx_range_open_span', table_name='portout_msisdn_range')
+    op.drop_index('idx_range_open_start_end', table_name='portout_msisdn_range')
+    op.create_index('idx_range_span', 'portout_msisdn_range', ['span'], unique=False)
+    op.create_index('idx_range_start_end', 'portout_msisdn_range', ['range_start', 'range_end'], unique=False)
+    op.drop_column('portout_msisdn_range', 'closed')
+    op.drop_column('portout_msisdn_range', 'port_window_date')
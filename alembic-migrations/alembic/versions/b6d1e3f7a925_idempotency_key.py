@@ -0,0 +1,45 @@
+"""idempotency_key
+
+Revision ID: b6d1e3f7a925
+Revises: 9a4f6b2c8e17
+Create Date: 2026-10-19 16:05:41.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1e3f7a925'
+down_revision: Union[str, Sequence[str], None] = '9a4f6b2c8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('idempotency_key',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('endpoint', sa.String(length=64), nullable=False, comment='Route relative to API_PREFIX, e.g. /port-in'),
+    sa.Column('idempotency_key', sa.String(length=128), nullable=False, comment='Idempotency-Key header sent by BSS'),
+    sa.Column('request_hash', sa.String(length=64), nullable=False, comment='SHA-256 of the request body'),
+    sa.Column('status', sa.String(length=20), server_default=sa.text("'IN_PROGRESS'"), nullable=False, comment='IN_PROGRESS or COMPLETED'),
+    sa.Column('response_status', sa.SmallInteger(), nullable=True, comment='HTTP status replayed to duplicates'),
+    sa.Column('response_body', sa.Text(), nullable=True, comment='Response body replayed to duplicates'),
+    sa.Column('media_type', sa.String(length=100), nullable=True),
+    sa.Column('locked_until', sa.TIMESTAMP(), nullable=True, comment='An IN_PROGRESS claim past this time is taken over'),
+    sa.Column('expires_at', sa.TIMESTAMP(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_charset='utf8mb4',
+    mysql_engine='InnoDB'
+    )
+    op.create_index('uq_idempotency_endpoint_key', 'idempotency_key', ['endpoint', 'idempotency_key'], unique=True)
+    op.create_index('idx_idempotency_expires', 'idempotency_key', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('idempotency_key')
@@ -0,0 +1,44 @@
+"""port_in_batch
+
+Revision ID: d3c8f1a6b254
+Revises: b6d1e3f7a925
+Create Date: 2026-10-19 18:42:07.904516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3c8f1a6b254'
+down_revision: Union[str, Sequence[str], None] = 'b6d1e3f7a925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('port_in_batch',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default=sa.text("'ACCEPTED'"), nullable=False, comment='ACCEPTED or DISPATCHED'),
+    sa.Column('dispatched_at', sa.TIMESTAMP(), nullable=True, comment='When the paced NC submissions were queued'),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    mysql_charset='utf8mb4',
+    mysql_engine='InnoDB'
+    )
+    op.create_index('idx_port_in_batch_status', 'port_in_batch', ['status', 'created_at'], unique=False)
+    op.add_column('portability_requests',
+                  sa.Column('batch_id', sa.BigInteger(), nullable=True,
+                            comment='port_in_batch.id of requests submitted in bulk'))
+    op.create_index('idx_batch_id', 'portability_requests', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_batch_id', table_name='portability_requests')
+    op.drop_column('portability_requests', 'batch_id')
+    op.drop_table('port_in_batch')
@@ -0,0 +1,28 @@
+"""return_requests scheduled_at index
+
+Revision ID: e5a9c2d7f318
+Revises: d3c8f1a6b254
+Create Date: 2026-10-19 21:05:33.417920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c2d7f318'
+down_revision: Union[str, Sequence[str], None] = 'd3c8f1a6b254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_return_scheduled_status', 'return_requests', ['scheduled_at', 'status_nc'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_return_scheduled_status', table_name='return_requests')
@@ -0,0 +1,30 @@
+"""port_in_batch queued_through_id
+
+Revision ID: f1b7d4a9c062
+Revises: e5a9c2d7f318
+Create Date: 2026-10-19 22:31:18.552047
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d4a9c062'
+down_revision: Union[str, Sequence[str], None] = 'e5a9c2d7f318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('port_in_batch',
+                  sa.Column('queued_through_id', sa.BigInteger(), server_default=sa.text('0'), nullable=False,
+                            comment='Highest portability_requests.id queued for NC submission'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('port_in_batch', 'queued_through_id')
@@ -73,6 +73,79 @@ class PortoutRequest(Base):
     # Relationship
     portout_metadata = relationship("PortoutMetadata", back_populates="requests")
 
+class PortoutMsisdnRange(Base):
+    __tablename__ = 'portout_msisdn_range'
+    __table_args__ = (
+        Index('idx_range_open_start_end', 'closed', 'range_start', 'range_end'),  # Overlap lookups of open ranges
+        Index('idx_range_open_span', 'closed', 'span'),  # MAX(span) of open ranges bounds the range_start scan
+        Index('idx_range_window', 'closed', 'port_window_date'),  # Closing ranges past their port window
+        Index('idx_range_portout_request', 'portout_request_id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    portout_request_id = Column(BigInteger, ForeignKey('portout_request.id', ondelete='CASCADE'), nullable=False)
+    reference_code = Column(String(50))
+    range_start = Column(BigInteger, nullable=False, comment='First MSISDN of the range as a number')
+    range_end = Column(BigInteger, nullable=False, comment='Last MSISDN of the range, equal to range_start for single MSISDNs')
+    span = Column(BigInteger, nullable=False, server_default=text('0'), comment='range_end - range_start')
+    port_window_date = Column(DateTime, comment='Port window of the port-out; the range is closed once it has passed')
+    closed = Column(Boolean, nullable=False, server_default=text('0'), comment='1 once rejected or past the port window')
+    created_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
+
+class BssOutbox(Base):
+    __tablename__ = 'bss_outbox'
+    __table_args__ = (
+        Index('idx_outbox_due', 'status', 'next_attempt_at'),  # Dispatcher claim
+        Index('idx_outbox_ordering', 'endpoint', 'ordering_key', 'status'),  # Per-key ordering
+        Index('idx_outbox_source', 'endpoint', 'status', 'source_id'),  # Port-out dedupe
+        Index('idx_outbox_delivered', 'status', 'delivered_at'),  # Purge
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    endpoint = Column(String(20), nullable=False, comment='port_in, port_out or return')
+    ordering_key = Column(String(64), nullable=False, comment='Callbacks with the same key are delivered in id order')
+    payload = Column(JSON, nullable=False, comment='Webhook JSON body')
+    source_id = Column(BigInteger, comment='portability_requests.id / portout_request.id updated on delivery')
+    status_bss = Column(String(50), comment='status_bss written to the source row on delivery')
+    status = Column(String(20), nullable=False, server_default=text("'PENDING'"), comment='PENDING, DELIVERED or FAILED')
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    next_attempt_at = Column(TIMESTAMP, nullable=False, server_default=text('CURRENT_TIMESTAMP'), comment='Due time, pushed forward while claimed')
+    last_error = Column(String(500))
+    delivered_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        Index('uq_idempotency_endpoint_key', 'endpoint', 'idempotency_key', unique=True),  # One claim per key
+        Index('idx_idempotency_expires', 'expires_at'),  # Purge
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    endpoint = Column(String(64), nullable=False, comment='Route relative to API_PREFIX, e.g. /port-in')
+    idempotency_key = Column(String(128), nullable=False, comment='Idempotency-Key header sent by BSS')
+    request_hash = Column(String(64), nullable=False, comment='SHA-256 of the request body')
+    status = Column(String(20), nullable=False, server_default=text("'IN_PROGRESS'"), comment='IN_PROGRESS or COMPLETED')
+    response_status = Column(SmallInteger, comment='HTTP status replayed to duplicates')
+    response_body = Column(Text, comment='Response body replayed to duplicates')
+    media_type = Column(String(100))
+    locked_until = Column(TIMESTAMP, nullable=True, comment='An IN_PROGRESS claim past this time is taken over')
+    expires_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
+
+class PortInBatch(Base):
+    __tablename__ = 'port_in_batch'
+    __table_args__ = (
+        Index('idx_port_in_batch_status', 'status', 'created_at'),  # Sweep of undispatched batches
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    item_count = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, server_default=text("'ACCEPTED'"), comment='ACCEPTED or DISPATCHED')
+    queued_through_id = Column(BigInteger, nullable=False, server_default=text('0'), comment='Highest portability_requests.id queued for NC submission')
+    dispatched_at = Column(TIMESTAMP, nullable=True, comment='When the paced NC submissions were queued')
+    created_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
+
 class PortabilityRequests(Base):
     __tablename__ = 'portability_requests'
     __table_args__ = (
@@ -86,6 +159,7 @@ class PortabilityRequests(Base):
         Index('idx_scheduled_status', 'scheduled_at', 'status_nc'),
         Index('idx_completion', 'completed_at', 'country_code'),
         Index('idx_document', 'document_type', 'document_number'),
+        Index('idx_batch_id', 'batch_id'),
         {'comment': 'Mobile number portability requests (IN/OUT/CANCEL/MULTISIM)'}
     )
     
@@ -104,6 +178,7 @@ class PortabilityRequests(Base):
     reject_code = Column(String(10), server_default=text("''"), comment='reject status eg RECH_BNUME RECH_PERDI RECH_IDENT RECH_ICCID')
     description = Column(String(1000))
     retry_count = Column(Integer, server_default=text('0'))
+    poll_count = Column(Integer, nullable=False, server_default=text('0'), comment='Consecutive NC status checks without status change')
     last_error = Column(Text, comment='Last error message')
     error_description = Column(String(255))
     msisdn = Column(String(15), nullable=False, server_default=text("''"), comment='Phone number')
@@ -132,11 +207,13 @@ class PortabilityRequests(Base):
     updated_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP'))
     is_legal_entity = Column(Boolean, nullable=False, server_default=text('0'), comment='Flag indicating if this is a legal entity (1) or individual (0)')
     company_name = Column(String(255), comment='Company name for legal entities')
+    batch_id = Column(BigInteger, nullable=True, comment='port_in_batch.id of requests submitted in bulk')
 
 class ReturnRequests(Base):
     __tablename__ = 'return_requests'
     __table_args__ = (
         Index('idx_return_status_scheduled', 'status_nc', 'scheduled_at'),  # For job scheduling
+        Index('idx_return_scheduled_status', 'scheduled_at', 'status_nc'),  # Send slot backlog per window
         Index('idx_return_msisdn', 'msisdn'),  # For customer lookups
         Index('idx_return_reference_code', 'reference_code'),  # For NC reference lookups
         {'comment': 'Mobile number Return requests'}
@@ -0,0 +1,203 @@
+# api/core/admission.py
+"""
+Admission control for the BSS-facing API.
+
+When NC or MySQL slows down, every request holds its worker slot longer, requests pile up
+in uvicorn until BSS times out and retries, and the retries add to the pile. The
+controller caps the requests processed at once per worker and answers the excess
+immediately instead:
+
+- ADMISSION_MAX_IN_FLIGHT requests are processed at once; new submissions (POSTs that
+  start or change a portability process) may only use ADMISSION_WRITE_SHARE of them, so
+  status/read endpoints always have capacity left and are served first from the queue
+- ADMISSION_ROUTE_LIMITS caps single routes (e.g. /port-in, which waits on NC)
+- a request that cannot be admitted waits in a bounded queue for at most its queue-time
+  budget (ADMISSION_READ_QUEUE_MS / ADMISSION_WRITE_QUEUE_MS); past that it gets 503, or
+  429 when only its route limit was full, with Retry-After
+
+State is per worker process and event loop, so no locking is needed.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from config import settings
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUED, ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED
+
+READ = "read"
+WRITE = "write"
+PRIORITIES = (READ, WRITE)  # wake-up order
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _paths(value: str) -> set:
+    return {path.strip() for path in value.split(",") if path.strip()}
+
+
+def _route_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        path, _, limit = item.partition("=")
+        if path.strip() and limit.strip():
+            limits[path.strip()] = int(limit)
+    return limits
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class AdmissionController:
+    """Priority admission with per-route limits and a queue-time budget"""
+
+    def __init__(self, max_in_flight: int, write_share: float, max_queue: int,
+                 queue_budget: Dict[str, float], route_limits: Optional[Dict[str, int]] = None):
+        self.max_in_flight = max(1, max_in_flight)
+        self.write_limit = max(1, int(self.max_in_flight * write_share))
+        self.max_queue = max_queue
+        self.queue_budget = queue_budget
+        self.route_limits = route_limits or {}
+        self.in_flight = {READ: 0, WRITE: 0}
+        self.route_in_flight: Dict[str, int] = {}  # limited routes only, removed when idle
+        self.waiters: Dict[str, Deque[Tuple[asyncio.Future, str]]] = {READ: deque(), WRITE: deque()}
+
+    def _capacity_free(self, priority: str) -> bool:
+        total = self.in_flight[READ] + self.in_flight[WRITE]
+        if total >= self.max_in_flight:
+            return False
+        return priority == READ or total < self.write_limit
+
+    def _route_free(self, route: str) -> bool:
+        limit = self.route_limits.get(route)
+        return not limit or self.route_in_flight.get(route, 0) < limit
+
+    def _take(self, priority: str, route: str) -> None:
+        self.in_flight[priority] += 1
+        if route in self.route_limits:
+            self.route_in_flight[route] = self.route_in_flight.get(route, 0) + 1
+        ADMISSION_IN_FLIGHT.labels(priority=priority).inc()
+
+    def _queued(self) -> int:
+        return len(self.waiters[READ]) + len(self.waiters[WRITE])
+
+    async def acquire(self, priority: str, route: str) -> None:
+        # Queued requests of the same or higher priority go first
+        ahead = self.waiters[READ] or (priority == WRITE and self.waiters[WRITE])
+        if not ahead and self._capacity_free(priority) and self._route_free(route):
+            self._take(priority, route)
+            return
+
+        if self._queued() >= self.max_queue:
+            ADMISSION_REJECTED.labels(priority=priority, reason="queue_full").inc()
+            raise AdmissionRejected(503, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, route)
+        self.waiters[priority].append(entry)
+        self._wake()  # only waiters blocked by a route limit may be ahead
+        ADMISSION_QUEUED.labels(priority=priority).inc()
+        started = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=self.queue_budget[priority])
+        except asyncio.CancelledError:
+            # Client went away: give back a slot handed over meanwhile
+            if future.done():
+                self.release(priority, route)
+            raise
+        finally:
+            ADMISSION_QUEUED.labels(priority=priority).dec()
+            ADMISSION_QUEUE_WAIT.labels(priority=priority).observe(time.monotonic() - started)
+            if not future.done():
+                self.waiters[priority].remove(entry)
+                future.cancel()
+        if future.cancelled():
+            route_limited = self._capacity_free(priority) and not self._route_free(route)
+            reason = "route_limit" if route_limited else "queue_timeout"
+            ADMISSION_REJECTED.labels(priority=priority, reason=reason).inc()
+            raise AdmissionRejected(429 if route_limited else 503, reason)
+
+    def release(self, priority: str, route: str) -> None:
+        self.in_flight[priority] -= 1
+        if route in self.route_limits:
+            remaining = self.route_in_flight[route] - 1
+            if remaining:
+                self.route_in_flight[route] = remaining
+            else:
+                del self.route_in_flight[route]
+        ADMISSION_IN_FLIGHT.labels(priority=priority).dec()
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to waiters, reads first; a route-limited waiter does not block others"""
+        for priority in PRIORITIES:
+            waiters = self.waiters[priority]
+            for entry in list(waiters):
+                if not self._capacity_free(priority):
+                    break
+                future, route = entry
+                if future.done() or not self._route_free(route):
+                    continue
+                waiters.remove(entry)
+                self._take(priority, route)
+                future.set_result(True)
+
+
+_controller: Optional[AdmissionController] = None
+_read_paths = _paths(settings.ADMISSION_READ_PATHS)
+_exempt_paths = _paths(settings.ADMISSION_EXEMPT_PATHS)
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            write_share=settings.ADMISSION_WRITE_SHARE,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            queue_budget={READ: settings.ADMISSION_READ_QUEUE_MS / 1000, WRITE: settings.ADMISSION_WRITE_QUEUE_MS / 1000},
+            route_limits=_route_limits(settings.ADMISSION_ROUTE_LIMITS),
+        )
+    return _controller
+
+
+def classify(request: Request) -> Tuple[Optional[str], str]:
+    """(priority or None when exempt, route path relative to API_PREFIX)"""
+    path = request.url.path
+    route = (path[len(settings.API_PREFIX):] or "/") if path.startswith(settings.API_PREFIX) else path
+    if path in _exempt_paths or route in _exempt_paths:
+        return None, route
+    if request.method in READ_METHODS or route in _read_paths:
+        return READ, route
+    return WRITE, route
+
+
+async def admission_middleware(request: Request, call_next):
+    """ admission control middleware """
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        return await call_next(request)
+    priority, route = classify(request)
+    if priority is None:
+        return await call_next(request)
+
+    controller = get_admission_controller()
+    try:
+        await controller.acquire(priority, route)
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": "Service overloaded, retry later" if e.status_code == 503 else "Too many concurrent requests for this operation, retry later",
+                     "reason": e.reason},
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        return await call_next(request)
+    finally:
+        controller.release(priority, route)
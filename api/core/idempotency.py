@@ -0,0 +1,151 @@
+# api/core/idempotency.py
+"""
+Idempotency-Key support for the BSS POST endpoints in IDEMPOTENCY_PATHS (services/idempotency.py).
+
+- no Idempotency-Key header, or credentials that fail Basic Auth: processed as before
+- first request with a key: processed, then its response stored (4xx included, so a
+  rejected request is not re-submitted) unless it is a 5xx, 401/403 or 429, in which case the
+  key is released and a retry runs again
+- same key and body again: the stored response is replayed (Idempotent-Replayed: true)
+  without a new DB row or NC submission
+- same key while the first request is still running: waits up to IDEMPOTENCY_WAIT_SECONDS
+  for its response, polling Redis only, then 409 with Retry-After; the first request
+  renews its claim every IDEMPOTENCY_LOCK_SECONDS / 3 so a slow NC does not let it lapse
+- same key with a different body: 422
+"""
+import asyncio
+import time
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from services import idempotency
+from services.auth import is_basic_auth_valid
+from services.logger import logger
+from .metrics import IDEMPOTENCY_REQUESTS
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 128
+
+# Responses that say nothing about the request itself are not stored
+_NOT_STORED = {401, 403, 429}
+
+_paths = {path.strip() for path in settings.IDEMPOTENCY_PATHS.split(",") if path.strip()}
+
+
+def _route(request: Request) -> str:
+    path = request.url.path
+    return (path[len(settings.API_PREFIX):] or "/") if path.startswith(settings.API_PREFIX) else path
+
+
+def _replay(record: dict) -> Response:
+    return Response(
+        content=record["body"],
+        status_code=record["status_code"],
+        media_type=record["media_type"],
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def idempotency_middleware(request: Request, call_next):
+    """ idempotency key middleware """
+    key = request.headers.get(HEADER)
+    if not settings.IDEMPOTENCY_ENABLED or not key or request.method != "POST":
+        return await call_next(request)
+    route = _route(request)
+    if route not in _paths or not is_basic_auth_valid(request.headers.get("authorization")):
+        return await call_next(request)
+    if len(key) > MAX_KEY_LENGTH:
+        return JSONResponse(status_code=400, content={"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"})
+
+    request_hash = idempotency.request_fingerprint(await request.body())
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    ask_mysql = True
+    while True:
+        if ask_mysql:
+            try:
+                state, record = await run_in_threadpool(idempotency.claim, route, key, request_hash)
+            except Exception as e:
+                # Without the key store, behave as before rather than refuse BSS
+                logger.error("Idempotency claim failed for %s %s, processing without it: %s", route, key, str(e))
+                IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="unavailable").inc()
+                return await call_next(request)
+        if state != idempotency.IN_PROGRESS:
+            break
+        if time.monotonic() >= deadline:
+            if not ask_mysql:
+                # Last word from MySQL: the owner may have died without Redis noticing
+                ask_mysql = True
+                continue
+            IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="in_progress").inc()
+            return JSONResponse(
+                status_code=409,
+                content={"detail": f"A request with this {HEADER} is still being processed, retry later"},
+                headers={"Retry-After": str(settings.IDEMPOTENCY_RETRY_AFTER_SECONDS)},
+            )
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL_MS / 1000)
+        waited = await run_in_threadpool(idempotency.wait, route, key, request_hash)
+        ask_mysql = waited is None
+        if waited is not None:
+            state, record = waited
+
+    if state == idempotency.COMPLETED:
+        logger.info("Replaying stored response for %s %s", route, key)
+        IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="replayed").inc()
+        return _replay(record)
+    if state == idempotency.CONFLICT:
+        IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="conflict").inc()
+        return JSONResponse(
+            status_code=422,
+            content={"detail": f"{HEADER} was already used for a different request"},
+        )
+
+    IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="new").inc()
+    heartbeat = asyncio.create_task(_keep_claimed(route, key, request_hash))
+    try:
+        try:
+            response = await call_next(request)
+        except Exception:
+            await _release(route, key, request_hash)
+            raise
+        if response.status_code >= 500 or response.status_code in _NOT_STORED:
+            await _release(route, key, request_hash)
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        try:
+            stored = await run_in_threadpool(
+                idempotency.complete, route, key, request_hash, response.status_code,
+                body.decode("utf-8"), response.headers.get("content-type")
+            )
+            if not stored:
+                IDEMPOTENCY_REQUESTS.labels(endpoint=route, outcome="claim_lost").inc()
+        except Exception as e:
+            # The response is still returned; a retry runs again once the claim lapses
+            logger.error("Could not store idempotent response for %s %s: %s", route, key, str(e))
+        return Response(content=body, status_code=response.status_code, headers=dict(response.headers))
+    finally:
+        heartbeat.cancel()
+
+
+async def _keep_claimed(route: str, key: str, request_hash: str) -> None:
+    """Renew the claim while the request runs, so duplicates keep waiting instead of taking it over"""
+    interval = max(1.0, settings.IDEMPOTENCY_LOCK_SECONDS / 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await run_in_threadpool(idempotency.renew, route, key, request_hash):
+                logger.error("Idempotency key %s %s lost while its request was running", route, key)
+                return
+        except Exception as e:
+            logger.warning("Could not renew idempotency key %s %s: %s", route, key, str(e))
+
+
+async def _release(route: str, key: str, request_hash: str) -> None:
+    try:
+        await run_in_threadpool(idempotency.release, route, key, request_hash)
+    except Exception as e:
+        logger.error("Could not release idempotency key %s %s: %s", route, key, str(e))
@@ -1,5 +1,18 @@
 # api/core/metrics.py
-from prometheus_client import Counter, Histogram, Gauge
+"""
+Prometheus metrics of the API.
+
+Under gunicorn every worker is a separate process. With PROMETHEUS_MULTIPROC_DIR set
+(gunicorn.conf.py does it) prometheus_client writes each worker's values to files in that
+directory and collector_registry() merges them, so a scrape sees all workers. Metrics also
+used by the Celery workers, and the export helpers, live in services/metrics.py.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# Shared with the Celery workers, re-exported for the API modules
+from services.metrics import (
+    LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED, collector_registry, start_metrics_server,
+)
 
 # HTTP Metrics
 REQUEST_COUNT = Counter(
@@ -16,7 +29,43 @@ REQUEST_LATENCY = Histogram(
 
 ACTIVE_REQUESTS = Gauge(
     'mnp_http_requests_active', 
-    'Active HTTP requests'
+    'Active HTTP requests',
+    multiprocess_mode='livesum'
+)
+
+# Admission control Metrics (api/core/admission.py)
+ADMISSION_REJECTED = Counter(
+    'mnp_admission_rejected_total',
+    'Requests rejected by admission control',
+    ['priority', 'reason']  # reason: queue_full, queue_timeout, route_limit
+)
+
+ADMISSION_QUEUED = Gauge(
+    'mnp_admission_queued',
+    'Requests waiting for an admission slot',
+    ['priority'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'mnp_admission_in_flight',
+    'Requests admitted and being processed',
+    ['priority'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    'mnp_admission_queue_wait_seconds',
+    'Time spent waiting for an admission slot',
+    ['priority'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Idempotency key Metrics (api/core/idempotency.py)
+IDEMPOTENCY_REQUESTS = Counter(
+    'mnp_idempotency_requests_total',
+    'Requests carrying an Idempotency-Key',
+    ['endpoint', 'outcome']  # outcome: new, replayed, in_progress, conflict, unavailable, claim_lost
 )
 
 # Business Logic Metrics
@@ -46,7 +95,8 @@ CANCEL_REQUESTS = Counter(
 # System Metrics
 DATABASE_CONNECTIONS = Gauge(
     'mnp_database_connections_active',
-    'Active database connections'
+    'Active database connections',
+    multiprocess_mode='livesum'
 )
 
 CELERY_TASKS = Counter(
@@ -72,4 +122,5 @@ def record_port_in_processing_time(processing_time: float):
     PORT_IN_PROCESSING_TIME.observe(processing_time)
 
 def record_error(error_type: str, endpoint: str = "unknown"):
-    ERROR_COUNT.labels(error_type=error_type, endpoint=endpoint).inc()
\ No newline at end of file
+    ERROR_COUNT.labels(error_type=error_type, endpoint=endpoint).inc()
+
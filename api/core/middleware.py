@@ -1,36 +1,61 @@
 # api/core/middleware.py
 import time
 from fastapi import Request
+from starlette.routing import Match
 from .metrics import REQUEST_COUNT, REQUEST_LATENCY, ACTIVE_REQUESTS
 
+UNMATCHED = "unmatched"
+
+
+def route_template(request: Request) -> str:
+    """
+    Route template of the request ("/api/v1/portability-requests/{request_id}") as metric label,
+    so IDs in paths do not create a time series each. Requests answered before routing
+    (admission rejections, idempotent replays) are matched here; unknown paths share one label.
+    """
+    scope = request.scope
+    route = scope.get("route")
+    if route is None:
+        for candidate in request.app.router.routes:
+            match, child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = child_scope.get("route", candidate)
+                break
+    template = getattr(route, "path_format", None)
+    if not template:
+        return UNMATCHED
+    path = scope["path"]
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None or path_regex.match(path):
+        return template
+    # Template relative to the router's include prefix: prepend the prefix part of the path
+    for index, char in enumerate(path):
+        if char == "/" and index and path_regex.match(path[index:]):
+            return path[:index] + template
+    return template
+
+
 async def prometheus_middleware(request: Request, call_next):
     """ middleware """
     start_time = time.time()
     ACTIVE_REQUESTS.inc()
-    
+    status_code = 500  # Record exception as 500 error
+
     try:
         response = await call_next(request)
-        # Record successful request
-        REQUEST_COUNT.labels(
-            method=request.method, 
-            endpoint=request.url.path, 
-            status_code=response.status_code
-        ).inc()
+        status_code = response.status_code
         return response
-        
-    except Exception:
-        # Record exception as 500 error
-        REQUEST_COUNT.labels(
-            method=request.method, 
-            endpoint=request.url.path, 
-            status_code=500
-        ).inc()
-        raise
-        
+
     finally:
         ACTIVE_REQUESTS.dec()
         processing_time = time.time() - start_time
+        endpoint = route_template(request)
+        REQUEST_COUNT.labels(
+            method=request.method,
+            endpoint=endpoint,
+            status_code=status_code
+        ).inc()
         REQUEST_LATENCY.labels(
-            method=request.method, 
-            endpoint=request.url.path
-        ).observe(processing_time)
\ No newline at end of file
+            method=request.method,
+            endpoint=endpoint
+        ).observe(processing_time)
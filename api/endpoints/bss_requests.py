@@ -7,7 +7,7 @@ from tasks.tasks import submit_to_central_node, submit_to_central_node_cancel
 from services.logger import logger, payload_logger, log_payload
 from pydantic import BaseModel, Field, validator, field_validator
 import re
-from typing import Optional, Union
+from typing import List, Optional, Union
 from datetime import datetime, date
 import pytz
 from enum import Enum
@@ -15,7 +15,9 @@ from services.auth import verify_basic_auth
 from fastapi.openapi.docs import get_swagger_ui_html
 from porting.spain_nc import submit_to_central_node_online, submit_to_central_node_cancel_online, submit_to_central_node_cancel_online_sync 
 from ..core.metrics import record_port_in_success, record_port_in_error, record_port_in_processing_time
-from services.database_service import check_if_port_out_request_in_db, save_portability_request_person_legal
+from services.database_service import check_if_port_out_request_in_db, save_portability_request_person_legal, save_port_in_batch, load_port_in_batch
+from starlette.concurrency import run_in_threadpool
+from tasks.bulk_port_in import dispatch_port_in_batch
 from porting.spain_nc import submit_to_central_node_port_out_reject, submit_to_central_node_port_out_confirm
 
 router = APIRouter()
@@ -516,7 +518,7 @@ async def portin_request(alta_data: PortInRequest):
         alta_data_dict = alta_data.dict()
         
         # Conditional payload logging
-        log_payload('BSS', 'PORT_IN', 'REQUEST', str(alta_data_dict))
+        log_payload('BSS', 'PORT_IN', 'REQUEST', alta_data_dict)
 
         # 1. & 2. Create and save the DB record
         new_request_id = save_portability_request_person_legal(alta_data_dict, 'PORT_IN', 'ESP')
@@ -808,7 +810,7 @@ async def cancel_portability(request: CancelPortabilityRequest):
         alta_data = request.dict()
         
         # 1. Log the incoming payload
-        log_payload('BSS', 'CANCEL_PORTABILITY', 'REQUEST', str(alta_data))
+        log_payload('BSS', 'CANCEL_PORTABILITY', 'REQUEST', alta_data)
         
         # 2. Save to database immediately
         request_id = save_cancel_request_db(alta_data, "CANCELLATION", "ESP")
@@ -1057,7 +1059,7 @@ async def cancel_portability_online(request: CancelPortabilityRequest_online):
             alta_data['cancellation_reason'] = alta_data['cancellation_reason']
 
         # 1. Log the incoming payload
-        log_payload('BSS', 'CANCEL_PORTABILITY', 'REQUEST', str(alta_data))
+        log_payload('BSS', 'CANCEL_PORTABILITY', 'REQUEST', alta_data)
         
         # 2. Save to database immediately
         request_id = save_cancel_request_db_online(alta_data, "CANCELLATION", "ESP")
@@ -1768,7 +1770,7 @@ async def portin_request_legal(alta_data: PortInRequestLegal):
         alta_data_dict['is_legal_entity'] = True
         
         # Conditional payload logging
-        log_payload('BSS', 'PORT_IN_LEGAL', 'REQUEST', str(alta_data_dict))
+        log_payload('BSS', 'PORT_IN_LEGAL', 'REQUEST', alta_data_dict)
 
         # 1. & 2. Create and save the DB record
         # new_request_id = save_portability_request_new(alta_data_dict, 'PORT_IN', 'ESP')
@@ -1847,4 +1849,172 @@ async def portin_request_legal(alta_data: PortInRequestLegal):
     
     finally:
         processing_time = time.time() - start_time
-        record_port_in_processing_time(processing_time)
\ No newline at end of file
+        record_port_in_processing_time(processing_time)
+
+# status_nc of bulk items NC rejected or that could not be delivered
+BULK_PENDING_STATUS_NC = {"PENDING_SUBMIT", "SUBMITTING"}
+BULK_FAILED_STATUS_NC = {"PORT_IN_REJECTED", "ERROR", "MAX_RETRIES_EXCEEDED"}
+
+class BulkPortInRequestLegal(BaseModel):
+    """ Pydantic class to validate a bulk Port-In request of legal entities """
+    items: List[PortInRequestLegal] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BULK_PORT_IN_MAX_ITEMS,
+        description="Port-In requests, each validated as for /port-in-legal"
+    )
+
+    @field_validator('items')
+    @classmethod
+    def validate_unique_msisdn(cls, v):
+        """One request per MSISDN within a batch"""
+        seen, duplicates = set(), set()
+        for item in v:
+            if item.msisdn in seen:
+                duplicates.add(item.msisdn)
+            seen.add(item.msisdn)
+        if duplicates:
+            raise ValueError(f"Duplicate MSISDN in batch: {', '.join(sorted(duplicates))}")
+        return v
+
+class BulkPortInItem(BaseModel):
+    """ Internal request ID assigned to one item of a bulk Port-In """
+    id: int = Field(..., examples=[12345], description="Internal request ID")
+    msisdn: str = Field(..., examples=["621800000"])
+
+class BulkPortInResponse(BaseModel):
+    """ Pydantic class of the bulk Port-In response """
+    batch_id: int = Field(..., examples=[42], description="Use GET /port-in-legal/bulk/{batch_id} for per-item results")
+    status: str = Field(..., examples=["ACCEPTED"])
+    item_count: int = Field(..., examples=[250])
+    items: List[BulkPortInItem] = Field(..., description="Request IDs in the order of the submitted items")
+
+class BulkPortInItemStatus(BaseModel):
+    """ NC submission result of one item of a bulk Port-In """
+    id: int
+    msisdn: str
+    status_nc: Optional[str] = Field(None, examples=["PENDING_SUBMIT", "SUBMITTING", "SUBMITTED", "PORT_IN_REJECTED"])
+    status_bss: Optional[str] = None
+    response_code: Optional[str] = Field(None, examples=["0000 00000", "AREC EXIST"])
+    description: Optional[str] = None
+    reference_code: Optional[str] = None
+    porting_window: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class BulkPortInBatchStatus(BaseModel):
+    """ Pydantic class of the bulk Port-In status resource """
+    batch_id: int
+    status: str = Field(..., examples=["ACCEPTED", "DISPATCHED"])
+    item_count: int
+    created_at: Optional[datetime] = None
+    dispatched_at: Optional[datetime] = None
+    pending: int = Field(..., description="Items not submitted to NC yet")
+    submitted: int = Field(..., description="Items accepted by NC, followed up by the status checks")
+    failed: int = Field(..., description="Items rejected by NC or not delivered (status_nc in BULK_FAILED_STATUS_NC)")
+    items: List[BulkPortInItemStatus]
+
+@router.post(
+    '/port-in-legal/bulk',
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(verify_basic_auth)],
+    response_model=BulkPortInResponse,
+    summary="Submit Bulk Port-In Request for Legal Entities",
+    description="""
+    Submit up to BULK_PORT_IN_MAX_ITEMS port-in requests of legal entities at once (enterprise migrations).
+
+    This endpoint:
+    - Validates every item as /port-in-legal does; any invalid item rejects the whole batch (422)
+    - Saves all items to the database in one statement
+    - Returns the internal request IDs immediately, without waiting for NC
+
+    **Workflow:**
+    1. Request validation and database storage of the batch
+    2. Items are submitted to NC in the background at BULK_PORT_IN_SUBMIT_PER_MINUTE (working hours only)
+    3. Per-item NC results at GET /port-in-legal/bulk/{batch_id}
+    4. Status check task initiated from central schduler (pending_requests task), as for single requests
+    """,
+    response_description="Batch accepted and queued for processing",
+    tags=["Spain: Portability Operations"]
+)
+async def portin_request_legal_bulk(bulk_data: BulkPortInRequestLegal):
+    """
+    Bulk Port-In Number Portability Request for Legal Entities
+    """
+    start_time = time.time()
+    try:
+        logger.info("--- Processing bulk port-in LEGAL request: %s items ---", len(bulk_data.items))
+
+        items = []
+        for item in bulk_data.items:
+            alta_data_dict = item.dict()
+            alta_data_dict['is_legal_entity'] = True
+            items.append(alta_data_dict)
+
+        # Batch insert off the event loop: hundreds of rows in one statement
+        batch_id, rows = await run_in_threadpool(save_port_in_batch, items, 'PORT_IN', 'ESP')
+        logger.info("Bulk port-in batch %s saved with %s requests", batch_id, len(rows))
+
+        try:
+            dispatch_port_in_batch.delay(batch_id)
+        except Exception as e:
+            # Rows are committed; the sweep task dispatches the batch later
+            logger.error("Could not queue dispatch of port-in batch %s: %s", batch_id, str(e))
+
+        return {
+            "batch_id": batch_id,
+            "status": "ACCEPTED",
+            "item_count": len(rows),
+            "items": [{"id": request_id, "msisdn": msisdn} for request_id, msisdn in rows]
+        }
+
+    except ValueError as e:
+        logger.warning("Validation error in bulk legal port-in: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request: {str(e)}"
+        ) from e
+
+    except Exception as e:
+        logger.error("Server error processing bulk legal port-in: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error processing bulk legal entity request"
+        ) from e
+
+    finally:
+        processing_time = time.time() - start_time
+        record_port_in_processing_time(processing_time)
+
+@router.get(
+    '/port-in-legal/bulk/{batch_id}',
+    dependencies=[Depends(verify_basic_auth)],
+    response_model=BulkPortInBatchStatus,
+    summary="Bulk Port-In Status",
+    description="Per-item NC submission results of a bulk port-in submitted to /port-in-legal/bulk",
+    tags=["Spain: Portability Operations"]
+)
+async def portin_request_legal_bulk_status(batch_id: int):
+    """
+    Bulk Port-In status: batch state, counters and the NC result of every item
+    """
+    batch = await run_in_threadpool(load_port_in_batch, batch_id)
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Port-in batch {batch_id} not found"
+        )
+
+    items = batch["items"]
+    pending = sum(1 for item in items if item["status_nc"] in BULK_PENDING_STATUS_NC)
+    failed = sum(1 for item in items if item["status_nc"] in BULK_FAILED_STATUS_NC)
+    return {
+        "batch_id": batch["id"],
+        "status": batch["status"],
+        "item_count": batch["item_count"],
+        "created_at": batch["created_at"],
+        "dispatched_at": batch["dispatched_at"],
+        "pending": pending,
+        "submitted": len(items) - pending - failed,
+        "failed": failed,
+        "items": items
+    }
@@ -8,6 +8,7 @@ import os
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from config import settings
 import aiohttp
+from services.italy.xsd_validation import validate_mnp_file
 
 # app = FastAPI(title="MNP Gateway API")
 router = APIRouter()
@@ -297,6 +298,13 @@ async def receive_mnp_file(
             root = ET.fromstring(filexml)
         except ET.ParseError:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid XML format")
+
+        # Validate against mnp_schema.xsd when MNP_XSD_VALIDATION is enabled (off by default, it
+        # rejects files the endpoint used to accept); compiled once per worker, large files in the pool
+        if settings.MNP_XSD_VALIDATION:
+            is_valid, errors = await validate_mnp_file(filexml)
+            if not is_valid:
+                raise HTTPException(status.HTTP_400_BAD_REQUEST, f"XML schema validation failed: {'; '.join(errors[:5])}")
         
         # Extract message details
         message_info = extract_message_info(root, filets)
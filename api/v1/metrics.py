@@ -11,16 +11,17 @@ from ..core.metrics import (  # We'll create this next
     ACTIVE_REQUESTS,
     PORT_IN_REQUESTS,
     PORT_IN_PROCESSING_TIME,
-    DATABASE_CONNECTIONS
+    DATABASE_CONNECTIONS,
+    collector_registry
 )
 
 router = APIRouter(tags=["monitoring"])
 
 @router.get("/metrics")
 async def metrics():
-    """Prometheus metrics endpoint"""
+    """Prometheus metrics endpoint (all workers of the pod in multiprocess mode)"""
     return Response(
-        content=generate_latest(),
+        content=generate_latest(collector_registry()),
         media_type=CONTENT_TYPE_LATEST
     )
 
@@ -141,13 +141,13 @@ def create_msisdn_status_request(request: MsisdnStatusRequest) -> Dict[str, Any]
         logger.info("--- Checking MSISDN status --- for MSISDN: %s", msisdn)
         
         # 1. Log the incoming payload
-        log_payload('BSS', 'MSISDN_STATUS', 'REQUEST', str({"msisdn": msisdn}))
+        log_payload('BSS', 'MSISDN_STATUS', 'REQUEST', {"msisdn": msisdn})
 
         # 2. Query National Central for status
         success, error_message, response_data = msisdn_status_check_nc(msisdn)
         
         # 3. Log the response payload
-        log_payload('NC', 'MSISDN_STATUS', 'RESPONSE', str(response_data))
+        log_payload('NC', 'MSISDN_STATUS', 'RESPONSE', response_data)
         
         if not success:
             # If NC call failed, return error details
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends, APIRouter
+from fastapi import FastAPI, HTTPException, Depends, APIRouter, Header, Response
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
 import mysql.connector
 from mysql.connector import Error
 import json
-from services.database_service import get_db_connection
+from services.database_service import get_db_connection, load_portability_request, find_portability_request_id
+from services.database_service import PORTABILITY_REQUEST_COLUMNS, PORTABILITY_REQUEST_FIELDS
+from api.core.responses import FastJSONResponse, rows_as_objects
+from services import portability_cache
 
 
 # Pydantic models
@@ -178,7 +181,7 @@ async def search_portability_requests(
     cursor = None
     try:
         connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor()
 
         # Build base query without LIMIT for count
         count_query = """
@@ -187,13 +190,8 @@ async def search_portability_requests(
         WHERE 1=1
         """
         
-        data_query = """
-        SELECT 
-            id, country_code, request_type, reference_code, session_code,
-            status_bss, status_nc, response_code, response_status, description,
-            msisdn, document_type, document_number, name_surname, contract_number,
-            donor_operator, recipient_operator, desired_porting_date,
-            requested_at, scheduled_at, completed_at, created_at, updated_at
+        data_query = f"""
+        SELECT {PORTABILITY_REQUEST_COLUMNS}
         FROM portability_requests 
         WHERE 1=1
         """
@@ -254,24 +252,16 @@ async def search_portability_requests(
 
         # First, get total count
         cursor.execute(count_query, params)
-        count_result = cursor.fetchone()
-        total_records = count_result['total']
+        total_records = cursor.fetchone()[0]
         
-        # Then, get the data with ordering
+        # Then, get the data with ordering (rows are encoded straight from the cursor tuples)
         data_query += " ORDER BY created_at DESC"
         cursor.execute(data_query, params)
-        results = cursor.fetchall()
         
-        # Convert datetime objects
-        for result in results:
-            for key, value in result.items():
-                if isinstance(value, datetime):
-                    result[key] = value.isoformat()
-        
-        return {
+        return FastJSONResponse({
             "total_records": total_records,
-            "data": results
-        }
+            "data": rows_as_objects(PORTABILITY_REQUEST_FIELDS, cursor.fetchall())
+        })
             
     except Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -281,54 +271,62 @@ async def search_portability_requests(
         if connection and connection.is_connected():
             connection.close()
 
+def _portability_request_response(entry, if_none_match: Optional[str]) -> Response:
+    """Cached request as JSON with its ETag, or 304 when If-None-Match still matches"""
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Portability request not found")
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if entry["etag"] in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    body = PortabilityResponse.model_validate(entry["record"]).model_dump_json()
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/portability-requests/{request_id}", 
             response_model=PortabilityResponse,
             include_in_schema=False)  # This hides the endpoint from Swagger))
-async def get_portability_request(request_id: int):
+def get_portability_request(request_id: int, if_none_match: Optional[str] = Header(None)):
     """
-    Get specific portability request by ID
+    Get specific portability request by ID (cached, see services/portability_cache.py)
     """
-    connection = None
-    cursor = None
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-        SELECT 
-            id, country_code, request_type, reference_code, session_code,
-            status_bss, status_nc, response_code, response_status, description,
-            msisdn, document_type, document_number, name_surname, contract_number,
-            donor_operator, recipient_operator, desired_porting_date,
-            requested_at, scheduled_at, completed_at, created_at, updated_at
-        FROM portability_requests 
-        WHERE id = %s
-        """
-        
-        cursor.execute(query, (request_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Portability request not found")
-        
-        # Convert datetime objects
-        for key, value in result.items():
-            if isinstance(value, datetime):
-                result[key] = value.isoformat()
-        
-        return result
-        
+        entry = portability_cache.get_portability_request(request_id, load_portability_request)
     except Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-    finally:
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
+    return _portability_request_response(entry, if_none_match)
+
+@router.get("/portability-requests/reference/{reference_code}",
+            response_model=PortabilityResponse,
+            include_in_schema=False)
+def get_portability_request_by_reference(reference_code: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Get portability request by NC reference code (cached)
+    """
+    try:
+        request_id = portability_cache.get_request_id(portability_cache.LOOKUP_REFERENCE_CODE, reference_code, find_portability_request_id)
+        entry = portability_cache.get_portability_request(request_id, load_portability_request) if request_id else None
+    except Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return _portability_request_response(entry, if_none_match)
+
+@router.get("/portability-requests/msisdn/{msisdn}",
+            response_model=PortabilityResponse,
+            include_in_schema=False)
+def get_portability_request_by_msisdn(msisdn: str, if_none_match: Optional[str] = Header(None)):
+    """
+    Get the latest port-in request of an MSISDN (cached)
+    """
+    try:
+        request_id = portability_cache.get_request_id(portability_cache.LOOKUP_MSISDN, msisdn, find_portability_request_id)
+        entry = portability_cache.get_portability_request(request_id, load_portability_request) if request_id else None
+    except Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return _portability_request_response(entry, if_none_match)
 
 @router.get("/portability-requests",
             include_in_schema=False)
-async def get_portability_requests(
+def get_portability_requests(
     msisdn: Optional[str] = None,
     contract_number: Optional[str] = None,
     request_type: Optional[str] = None,
@@ -344,15 +342,10 @@ async def get_portability_requests(
     cursor = None
     try:
         connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor()
 
-        sql_query = """
-        SELECT 
-            id, country_code, request_type, reference_code, session_code,
-            status_bss, status_nc, response_code, response_status, description,
-            msisdn, document_type, document_number, name_surname, contract_number,
-            donor_operator, recipient_operator, desired_porting_date,
-            requested_at, scheduled_at, completed_at, created_at, updated_at
+        sql_query = f"""
+        SELECT {PORTABILITY_REQUEST_COLUMNS}
         FROM portability_requests 
         WHERE 1=1
         """
@@ -390,15 +383,7 @@ async def get_portability_requests(
         sql_query += " ORDER BY created_at DESC"
         
         cursor.execute(sql_query, params)
-        results = cursor.fetchall()
-        
-        # Convert datetime objects
-        for result in results:
-            for key, value in result.items():
-                if isinstance(value, datetime):
-                    result[key] = value.isoformat()
-        
-        return results
+        return FastJSONResponse(rows_as_objects(PORTABILITY_REQUEST_FIELDS, cursor.fetchall()))
         
     except Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, Any, Optional
+import time
+from services.auth import verify_basic_auth
+from services.logger import logger
+from services.payload_archive import find_exchanges
+
+router = APIRouter()
+
+@router.get(
+    '/admin/payload-archive',
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_basic_auth)],
+    summary="Search archived NC/BSS payloads",
+    description="""
+    Retrieve the archived request/response payloads of an exchange from the indexed payload
+    archive (PAYLOAD_ARCHIVE_DIR) instead of grepping payload.log.
+
+    At least one of reference_code, msisdn, request_id or soap_action is required; when several
+    are given an exchange must match all of them. Exchanges are returned oldest first.
+    """,
+    tags=["Admin"],
+)
+def search_payload_archive(
+    reference_code: Optional[str] = Query(None, description="NC codigoReferencia", example="29979811251210133400015"),
+    msisdn: Optional[str] = Query(None, description="MSISDN (as sent to/received from NC)", example="552000023"),
+    request_id: Optional[str] = Query(None, description="portability_requests.id"),
+    soap_action: Optional[str] = Query(None, description="SOAP operation, e.g. crearSolicitudIndividualAltaPortabilidadMovil"),
+    since: Optional[float] = Query(None, description="Only exchanges after this epoch timestamp"),
+    limit: int = Query(100, ge=1, le=1000, description="Most recent exchanges returned"),
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        exchanges = find_exchanges(
+            since=since,
+            limit=limit,
+            reference_code=reference_code,
+            msisdn=msisdn,
+            request_id=request_id,
+            soap_action=soap_action,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    except Exception as e:
+        logger.error("Payload archive lookup failed: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Payload archive lookup failed: {str(e)}"
+        ) from e
+
+    return {
+        "count": len(exchanges),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "exchanges": exchanges,
+    }
@@ -147,13 +147,13 @@ def create_portin_status_request(request: MsisdnStatusRequest) -> Dict[str, Any]
         logger.info("--- Checking portin status --- for MSISDN: %s", msisdn)
         
         # 1. Log the incoming payload
-        log_payload('BSS', 'PORTIN_STATUS', 'REQUEST', str({"msisdn": msisdn}))
+        log_payload('BSS', 'PORTIN_STATUS', 'REQUEST', {"msisdn": msisdn})
 
         # 2. Query National Central for status
         success, error_message, response_data = portin_status_check_nc(msisdn, reference_code=request.reference_code)
         
         # 3. Log the response payload
-        log_payload('NC', 'PORTIN_STATUS', 'RESPONSE', str(response_data))
+        log_payload('NC', 'PORTIN_STATUS', 'RESPONSE', response_data)
         
         if not success:
             # If NC call failed, return error details
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, Any, Optional
+from mysql.connector import Error
+from services.auth import verify_basic_auth
+from services.database_service import find_portout_msisdn_ranges
+from services.logger import logger
+
+router = APIRouter()
+
+@router.get(
+    '/portout-msisdn',
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(verify_basic_auth)],
+    summary="Check whether an MSISDN or MSISDN range is in a port-out",
+    description="""
+    Look up the open port-out requests (not rejected, port window not passed yet) received from
+    NC that include an MSISDN, either as a single number or inside one of their MSISDN ranges.
+
+    - msisdn only: point query, the port-out requests containing that number
+    - msisdn and range_end: overlap query, the port-out requests containing any number of
+      [msisdn, range_end]
+
+    Answered from the indexed portout_msisdn_range table, newest port-out request first.
+    in_port_out is true when at least one open request matches.
+    """,
+    tags=["Spain: Portability Operations"],
+)
+def check_portout_msisdn(
+    msisdn: str = Query(..., min_length=9, max_length=9, pattern=r'^\d+$',
+                        description="MSISDN (9 digits), or first MSISDN of the range", example="621800011"),
+    range_end: Optional[str] = Query(None, min_length=9, max_length=9, pattern=r'^\d+$',
+                                     description="Last MSISDN of the range (overlap query)", example="621800012"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of matches returned"),
+) -> Dict[str, Any]:
+    try:
+        matches = find_portout_msisdn_ranges(int(msisdn), int(range_end) if range_end else None, limit)
+    except Error as e:
+        logger.error("Port-out MSISDN lookup failed for %s-%s: %s", msisdn, range_end, str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Port-out MSISDN lookup failed: {str(e)}"
+        ) from e
+
+    return {
+        "msisdn": msisdn,
+        "range_end": range_end,
+        "in_port_out": bool(matches),
+        "count": len(matches),
+        "matches": matches,
+    }
@@ -221,7 +221,7 @@ async def create_return_request_online(request: ReturnRequestOnline):
         return_data = request.dict()
         
         # 1. Log the incoming payload
-        log_payload('BSS', 'RETURN_REQUEST', 'REQUEST', str(return_data))
+        log_payload('BSS', 'RETURN_REQUEST', 'REQUEST', return_data)
 
         new_request_id = save_return_request_db(return_data)
         if not new_request_id:
@@ -400,7 +400,7 @@ async def create_cancel_return_request_online(request: ReturnCancelRequestOnline
         )
 
         # 1. Log the incoming payload
-        log_payload('BSS', 'CANCEL_RETURN', 'REQUEST', str(return_data))
+        log_payload('BSS', 'CANCEL_RETURN', 'REQUEST', return_data)
 
         new_request_id = save_cancel_return_request_db(return_data)
         if not new_request_id:
@@ -579,13 +579,13 @@ def create_return_status_request_online(request: ReturnStatusRequestOnline) -> D
             )
 
         # 1. Log the incoming payload
-        log_payload('BSS', 'RETURN_STATUS', 'REQUEST', str(status_data))
+        log_payload('BSS', 'RETURN_STATUS', 'REQUEST', status_data)
 
         # 2. Query Central Node for status
         response_dict = submit_to_central_node_return_status_check(reference_code)
         
         # 3. Log the response payload
-        log_payload('NC', 'RETURN_STATUS', 'RESPONSE', str(response_dict))
+        log_payload('NC', 'RETURN_STATUS', 'RESPONSE', response_dict)
         
         # 4. Update status in return_requests (synchronous call from async function)
         response_dict_eng = convert_spanish_to_english(response_dict)
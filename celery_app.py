@@ -1,14 +1,19 @@
 # celery.py (in project's root directory)
 from celery import Celery # type: ignore
+from celery.signals import task_postrun, worker_init, worker_shutdown, worker_process_shutdown # type: ignore
 from dotenv import load_dotenv
 import os
+import time
 from config import settings
+from services.beat_schedule import working_hours_schedule
+from services.log_queue import flush_queue_logging
+from services.metrics import mark_process_dead, start_worker_metrics
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Get Redis URL from environment variables
-redis_url = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+redis_url = settings.REDIS_URL
 PENDING_REQUESTS_TIMEOUT = float(os.getenv('PENDING_REQUESTS_TIMEOUT', '60.0'))
 TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK = settings.TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK
 TIME_DELTA_FOR_RETURN_STATUS_CHECK = settings.TIME_DELTA_FOR_RETURN_STATUS_CHECK
@@ -19,7 +24,7 @@ app = Celery('mnp_worker',
              backend=redis_url,
             #  include=['tasks'])
             #  include=['tasks', 'tasks_pending_requests'])  # ← ADD BOTH MODULES HERE
-            include=['tasks.tasks', 'tasks.pending_requests'])
+            include=['tasks.tasks', 'tasks.pending_requests', 'tasks.outbox', 'tasks.housekeeping', 'tasks.bulk_port_in'])
 
 # Optional configuration
 app.conf.update(
@@ -33,6 +38,87 @@ app.conf.update(
 app.conf.timezone = 'Europe/Madrid'
 app.conf.enable_utc = False
 
+# Result backend policies
+# Nobody reads the results of callbacks, per-request checks and fan-out tasks, so they are not stored.
+# Beat tasks keep a short-lived summary, everything else expires after CELERY_RESULT_EXPIRES.
+TASK_RESULT_POLICIES = {
+    'tasks.pending_requests.process_pending_requests': {'ignore_result': True},
+    'tasks.pending_requests.check_single_request': {'ignore_result': True},
+    'tasks.pending_requests.print_periodic_message': {'ignore_result': True},
+    'tasks.tasks.print_periodic_message': {'ignore_result': True},
+    'tasks.tasks.check_status': {'ignore_result': True},
+    'tasks.tasks.callback_bss': {'ignore_result': True},
+    'tasks.tasks.callback_bss_portout': {'ignore_result': True},
+    'tasks.tasks.callback_bss_portout_01': {'ignore_result': True},
+    'tasks.tasks.callback_bss_return': {'ignore_result': True},
+    'tasks.tasks.check_single_return_status': {'ignore_result': True},
+    'tasks.tasks.check_status_port_out': {'result_expires': 300},
+    'tasks.tasks.process_pending_return_status_checks': {'result_expires': 300},
+    'tasks.outbox.dispatch_bss_outbox': {'result_expires': 300},
+    'tasks.housekeeping.purge_idempotency_keys': {'result_expires': 300},
+    'tasks.housekeeping.close_expired_portout_ranges': {'result_expires': 300},
+    'tasks.bulk_port_in.dispatch_port_in_batch': {'result_expires': 300},
+    'tasks.bulk_port_in.submit_port_in_batch_item': {'ignore_result': True},
+    'tasks.bulk_port_in.sweep_port_in_batches': {'result_expires': 300},
+}
+
+app.conf.result_expires = settings.CELERY_RESULT_EXPIRES
+app.conf.result_compression = settings.CELERY_RESULT_COMPRESSION
+app.conf.task_annotations = {
+    name: {'ignore_result': True}
+    for name, policy in TASK_RESULT_POLICIES.items() if policy.get('ignore_result')
+}
+
+# Results do not carry the task name (result_extended is off to keep them small). For the backend
+# report, the task name of each stored result goes into an hourly hash (task_id -> task name) that
+# expires once every result written in that hour has expired.
+RESULT_NAME_INDEX_PREFIX = 'celery-task-names:'
+RESULT_NAME_INDEX_BUCKET = 3600  # seconds
+RESULT_NAME_INDEX_TTL = max([settings.CELERY_RESULT_EXPIRES] + [
+    policy['result_expires'] for policy in TASK_RESULT_POLICIES.values() if policy.get('result_expires')
+])
+
+def result_name_index_key(bucket: int) -> str:
+    """Key of the task name hash for results stored in the given hour bucket"""
+    return f"{RESULT_NAME_INDEX_PREFIX}{bucket}"
+
+@task_postrun.connect
+def apply_result_expiry(sender=None, task_id=None, **kwargs):
+    """Shorten the TTL of stored results with a per-task result_expires policy and index their task name"""
+    name = getattr(sender, 'name', None)
+    policy = TASK_RESULT_POLICIES.get(name, {})
+    if policy.get('ignore_result') or getattr(sender, 'ignore_result', False):
+        return
+    try:
+        client = sender.backend.client
+        bucket = int(time.time()) // RESULT_NAME_INDEX_BUCKET
+        index_key = result_name_index_key(bucket)
+        pipe = client.pipeline(transaction=False)
+        if policy.get('result_expires'):
+            pipe.expire(sender.backend.get_key_for_task(task_id), policy['result_expires'])
+        pipe.hset(index_key, task_id, name)
+        pipe.expireat(index_key, (bucket + 1) * RESULT_NAME_INDEX_BUCKET + RESULT_NAME_INDEX_TTL)
+        pipe.execute()
+    except AttributeError:
+        # Backend without a Redis client (e.g. disabled backend in tests)
+        pass
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_logs_on_shutdown(**kwargs):
+    """Drain the background log writers of the pool child / main worker process"""
+    flush_queue_logging()
+
+@worker_init.connect
+def serve_worker_metrics(**kwargs):
+    """Serve the worker's Prometheus metrics (pool children included in multiprocess mode)"""
+    start_worker_metrics(settings.CELERY_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def drop_worker_process_metrics(**kwargs):
+    """Remove the live gauges of an exiting pool child from the merged metrics"""
+    mark_process_dead()
+
 # Beat Schedule Configuration
 app.conf.beat_schedule = {
     # Run a task every 60 seconds that prints a message
@@ -47,17 +133,34 @@ app.conf.beat_schedule = {
     'process-pending-requests-every-60-seconds': {
         # 'task': 'tasks_pending_requests.process_pending_requests',
         'task': 'tasks.pending_requests.process_pending_requests',
-        'schedule': PENDING_REQUESTS_TIMEOUT, 
+        'schedule': working_hours_schedule(PENDING_REQUESTS_TIMEOUT), 
     },
     'process-check-port-out': {
         # 'task': 'tasks_pending_requests.process_pending_requests',
         'task': 'tasks.tasks.check_status_port_out',
-        'schedule': TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK, 
+        'schedule': working_hours_schedule(TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK), 
     },
     'process-check-return': {
         # 'task': 'tasks_pending_requests.process_pending_requests',
         'task': 'tasks.tasks.process_pending_return_status_checks',
-        'schedule': TIME_DELTA_FOR_RETURN_STATUS_CHECK, 
+        'schedule': working_hours_schedule(TIME_DELTA_FOR_RETURN_STATUS_CHECK), 
+    },
+    # BSS callbacks are delivered around the clock, retries included
+    'dispatch-bss-outbox': {
+        'task': 'tasks.outbox.dispatch_bss_outbox',
+        'schedule': settings.BSS_OUTBOX_DISPATCH_INTERVAL,
+    },
+    'purge-idempotency-keys': {
+        'task': 'tasks.housekeeping.purge_idempotency_keys',
+        'schedule': settings.IDEMPOTENCY_PURGE_INTERVAL,
+    },
+    'close-expired-portout-ranges': {
+        'task': 'tasks.housekeeping.close_expired_portout_ranges',
+        'schedule': settings.PORTOUT_RANGE_CLOSE_INTERVAL,
+    },
+    'sweep-port-in-batches': {
+        'task': 'tasks.bulk_port_in.sweep_port_in_batches',
+        'schedule': settings.BULK_PORT_IN_SWEEP_INTERVAL,
     },
 }
 
@@ -57,6 +57,41 @@ class Settings:
     # Server Configuration
     HOST = "0.0.0.0"
     PORT = 8000
+
+    # Prometheus: directory shared by the worker processes of one pod (multiprocess mode, set by
+    # gunicorn.conf.py; empty = single process) and the port of the separate metrics listener (0 = off)
+    PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR', '')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+    # Metrics listener of a Celery worker, started by its main process (0 = off). Pool children
+    # are only included when the worker also sets PROMETHEUS_MULTIPROC_DIR (compose.yml does)
+    CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT', '9101'))
+
+    # Admission control per API worker (api/core/admission.py): in-flight cap, share of it new
+    # submissions may use (the rest is kept for status/read endpoints), queue-time budgets,
+    # per-route limits ("/port-in=16,/cancel=8", paths relative to API_PREFIX) and exempt paths
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true'
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '64'))
+    ADMISSION_WRITE_SHARE = float(os.getenv('ADMISSION_WRITE_SHARE', '0.75'))
+    ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '128'))
+    ADMISSION_READ_QUEUE_MS = int(os.getenv('ADMISSION_READ_QUEUE_MS', '500'))
+    ADMISSION_WRITE_QUEUE_MS = int(os.getenv('ADMISSION_WRITE_QUEUE_MS', '200'))
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', '2'))
+    ADMISSION_ROUTE_LIMITS = os.getenv('ADMISSION_ROUTE_LIMITS', '/port-in=24,/port-in-legal=24,/cancel=8,/cancel-online=8,/return-request=8')
+    ADMISSION_READ_PATHS = os.getenv('ADMISSION_READ_PATHS', '/portin-status,/return-status,/msisdn-status,/orders-search,/query-msisdn')
+    ADMISSION_EXEMPT_PATHS = os.getenv('ADMISSION_EXEMPT_PATHS', '/,/health,/healthcheck,/health-db,/status,/metrics,/docs,/redoc,/openapi.json')
+
+    # Idempotency-Key support for BSS POST endpoints (api/core/idempotency.py, services/idempotency.py):
+    # routes relative to API_PREFIX, how long a key is kept, how long an unfinished claim blocks
+    # duplicates, how long a duplicate waits for the first response, and the Redis replay cache TTL
+    IDEMPOTENCY_ENABLED = os.getenv('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_PATHS = os.getenv('IDEMPOTENCY_PATHS', '/port-in,/port-in-legal,/port-in-legal/bulk,/cancel-online,/return-request')
+    IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '120'))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '30'))
+    IDEMPOTENCY_POLL_INTERVAL_MS = int(os.getenv('IDEMPOTENCY_POLL_INTERVAL_MS', '250'))
+    IDEMPOTENCY_RETRY_AFTER_SECONDS = int(os.getenv('IDEMPOTENCY_RETRY_AFTER_SECONDS', '5'))
+    IDEMPOTENCY_CACHE_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_CACHE_TTL_SECONDS', '3600'))
+    IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv('IDEMPOTENCY_PURGE_INTERVAL', '3600'))
     
     # Database Configuration
     DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -88,17 +123,72 @@ class Settings:
     JITTER_WINDOW_MINUTES = int(os.getenv('JITTER_WINDOW_MINUTES', '30'))  # Spread over 30 minutes
     JITTER_WINDOW_SECONDS = int(os.getenv('JITTER_WINDOW_SECONDS', '60'))  # Spread over 1 minute
 
-    TIME_DELTA_FOR_STATUS_CHECK = int(os.getenv('TIME_DELTA_FOR_STATUS_CHECK', '15'))  # 15 minutes
+    TIME_DELTA_FOR_STATUS_CHECK = int(os.getenv('TIME_DELTA_FOR_STATUS_CHECK', '15'))  # seconds, first check after a status change
     TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK = int(os.getenv('TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK', '15'))
     TIME_DELTA_FOR_RETURN_STATUS_CHECK = int(os.getenv('TIME_DELTA_FOR_RETURN_STATUS_CHECK', '15'))
     TIME_ZONE = os.getenv('TIME_ZONE', 'Europe/Madrid')
 
+    # NC throughput budget used to assign send slots to requests deferred to the next working window
+    # (services/database_service.py allocate_send_slot)
+    NC_THROUGHPUT_PER_MINUTE = int(os.getenv('NC_THROUGHPUT_PER_MINUTE', '60'))
+
+    # Bulk port-in (api/endpoints/bss_requests.py, tasks/bulk_port_in.py): max items per request,
+    # NC submissions per minute shared by all batches (bulk items only start once the deferred
+    # backlog of the window has been sent at NC_THROUGHPUT_PER_MINUTE, so the two rates never
+    # add up; online requests come on top of either), how often batches not yet dispatched
+    # (e.g. accepted outside working hours) are swept, and after how long an item still SUBMITTING
+    # (worker died during the NC call) is marked ERROR by the sweep
+    BULK_PORT_IN_MAX_ITEMS = int(os.getenv('BULK_PORT_IN_MAX_ITEMS', '500'))
+    BULK_PORT_IN_SUBMIT_PER_MINUTE = int(os.getenv('BULK_PORT_IN_SUBMIT_PER_MINUTE', '60'))
+    BULK_PORT_IN_SWEEP_INTERVAL = float(os.getenv('BULK_PORT_IN_SWEEP_INTERVAL', '60'))
+    BULK_PORT_IN_SUBMIT_TIMEOUT_SECONDS = int(os.getenv('BULK_PORT_IN_SUBMIT_TIMEOUT_SECONDS', '600'))
+
+    # Redis (Celery broker) also holds run locks and checkpoints, see services/redis_client.py
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
+
+    # Read-through cache of single portability requests (services/portability_cache.py): Redis TTL,
+    # in-process LRU size and TTL (bounds staleness in API workers), TTL of MSISDN -> latest port-in
+    PORTABILITY_CACHE_ENABLED = os.getenv('PORTABILITY_CACHE_ENABLED', 'true').lower() == 'true'
+    PORTABILITY_CACHE_TTL_SECONDS = int(os.getenv('PORTABILITY_CACHE_TTL_SECONDS', '300'))
+    PORTABILITY_CACHE_LOCAL_SIZE = int(os.getenv('PORTABILITY_CACHE_LOCAL_SIZE', '10000'))
+    PORTABILITY_CACHE_LOCAL_TTL_SECONDS = float(os.getenv('PORTABILITY_CACHE_LOCAL_TTL_SECONDS', '2'))
+    PORTABILITY_CACHE_MSISDN_TTL_SECONDS = int(os.getenv('PORTABILITY_CACHE_MSISDN_TTL_SECONDS', '30'))
+
+    # Celery result backend: default TTL of stored results and optional compression (e.g. 'zlib')
+    CELERY_RESULT_EXPIRES = int(os.getenv('CELERY_RESULT_EXPIRES', '3600'))  # seconds
+    CELERY_RESULT_COMPRESSION = os.getenv('CELERY_RESULT_COMPRESSION', '') or None
+
+    # Adaptive polling of NC status checks (see services/polling_policy.py)
+    POLLING_WINDOW_PROXIMITY_MINUTES = int(os.getenv('POLLING_WINDOW_PROXIMITY_MINUTES', '120'))
+    POLLING_NEAR_WINDOW_MINUTES = int(os.getenv('POLLING_NEAR_WINDOW_MINUTES', '5'))
+    POLLING_MAX_AGE_HOURS = int(os.getenv('POLLING_MAX_AGE_HOURS', '720'))  # 30 days
+    POLLING_MAX_AGE_INTERVAL_MINUTES = int(os.getenv('POLLING_MAX_AGE_INTERVAL_MINUTES', '1440'))
+    POLLING_DISPATCH_SPREAD_SECONDS = int(os.getenv('POLLING_DISPATCH_SPREAD_SECONDS', '30'))
+
+    # Return status check fan-out: rows claimed per page, max items dispatched per beat run,
+    # and how long a claimed row is hidden from the next run while its worker task is in flight
+    RETURN_STATUS_CHECK_BATCH_SIZE = int(os.getenv('RETURN_STATUS_CHECK_BATCH_SIZE', '50'))
+    RETURN_STATUS_CHECK_MAX_IN_FLIGHT = int(os.getenv('RETURN_STATUS_CHECK_MAX_IN_FLIGHT', '1000'))
+    RETURN_STATUS_CHECK_LEASE_SECONDS = int(os.getenv('RETURN_STATUS_CHECK_LEASE_SECONDS', '300'))
+
     WSDL_SERVICE_SPAIN_MOCK = os.getenv('WSDL_SERVICE_SPAIN_MOCK', '')
     WSDL_SERVICES_SPAIN_MOCK_CHECK_STATUS = os.getenv('WSDL_SERVICES_SPAIN_MOCK_CHECK_STATUS', '')
     WSDL_SERVICE_SPAIN_MOCK_CANCEL = os.getenv('WSDL_SERVICE_SPAIN_MOCK_CANCEL', '')
     BSS_WEBHOOK_URL = os.getenv('BSS_WEBHOOK_URL', '')
     BSS_WEBHOOK_PORT_OUT_URL = os.getenv('BSS_WEBHOOK_PORT_OUT_URL', '')
     BSS_WEBHOOK_URL_RETURN = os.getenv('BSS_WEBHOOK_URL_RETURN', '')
+    # Webhooks in flight per batch, also the size of the pooled BSS connection pool (services/bss_webhook.py)
+    BSS_WEBHOOK_CONCURRENCY = int(os.getenv('BSS_WEBHOOK_CONCURRENCY', '16'))
+    # Transactional outbox of BSS callbacks (services/bss_outbox.py, drained by tasks/outbox.py)
+    BSS_OUTBOX_DISPATCH_INTERVAL = float(os.getenv('BSS_OUTBOX_DISPATCH_INTERVAL', '5'))
+    BSS_OUTBOX_RUN_BUDGET_SECONDS = float(os.getenv('BSS_OUTBOX_RUN_BUDGET_SECONDS', '30'))
+    BSS_OUTBOX_BATCH_SIZE = int(os.getenv('BSS_OUTBOX_BATCH_SIZE', '200'))
+    BSS_OUTBOX_LEASE_SECONDS = int(os.getenv('BSS_OUTBOX_LEASE_SECONDS', '300'))
+    BSS_OUTBOX_MAX_ATTEMPTS = int(os.getenv('BSS_OUTBOX_MAX_ATTEMPTS', '10'))
+    BSS_OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('BSS_OUTBOX_RETRY_BASE_SECONDS', '30'))
+    BSS_OUTBOX_RETRY_MAX_SECONDS = int(os.getenv('BSS_OUTBOX_RETRY_MAX_SECONDS', '3600'))
+    BSS_OUTBOX_RETENTION_DAYS = int(os.getenv('BSS_OUTBOX_RETENTION_DAYS', '7'))
 
     SSL_VERIFICATION = os.getenv('SSL_VERIFICATION', '0').lower() in ('1', 'true', 'yes', 'on')
     
@@ -112,6 +202,18 @@ class Settings:
     APIGEE_PORT_OUT_URL = os.getenv('APIGEE_PORT_OUT_URL', '')
     APIGEE_BOLETIN_URL = os.getenv('APIGEE_BOLETIN_URL','')
     PAGE_COUNT_PORT_OUT = os.getenv('PAGE_COUNT_PORT_OUT', '')
+    # Port-out notifications written to the DB per executemany batch while streaming an NC page
+    PORT_OUT_INGEST_BATCH_SIZE = int(os.getenv('PORT_OUT_INGEST_BATCH_SIZE', '200'))
+    # Paging within one check_status_port_out run (services/portout_paging.py): time budget,
+    # page cap, and how long the Redis checkpoint of the next page code is kept
+    PORT_OUT_RUN_BUDGET_SECONDS = float(os.getenv('PORT_OUT_RUN_BUDGET_SECONDS', '60'))
+    PORT_OUT_MAX_PAGES_PER_RUN = int(os.getenv('PORT_OUT_MAX_PAGES_PER_RUN', '100'))
+    PORT_OUT_CURSOR_TTL_SECONDS = int(os.getenv('PORT_OUT_CURSOR_TTL_SECONDS', '900'))
+    # Redis seen-set of stored / submitted port-out reference codes (services/portout_seen.py)
+    PORT_OUT_SEEN_CACHE_ENABLED = os.getenv('PORT_OUT_SEEN_CACHE_ENABLED', 'true').lower() == 'true'
+    PORT_OUT_SEEN_TTL_SECONDS = int(os.getenv('PORT_OUT_SEEN_TTL_SECONDS', str(14 * 24 * 3600)))
+    # How often port-out MSISDN ranges past their port window are closed (tasks/housekeeping.py)
+    PORTOUT_RANGE_CLOSE_INTERVAL = float(os.getenv('PORTOUT_RANGE_CLOSE_INTERVAL', '3600'))
 
     PENDING_REQUESTS_TIMEOUT = float(os.getenv('PENDING_REQUESTS_TIMEOUT', '60.0'))  # seconds
     ITA_PENDING_REQUESTS_TIMEOUT = float(os.getenv('ITA_PENDING_REQUESTS_TIMEOUT', '900.0'))  # seconds
@@ -139,7 +241,20 @@ class Settings:
     APP_LOG_FILE = os.getenv('APP_LOG_FILE', '/var/log/mnp.log')
     PAYLOAD_LOG_FILE = os.getenv('PAYLOAD_LOG_FILE', '/var/log/payload.log')
     SAVE_PAYLOAD_TO_LOG = int(os.getenv('SAVE_PAYLOAD_TO_LOG', '3'))
-    
+    # Bounded queue between the loggers and their background writer thread (records dropped when full)
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # Payload logging per direction: max bytes kept (0 = no cap) and fraction of payloads logged
+    PAYLOAD_LOG_MAX_BYTES_REQUEST = int(os.getenv('PAYLOAD_LOG_MAX_BYTES_REQUEST', '16384'))
+    PAYLOAD_LOG_MAX_BYTES_RESPONSE = int(os.getenv('PAYLOAD_LOG_MAX_BYTES_RESPONSE', '65536'))
+    PAYLOAD_LOG_SAMPLE_RATE_REQUEST = float(os.getenv('PAYLOAD_LOG_SAMPLE_RATE_REQUEST', '1.0'))
+    PAYLOAD_LOG_SAMPLE_RATE_RESPONSE = float(os.getenv('PAYLOAD_LOG_SAMPLE_RATE_RESPONSE', '1.0'))
+    # Indexed compressed payload archive (services/payload_archive.py): segments rotate at
+    # PAYLOAD_ARCHIVE_SEGMENT_BYTES and are deleted after PAYLOAD_ARCHIVE_RETENTION_DAYS
+    PAYLOAD_ARCHIVE_ENABLED = os.getenv('PAYLOAD_ARCHIVE_ENABLED', 'true').lower() == 'true'
+    PAYLOAD_ARCHIVE_DIR = os.getenv('PAYLOAD_ARCHIVE_DIR', '/var/log/payload_archive')
+    PAYLOAD_ARCHIVE_SEGMENT_BYTES = int(os.getenv('PAYLOAD_ARCHIVE_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+    PAYLOAD_ARCHIVE_RETENTION_DAYS = int(os.getenv('PAYLOAD_ARCHIVE_RETENTION_DAYS', '90'))
+
     # Load all Italy MNP message schedules
     ITA_MSG_SCHEDULES = {}
 
@@ -161,6 +276,14 @@ class Settings:
     vendors_str = os.getenv('ITA_VENDORS_LIST', '')
     if vendors_str:
         ITA_VENDORS_LIST = [v.strip() for v in vendors_str.split(',') if v.strip()]
+
+    # Italy MNP XSD validation: schema file, and files above MNP_XSD_POOL_THRESHOLD_BYTES are
+    # validated in a process pool of MNP_XSD_POOL_WORKERS. Opt-in: when enabled, /receive answers
+    # 400 to files that parse but do not match mnp_schema.xsd, which it accepted before
+    MNP_XSD_VALIDATION = os.getenv('MNP_XSD_VALIDATION', 'false').lower() == 'true'
+    MNP_SCHEMA_PATH = os.getenv('MNP_SCHEMA_PATH', 'mnp_schema.xsd')
+    MNP_XSD_POOL_THRESHOLD_BYTES = int(os.getenv('MNP_XSD_POOL_THRESHOLD_BYTES', '262144'))
+    MNP_XSD_POOL_WORKERS = int(os.getenv('MNP_XSD_POOL_WORKERS', '2'))
     
     # Database configuration as dict (for existing db_utils compatibility)
     @property
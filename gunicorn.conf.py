@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings of the API (Dockerfile: gunicorn -k uvicorn.workers.UvicornWorker main:app).
+
+Each UvicornWorker is a separate process with its own Prometheus counters, and /api/v1/metrics
+would only show the worker that happened to answer the scrape. Prometheus multiprocess mode
+lets the workers write their values to PROMETHEUS_MULTIPROC_DIR instead:
+
+- on_starting   empties the directory, so values of a previous run are not merged in
+- when_ready    the master serves the merged metrics on METRICS_PORT, so a scrape neither
+                waits behind business requests nor depends on a healthy worker
+- child_exit    marks a dead worker's live gauges as gone (a restarted worker gets a new pid)
+
+The directory must be set before any worker imports prometheus_client, hence here.
+"""
+import os
+import shutil
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/mnp-prometheus")
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def when_ready(server):
+    # Only prometheus_client here: the master must not create metric files of its own
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+    port = int(os.getenv("METRICS_PORT", "9100"))
+    if not port:
+        return
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(port, registry=registry)
+    except OSError as e:
+        server.log.warning("Metrics port %s not started: %s", port, e)
+        return
+    server.log.info("Prometheus metrics on port %s", port)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -8,12 +8,17 @@ from config import settings
 from services.logger_simple import logger
 import secrets
 from api.v2.endpoints import health as health_v2
-from api.v1 import bss, metrics, orders, return_request, msisdn_status, port_status
+from api.v1 import bss, metrics, orders, return_request, msisdn_status, port_status, payload_archive, portout_msisdn
 from api.core.middleware import prometheus_middleware
+from api.core.admission import admission_middleware
+from api.core.idempotency import idempotency_middleware
+from api.core.responses import FastJSONResponse
+from api.core.metrics import start_metrics_server
 import logging
 from fastapi.logger import logger as fastapi_logger
 from api.v1.italy import type_1_activation, type_1_activation_async
-from start import init_schema
+from start import init_schema, close_schema
+from services.log_queue import flush_queue_logging
 
 # Configure Uvicorn to use custom JSON logger
 uvicorn_logger = logging.getLogger("uvicorn")
@@ -39,11 +44,16 @@ async def lifespan(app: FastAPI):
     # RUN ON STARTUP ONCE PER WORKER
     init_schema(app)  
     print("XML Schema initialized")
+    if not settings.PROMETHEUS_MULTIPROC_DIR:
+        # Plain uvicorn: one process serves the metrics port (under gunicorn the master does)
+        start_metrics_server(settings.METRICS_PORT)
 
     yield  # ---> Application is now running
 
     # RUN ON SHUTDOWN
+    close_schema(app)
     print("Shutting down")
+    flush_queue_logging()  # write out queued log records before the worker exits
 
 app = FastAPI(
     title=settings.API_TITLE,           # Refer as settings.API_TITLE
@@ -51,6 +61,7 @@ app = FastAPI(
     version=settings.API_VERSION, # Refer as settings.API_VERSION
     docs_url=None,  # Disable default docs
     redoc_url=None,  # Disable default redoc
+    default_response_class=FastJSONResponse,  # orjson rendering, see api/core/responses.py
     lifespan=lifespan
 )
 
@@ -149,7 +160,10 @@ app.include_router(
     # tags=["BSS Webhook"]
 )
 
-# Add middleware
+# Add middleware (admission control runs inside the metrics middleware, so rejections are counted;
+# idempotency keys are resolved before admission, so replays and waiting duplicates take no slot)
+app.middleware("http")(admission_middleware)
+app.middleware("http")(idempotency_middleware)
 app.middleware("http")(prometheus_middleware)
 
 # Include metrics router
@@ -186,6 +200,18 @@ app.include_router(
     # tags=["BSS Webhook"]
 )
 
+# include payload archive admin router
+app.include_router(
+    payload_archive.router,
+    prefix=settings.API_PREFIX,      # Refer as settings.API_V1_PREFIX
+)
+
+# include port-out MSISDN lookup router
+app.include_router(
+    portout_msisdn.router,
+    prefix=settings.API_PREFIX,      # Refer as settings.API_V1_PREFIX
+)
+
 @app.get("/",
         include_in_schema=False  # This hides the endpoint from Swagger)
         )
@@ -27,7 +27,7 @@ def msisdn_status_check_nc(msisdn: str) -> Tuple[bool, Optional[str], Optional[D
         soap_payload = msisdn_status_check(session_code, msisdn)
         logger.debug("Generated SOAP payload for MSISDN status check")
         logger.debug("MSISDN_CHECK->NC: %s\n", soap_payload)
-        log_payload('NC', 'MSISDN_CHECK', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'MSISDN_CHECK', 'REQUEST', soap_payload)
         
         # Step 3: Send request to NC
         logger.debug("Sending MSISDN status check request to NC")
@@ -41,7 +41,7 @@ def msisdn_status_check_nc(msisdn: str) -> Tuple[bool, Optional[str], Optional[D
         
         # Step 4: Parse SOAP response with correct field names
         logger.debug("Received response from NC, parsing...")
-        log_payload('NC', 'MSISDN_CHECK', 'RESPONSE', str(response.text))
+        log_payload('NC', 'MSISDN_CHECK', 'RESPONSE', response.content)
         logger.debug("MSISDN_CHECK_RESPONSE<-NC:\n%s", str(response.text))
         
         # Parse the response based on actual SOAP structure
@@ -55,7 +55,7 @@ def msisdn_status_check_nc(msisdn: str) -> Tuple[bool, Optional[str], Optional[D
             "portada"
         ]
 
-        parsed_tuple = parse_soap_response_list(response.text, field_names)
+        parsed_tuple = parse_soap_response_list(response.content, field_names)
         parsed_dict = dict(zip(field_names, parsed_tuple))
         
         response_code = parsed_dict.get("codigoRespuesta")
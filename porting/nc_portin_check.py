@@ -35,7 +35,7 @@ def portin_status_check_nc(msisdn: str, reference_code: str) -> Tuple[bool, Opti
         # soap_payload = create_status_check_soap(mnp_request_id, session_code, msisdn)
         soap_payload = create_status_check_soap_nc(mnp_request_id, session_code, msisdn)
         logger.debug("Generated SOAP payload for MSISDN status check with refeernce_code: %s and MSISDM: %s ", reference_code, msisdn )
-        log_payload('NC', 'MSISDN_CHECK', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'MSISDN_CHECK', 'REQUEST', soap_payload)
         
         # Step 3: Send request to NC
         logger.debug("Sending MSISDN status check request to NC")
@@ -54,7 +54,7 @@ def portin_status_check_nc(msisdn: str, reference_code: str) -> Tuple[bool, Opti
         
         fields = ["tipoProceso", "codigoRespuesta", "descripcion", "codigoReferencia", "estado","fechaVentanaCambio","fechaCreacion","causaRechazo","fechaRechazo"]
 
-        result = parse_soap_response_nested_multi(str(response.text), fields, reference_code)
+        result = parse_soap_response_nested_multi(response.content, fields, reference_code)
 
         if result is None:
             result = [None] * len(fields)
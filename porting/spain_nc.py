@@ -10,7 +10,8 @@ import re
 from services.soap_services import parse_soap_response_list, create_status_check_soap_nc, create_initiate_soap, parse_soap_response_dict, parse_soap_response_dict_flat, json_from_db_to_soap_online, json_from_db_to_soap_cancel_online
 from services.time_services import calculate_countdown
 from datetime import datetime, timedelta
-from services.database_service import get_db_connection
+from services.database_service import get_db_connection, CLOSE_PORTOUT_MSISDN_RANGES_SQL
+from services.portability_cache import invalidate_portability_request
 from config import settings
 from services.time_services import calculate_countdown_working_hours
 from services.logger import logger, payload_logger, log_payload
@@ -43,7 +44,7 @@ def initiate_session():
                                timeout=settings.APIGEE_API_QUERY_TIMEOUT)
         # log_payload('NC', 'INITIATE_SESSION', 'RESPONCE', str(response.text))
 
-        result_dict = parse_soap_response_dict_flat(response.text, ["codigoRespuesta", "descripcion", "codigoSesion"])
+        result_dict = parse_soap_response_dict_flat(response.content, ["codigoRespuesta", "descripcion", "codigoSesion"])
     
         # Now these assignments are type-safe
         response_code = result_dict["codigoRespuesta"]
@@ -102,7 +103,7 @@ def submit_to_central_node_online(mnp_request_id) -> Tuple[bool, Optional[str],
         
         logger.debug("Submit to NC: Generated SOAP Request:")
         logger.debug("PORT_IN_REQUEST->NC:\n%s", str(soap_payload))
-        log_payload('NC', 'PORT_IN', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'PORT_IN', 'REQUEST', soap_payload)
 
         # 4. Try to send the request to Central Node
         if not APIGEE_PORTABILITY_URL:
@@ -118,17 +119,17 @@ def submit_to_central_node_online(mnp_request_id) -> Tuple[bool, Optional[str],
 
         # 5. Parse the SOAP response
         # print("Parsing SOAP response...", response.text)
-        log_payload('NC', 'PORT_IN', 'RESPONSE', str(response.text))
+        log_payload('NC', 'PORT_IN', 'RESPONSE', response.content)
         logger.debug("PORT_IN_RESPONSE<-NC:\n%s", str(response.text))
         
         # result = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         # response_code, description, reference_code,porting_window_date = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia","fechaVentanaCambio"])
         # result = parse_soap_response_dict(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         # Get the result first without unpacking
-        result = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia", "fechaVentanaCambio"])
+        result = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia", "fechaVentanaCambio"])
 
         # Conditional payload logging - only once
-        log_payload('NC', 'PORT_IN', 'RESPONSE', str(response.text))
+        log_payload('NC', 'PORT_IN', 'RESPONSE', response.content)
         logger.debug("PORT_IN_RESPONSE<-NC:\n%s", str(response.text))
 
         if result and len(result) == 4:
@@ -170,7 +171,7 @@ def submit_to_central_node_online(mnp_request_id) -> Tuple[bool, Optional[str],
         logger.error("HTTP error submitting to Central Node: %s", e)  # Remove curly braces
         error_msg = f"HTTP Error: {str(e)}"
         if hasattr(e, 'response') and e.response is not None:
-            log_payload('NC', 'PORT_IN', 'RESPONSE', str(e.response.text))
+            log_payload('NC', 'PORT_IN', 'RESPONSE', e.response.text)
             logger.debug("PORT_IN_RESPONSE<-NC (Error):\n%s", str(e.response.text))
             error_msg += f" - Status: {e.response.status_code}"
         
@@ -214,6 +215,7 @@ def submit_to_central_node_online(mnp_request_id) -> Tuple[bool, Optional[str],
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 def submit_to_central_node_cancel_online(mnp_request_id):
     """
@@ -261,7 +263,7 @@ def submit_to_central_node_cancel_online(mnp_request_id):
         # print(soap_payload)
         # Conditional payload logging
         logger.debug("CANCEL_REQUEST->NC: %s\n", soap_payload)
-        log_payload('NC', 'CANCEL', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'CANCEL', 'REQUEST', soap_payload)
 
         # 4. Try to send the request to Central Node
         # if not WSDL_SERVICE_SPAIN_MOCK_CANCEL:
@@ -282,11 +284,11 @@ def submit_to_central_node_cancel_online(mnp_request_id):
 
         # 5. Parse the SOAP response (use your existing logic)
         # session_code, status = parse_soap_response_list(response.text,)
-        response_code, description, reference_code = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
+        response_code, description, reference_code = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         print(f"Cancel to NC: Received response: response_code={response_code}, description={description}, reference_code={reference_code}")
 
         # Conditional payload logging
-        log_payload('NC', 'CANCEL', 'RESPONSE', str(response.text))
+        log_payload('NC', 'CANCEL', 'RESPONSE', response.content)
         logger.debug("CANCEL_RESPONSE<-NC:\n%s", str(response.text))
 # Received response: 
 # response_code=400, description=Campos obligatorios faltantes: fechaSolicitudPorAbonado, codigoOperadorDonante, 
@@ -414,6 +416,7 @@ def submit_to_central_node_cancel_online(mnp_request_id):
         if connection and connection.is_connected():
             cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 def submit_to_central_node_cancel_online_sync(mnp_request_id: int) -> Tuple[bool, Optional[str], Optional[str]]:
     """
@@ -443,7 +446,7 @@ def submit_to_central_node_cancel_online_sync(mnp_request_id: int) -> Tuple[bool
         
         logger.debug("Submit Cancellation to NC: Generated SOAP Request")
         logger.debug("CANCEL_REQUEST->NC:\n%s",str(soap_payload))
-        log_payload('NC', 'CANCEL', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'CANCEL', 'REQUEST', soap_payload)
 
         # Send to NC API
         response = requests.post(
@@ -455,13 +458,13 @@ def submit_to_central_node_cancel_online_sync(mnp_request_id: int) -> Tuple[bool
         response.raise_for_status()
 
         # Parse the SOAP response
-        log_payload('NC', 'CANCEL', 'RESPONSE', str(response.text))
+        log_payload('NC', 'CANCEL', 'RESPONSE', response.content)
         logger.debug("CANCEL_RESPONSE<-NC:\n%s", str(response.text))
 
         
         # Parse response including campoErroneo
         # response_code, description, campo_erroneo = parse_cancel_soap_response(response.text)
-        response_code, description, reference_code = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
+        response_code, description, reference_code = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         print(f"Cancel to NC: Received response: response_code={response_code}, description={description}")
         
         # Determine success
@@ -497,6 +500,7 @@ def submit_to_central_node_cancel_online_sync(mnp_request_id: int) -> Tuple[bool
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 from services.soap_services import soap_port_out_reject, soap_port_out_confirm
 from typing import Tuple, Optional
@@ -554,7 +558,7 @@ def submit_to_central_node_port_out_reject_new(alta_data: dict) -> Tuple[bool, O
         log_payload('NC', 'REJECT_PORT_OUT', 'RESPONSE', response.text)
         logger.debug("SOAP Response:\n%s", response.text)
 
-        result = parse_soap_response_dict(response.text, ["codigoRespuesta", "descripcion"])
+        result = parse_soap_response_dict(response.content, ["codigoRespuesta", "descripcion"])
         response_code = result.get("codigoRespuesta")
         description = result.get("descripcion")
 
@@ -580,6 +584,9 @@ def submit_to_central_node_port_out_reject_new(alta_data: dict) -> Tuple[bool, O
             WHERE reference_code = %s
         """
         cursor.execute(update_query, (status_nc, status_bss, response_code, description, confirm_reject, cancellation_reason, reference_code))
+        if success:
+            # The number no longer takes part in a port-out (/portout-msisdn)
+            cursor.execute(CLOSE_PORTOUT_MSISDN_RANGES_SQL, (reference_code,))
         connection.commit()
 
         return success, response_code, description
@@ -648,7 +655,7 @@ def submit_to_central_node_port_out_reject(alta_data: dict) -> Tuple[bool, Optio
 
         # logger.debug("Reject Port-Out request to NC: Generated SOAP Request")
         logger.debug("REJECT_PORT_OUT->NC:\n%s",str(soap_payload))
-        log_payload('NC', 'REJECT_PORT_OUT', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'REJECT_PORT_OUT', 'REQUEST', soap_payload)
 
         # Send to NC API
         response = requests.post(
@@ -660,14 +667,14 @@ def submit_to_central_node_port_out_reject(alta_data: dict) -> Tuple[bool, Optio
         response.raise_for_status()
 
         # Parse the SOAP response
-        log_payload('NC', 'REJECT_PORT_OUT', 'RESPONSE', str(response.text))
+        log_payload('NC', 'REJECT_PORT_OUT', 'RESPONSE', response.content)
         logger.debug("REJECT_PORT_OUT<-NC:\n%s", str(response.text))
 
         
         # Parse response including campoErroneo
         # response_code, description, campo_erroneo = parse_cancel_soap_response(response.text)
         # response_code, description, reference_code = parse_soap_response_dict(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
-        result = parse_soap_response_dict(response.text,["codigoRespuesta", "descripcion"])
+        result = parse_soap_response_dict(response.content,["codigoRespuesta", "descripcion"])
 
         response_code = result['codigoRespuesta']
         description = result['descripcion']
@@ -692,6 +699,9 @@ def submit_to_central_node_port_out_reject(alta_data: dict) -> Tuple[bool, Optio
         # logger.debug("UPDATE portout_request SET status_nc = %s, status_bss = %s, response_code = %s, description = %s WHERE reference_code = %s", 
         #      status_nc, status_bss, response_code, description, reference_code)
         cursor.execute(update_query, (status_nc, status_bss, response_code, description, confrim_reject, cancellation_reason, reference_code))
+        if success:
+            # The number no longer takes part in a port-out (/portout-msisdn)
+            cursor.execute(CLOSE_PORTOUT_MSISDN_RANGES_SQL, (reference_code,))
         connection.commit()
 
         return success, response_code, description
@@ -752,7 +762,7 @@ def submit_to_central_node_port_out_confirm(alta_data: dict) -> Tuple[bool, Opti
 
         # logger.debug("Reject Port-Out request to NC: Generated SOAP Request")
         logger.debug("CONFIRM_PORT_OUT->NC:\n%s",str(soap_payload))
-        log_payload('NC', 'CONFIRM_PORT_OUT', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'CONFIRM_PORT_OUT', 'REQUEST', soap_payload)
 
         # Send to NC API
         response = requests.post(
@@ -764,14 +774,14 @@ def submit_to_central_node_port_out_confirm(alta_data: dict) -> Tuple[bool, Opti
         response.raise_for_status()
 
         # Parse the SOAP response
-        log_payload('NC', 'CONFIRM_PORT_OUT', 'RESPONSE', str(response.text))
+        log_payload('NC', 'CONFIRM_PORT_OUT', 'RESPONSE', response.content)
         logger.debug("CONFIRM_PORT_OUT<-NC:\n%s", str(response.text))
 
         
         # Parse response including campoErroneo
         # response_code, description, campo_erroneo = parse_cancel_soap_response(response.text)
         # response_code, description, reference_code = parse_soap_response_dict(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
-        result = parse_soap_response_dict(response.text,["codigoRespuesta", "descripcion"])
+        result = parse_soap_response_dict(response.content,["codigoRespuesta", "descripcion"])
 
         response_code = result['codigoRespuesta']
         description = result['descripcion']
@@ -924,4 +934,5 @@ def callback_bss_online(mnp_request_id, reference_code, reject_code, session_cod
     finally:
         if 'connection' in locals() and connection and connection.is_connected():
             cursor.close()
-            connection.close()
\ No newline at end of file
+            connection.close()
+        invalidate_portability_request(mnp_request_id)
\ No newline at end of file
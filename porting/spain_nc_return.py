@@ -57,7 +57,7 @@ def submit_to_central_node_return(mnp_request_id, current_retry=0, max_retries=3
         
         # Conditional payload logging
         logger.debug("RETURN_REQUEST->NC: %s\n", soap_payload)
-        log_payload('NC', 'RETURN', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'RETURN', 'REQUEST', soap_payload)
 
         # 4. Try to send the request to Central Node
         if not APIGEE_PORTABILITY_URL:
@@ -76,7 +76,7 @@ def submit_to_central_node_return(mnp_request_id, current_retry=0, max_retries=3
 
         # 5. Parse the SOAP response
         parsed = parse_soap_response_list(
-            response.text, 
+            response.content, 
             ["codigoRespuesta", "descripcion", "codigoReferencia"]
         )
         # Ensure we have three values to unpack; pad with None if necessary
@@ -269,7 +269,7 @@ def submit_to_central_node_cancel_return(mnp_request_id, current_retry=0, max_re
         
         # Conditional payload logging
         logger.debug("CANCEL_RETURN_REQUEST->NC: %s\n", soap_payload)
-        log_payload('NC', 'CANCEL_RETURN', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'CANCEL_RETURN', 'REQUEST', soap_payload)
 
         # 4. Try to send the request to Central Node
         if not APIGEE_PORTABILITY_URL:
@@ -288,7 +288,7 @@ def submit_to_central_node_cancel_return(mnp_request_id, current_retry=0, max_re
 
         # 5. Parse the SOAP response
         parsed = parse_soap_response_list(
-            response.text, 
+            response.content, 
             ["codigoRespuesta", "descripcion", "codigoReferencia"]
         )
         # Ensure we have three values to unpack; pad with None if necessary
@@ -302,7 +302,7 @@ def submit_to_central_node_cancel_return(mnp_request_id, current_retry=0, max_re
                    response_code, description, reference_code)
 
         # Conditional payload logging
-        log_payload('NC', 'RETURN', 'RESPONSE', str(response.text))
+        log_payload('NC', 'RETURN', 'RESPONSE', response.content)
         logger.debug("RETURN_RESPONSE<-NC:\n%s", str(response.text))
 
         # 6. Process response code
@@ -456,7 +456,7 @@ def submit_to_central_node_return_status_check(reference_code: str, current_retr
         
         # Log the exact payload being sent
         logger.debug("FULL SOAP REQUEST:\n%s", soap_payload)
-        log_payload('NC', 'STATUS_CHECK_RETURN', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'STATUS_CHECK_RETURN', 'REQUEST', soap_payload)
 
         # 3. Validate URL
         if not APIGEE_PORTABILITY_URL:
@@ -479,7 +479,7 @@ def submit_to_central_node_return_status_check(reference_code: str, current_retr
                     "fechaBajaAbonado", "codigoOperadorReceptor", "codigoOperadorDonante", "estado",
                     "causaEstado", "fechaVentanaCambio"]
 
-        parsed_tuple = parse_soap_response_list(response.text, field_names)
+        parsed_tuple = parse_soap_response_list(response.content, field_names)
         parsed_dict = dict(zip(field_names, parsed_tuple))
         
         # DEBUG: Print parsing results
@@ -500,7 +500,7 @@ def submit_to_central_node_return_status_check(reference_code: str, current_retr
         #            response_code, description, final_reference_code)
 
         # Conditional payload logging
-        log_payload('NC', 'RETURN_STATUS_CHECK', 'RESPONSE', str(response.text))
+        log_payload('NC', 'RETURN_STATUS_CHECK', 'RESPONSE', response.content)
         logger.debug("RETURN_STATUS_CHECK_RESPONSE<-NC:\n%s", str(response.text))
 
         return parsed_dict
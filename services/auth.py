@@ -1,8 +1,11 @@
 # auth.py
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi import Depends, HTTPException, status
+import base64
+import binascii
 import secrets
 import os
+from typing import Optional
 from config import settings
 
 security = HTTPBasic()
@@ -20,4 +23,21 @@ def verify_basic_auth(credentials: HTTPBasicCredentials = Depends(security)):
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Basic"},
         )
-    return credentials.username
\ No newline at end of file
+    return credentials.username
+
+
+def is_basic_auth_valid(authorization: Optional[str]) -> bool:
+    """
+    Check a raw Authorization header against the API credentials (for middleware, which runs
+    before verify_basic_auth)
+    """
+    scheme, _, encoded = (authorization or "").partition(" ")
+    if scheme.lower() != "basic" or not encoded:
+        return False
+    try:
+        username, _, password = base64.b64decode(encoded, validate=True).partition(b":")
+    except binascii.Error:
+        return False
+    correct_username = secrets.compare_digest(username, settings.API_USERNAME.encode("utf-8"))
+    correct_password = secrets.compare_digest(password, settings.API_PASSWORD.encode("utf-8"))
+    return correct_username and correct_password
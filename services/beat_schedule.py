@@ -0,0 +1,35 @@
+"""
+Working-hours-aware Celery beat schedule.
+
+Outside working hours (nights, weekends, NATIONAL_HOLIDAYS) the NC pollers have nothing to do,
+so instead of waking on every interval just to return "Outside working hours" the schedule tells
+beat to come back when the next window opens. At window open the last run is older than the
+interval, so every poller fires immediately and the backlog accumulated overnight is claimed
+right away.
+"""
+from datetime import datetime
+
+from celery.schedules import schedule, schedstate  # type: ignore
+
+from config import settings
+from services.time_services import is_working_hours_now, get_next_window_start
+
+
+class working_hours_schedule(schedule):
+    """Interval schedule that only fires inside MORNING/AFTERNOON working windows"""
+
+    def is_due(self, last_run_at: datetime) -> schedstate:
+        if settings.IGNORE_WORKING_HOURS:
+            return super().is_due(last_run_at)
+
+        # beat runs with timezone Europe/Madrid and enable_utc=False, time_services works on naive local time
+        now = self.now().replace(tzinfo=None)
+        if is_working_hours_now(now):
+            return super().is_due(last_run_at)
+
+        next_window_start = get_next_window_start(now)
+        # beat_max_loop_interval still caps how long beat actually sleeps
+        return schedstate(is_due=False, next=max((next_window_start - now).total_seconds(), 1.0))
+
+    def __repr__(self) -> str:
+        return f'<freq: {self.human_seconds}, working hours only>'
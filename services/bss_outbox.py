@@ -0,0 +1,299 @@
+"""
+Transactional outbox for BSS callbacks.
+
+Status changes used to commit first and then hand the callback to Celery with .delay(), so a
+crash between the two lost the callback, and a failed webhook re-ran the whole task. Now the
+code path that changes a status also inserts the callback into bss_outbox with the same
+cursor, before its commit: either both are stored or neither is.
+
+tasks/outbox.py drains the table:
+
+    claim_batch()      SELECT ... FOR UPDATE SKIP LOCKED of due PENDING rows, leased by
+                       pushing next_attempt_at forward, then committed (no locks held
+                       while BSS is called)
+    deliver_batch()    rows grouped by (endpoint, ordering_key); groups are posted
+                       concurrently over the pooled BSS session, rows of a group one after
+                       the other in id order, and a failure stops the rest of its group
+    complete_batch()   one transaction: delivered rows and their source rows
+                       (status_bss, submitted_to_bss) updated with UPDATE ... IN, failed rows
+                       rescheduled with exponential backoff or given up, unattempted rows
+                       released
+
+A row whose delivery succeeded but whose completion was lost is posted again on the next
+claim: delivery is at-least-once. Callbacks of one request (ordering_key) are delivered in
+the order they were written; a row is not claimed while an older row of the same key waits
+for a retry.
+"""
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from services.bss_webhook import WebhookResult, get_bss_session, post_webhook
+from services.logger import logger
+
+ENDPOINT_PORT_IN = "port_in"
+ENDPOINT_PORT_OUT = "port_out"
+ENDPOINT_RETURN = "return"
+
+# Source row updated once the callback is delivered: endpoint -> (table, extra SET clause)
+ACK_TABLES = {
+    ENDPOINT_PORT_IN: ("portability_requests", ""),
+    ENDPOINT_PORT_OUT: ("portout_request", ", submitted_to_bss = 1"),
+}
+
+OUTBOX_INSERT_SQL = """
+    INSERT INTO bss_outbox (endpoint, ordering_key, payload, source_id, status_bss)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+CLAIM_SQL = """
+    SELECT o.id, o.endpoint, o.ordering_key, o.payload, o.source_id, o.status_bss, o.attempts
+    FROM bss_outbox o
+    WHERE o.status = 'PENDING'
+      AND o.next_attempt_at <= NOW()
+      AND NOT EXISTS (
+          SELECT 1 FROM bss_outbox b
+          WHERE b.endpoint = o.endpoint
+            AND b.ordering_key = o.ordering_key
+            AND b.status = 'PENDING'
+            AND b.id < o.id
+            AND b.next_attempt_at > NOW()
+      )
+    ORDER BY o.id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+
+def endpoint_url(endpoint: str) -> str:
+    return {
+        ENDPOINT_PORT_IN: settings.BSS_WEBHOOK_URL,
+        ENDPOINT_PORT_OUT: settings.BSS_WEBHOOK_PORT_OUT_URL,
+        ENDPOINT_RETURN: settings.BSS_WEBHOOK_URL_RETURN,
+    }[endpoint]
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+# Payloads
+
+def port_in_payload(mnp_request_id, reference_code, response_status, msisdn, response_code, description,
+                    reject_reason=None, reject_date=None, porting_window_date=None, error_fields=None) -> Dict[str, Any]:
+    """JSON body of the port-in status webhook (BSS_WEBHOOK_URL), as posted by callback_bss"""
+    porting_window_str = porting_window_date.isoformat() if isinstance(porting_window_date, (datetime, date)) else porting_window_date
+    return {
+        "request_id": mnp_request_id,
+        "request_type": "Port-IN status update",
+        "reference_code": reference_code,
+        "msisdn": msisdn,
+        "response_code": response_code,
+        "response_status": response_status,
+        "description": description or f"Status update for MNP request {mnp_request_id}",
+        "reject_reason": reject_reason or "",
+        "reject_date": reject_date or "",
+        "error_fields": error_fields or [],
+        "porting_window_date": porting_window_str or "",
+    }
+
+
+def port_in_status_bss(response_status, response_code) -> str:
+    """status_bss written to portability_requests once the port-in callback is delivered"""
+    return "STATUS_UPDATED_TO_" + (response_status or response_code or "").upper()
+
+
+def return_payload(reference_code, msisdn, nc_response_dict) -> Dict[str, Any]:
+    """JSON body of the return webhook (BSS_WEBHOOK_URL_RETURN), as posted by callback_bss_return"""
+    return {
+        "reference_code": reference_code,
+        "request_type": "Return",
+        "msisdn": msisdn,
+        **nc_response_dict,
+    }
+
+
+# Writers (caller's cursor and transaction)
+
+def enqueue_bss_callback(cursor, endpoint: str, ordering_key: Any, payload: Dict[str, Any],
+                         source_id: Optional[int] = None, status_bss: Optional[str] = None) -> None:
+    """Write one callback with the caller's cursor; it is stored by the caller's commit"""
+    cursor.execute(OUTBOX_INSERT_SQL, (
+        endpoint, str(ordering_key), json.dumps(payload, ensure_ascii=False, default=_json_default),
+        source_id, status_bss
+    ))
+
+
+def enqueue_port_in_callback(cursor, mnp_request_id, reference_code, response_status, msisdn, response_code, description,
+                             reject_reason=None, reject_date=None, porting_window_date=None, error_fields=None) -> None:
+    """Port-in status callback, ordered per portability_requests.id"""
+    payload = port_in_payload(mnp_request_id, reference_code, response_status, msisdn, response_code, description,
+                              reject_reason, reject_date, porting_window_date, error_fields)
+    enqueue_bss_callback(cursor, ENDPOINT_PORT_IN, mnp_request_id, payload,
+                         source_id=mnp_request_id, status_bss=port_in_status_bss(response_status, response_code))
+
+
+def enqueue_return_callback(cursor, reference_code, msisdn, nc_response_dict) -> None:
+    """Return status callback, ordered per reference_code"""
+    enqueue_bss_callback(cursor, ENDPOINT_RETURN, reference_code, return_payload(reference_code, msisdn, nc_response_dict))
+
+
+def enqueue_port_out_callbacks(cursor, notifications: Iterable[Tuple[int, Any]]) -> int:
+    """
+    Port-out notifications (portout_request id, PortOutNotification) not yet queued, ordered
+    per reference_code. Requests that already have a PENDING row are skipped, so a
+    notification NC keeps returning is queued once.
+    """
+    notifications = list(notifications)
+    if not notifications:
+        return 0
+    placeholders = ", ".join(["%s"] * len(notifications))
+    cursor.execute(
+        f"SELECT source_id FROM bss_outbox WHERE endpoint = %s AND status = 'PENDING' AND source_id IN ({placeholders})",
+        [ENDPOINT_PORT_OUT] + [request_id for request_id, _ in notifications]
+    )
+    queued = {row["source_id"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+    rows = [
+        (ENDPOINT_PORT_OUT, record.reference_code,
+         json.dumps(record.to_bss_json(), ensure_ascii=False, default=_json_default),
+         request_id, "PORT_OUT_REQUEST_SUBMITTED")
+        for request_id, record in notifications if request_id not in queued
+    ]
+    if rows:
+        cursor.executemany(OUTBOX_INSERT_SQL, rows)
+    return len(rows)
+
+
+# Dispatcher steps (tasks/outbox.py)
+
+def claim_batch(connection, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Lock, lease and return up to limit due rows; committed before delivery"""
+    limit = limit or settings.BSS_OUTBOX_BATCH_SIZE
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(CLAIM_SQL, (limit,))
+        rows = cursor.fetchall()
+        if rows:
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                f"UPDATE bss_outbox SET next_attempt_at = NOW() + INTERVAL %s SECOND WHERE id IN ({placeholders})",
+                [settings.BSS_OUTBOX_LEASE_SECONDS] + [row["id"] for row in rows]
+            )
+        connection.commit()
+        return rows
+    finally:
+        cursor.close()
+
+
+def _deliver_group(rows: List[Dict[str, Any]], session) -> List[Tuple[Dict[str, Any], WebhookResult]]:
+    outcomes = []
+    for row in rows:
+        payload = json.loads(row["payload"]) if isinstance(row["payload"], (str, bytes)) else row["payload"]
+        result = post_webhook(endpoint_url(row["endpoint"]), row["ordering_key"], payload, session=session)
+        outcomes.append((row, result))
+        if not result.ok:
+            break  # keep per-key order: later callbacks wait for this one
+    return outcomes
+
+
+def deliver_batch(rows: List[Dict[str, Any]], concurrency: Optional[int] = None) -> List[Tuple[Dict[str, Any], WebhookResult]]:
+    """Post the claimed rows; rows not attempted (behind a failure of their key) are left out"""
+    groups: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+    for row in sorted(rows, key=lambda r: r["id"]):
+        groups.setdefault((row["endpoint"], row["ordering_key"]), []).append(row)
+    if not groups:
+        return []
+    session = get_bss_session()
+    workers = max(1, min(concurrency or settings.BSS_WEBHOOK_CONCURRENCY, len(groups)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bss-outbox") as pool:
+        return [outcome for group in pool.map(lambda g: _deliver_group(g, session), groups.values()) for outcome in group]
+
+
+def _backoff_seconds(attempts: int) -> int:
+    return min(settings.BSS_OUTBOX_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), settings.BSS_OUTBOX_RETRY_MAX_SECONDS)
+
+
+def complete_batch(connection, rows: List[Dict[str, Any]],
+                   outcomes: List[Tuple[Dict[str, Any], WebhookResult]]) -> Dict[str, Any]:
+    """Persist the outcomes of one batch in a single transaction"""
+    delivered = [row for row, result in outcomes if result.ok]
+    failed = [(row, result) for row, result in outcomes if not result.ok]
+    attempted = {row["id"] for row, _ in outcomes}
+    unattempted = [row["id"] for row in rows if row["id"] not in attempted]
+
+    cursor = connection.cursor()
+    try:
+        if delivered:
+            ids = [row["id"] for row in delivered]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(
+                f"""UPDATE bss_outbox
+                    SET status = 'DELIVERED', attempts = attempts + 1, delivered_at = NOW(), last_error = NULL
+                    WHERE id IN ({placeholders})""",
+                ids
+            )
+            acks: Dict[Tuple[str, str], List[int]] = {}
+            for row in delivered:
+                if row["endpoint"] in ACK_TABLES and row["source_id"] is not None:
+                    acks.setdefault((row["endpoint"], row["status_bss"]), []).append(row["source_id"])
+            for (endpoint, status_bss), source_ids in acks.items():
+                table, extra_set = ACK_TABLES[endpoint]
+                placeholders = ", ".join(["%s"] * len(source_ids))
+                cursor.execute(
+                    f"UPDATE {table} SET status_bss = %s{extra_set}, updated_at = NOW() WHERE id IN ({placeholders})",
+                    [status_bss] + source_ids
+                )
+
+        if failed:
+            updates = []
+            for row, result in failed:
+                attempts = row["attempts"] + 1
+                give_up = not result.retryable or attempts >= settings.BSS_OUTBOX_MAX_ATTEMPTS
+                error = result.error or f"HTTP {result.status_code}"
+                updates.append(("FAILED" if give_up else "PENDING", _backoff_seconds(attempts), error[:500], row["id"]))
+                if give_up:
+                    logger.error("BSS outbox %s giving up on %s %s after %s attempts: %s",
+                                 row["id"], row["endpoint"], row["ordering_key"], attempts, error)
+            cursor.executemany(
+                """UPDATE bss_outbox
+                   SET status = %s, attempts = attempts + 1,
+                       next_attempt_at = NOW() + INTERVAL %s SECOND, last_error = %s
+                   WHERE id = %s""",
+                updates
+            )
+
+        if unattempted:
+            placeholders = ", ".join(["%s"] * len(unattempted))
+            cursor.execute(f"UPDATE bss_outbox SET next_attempt_at = NOW() WHERE id IN ({placeholders})", unattempted)
+
+        connection.commit()
+    finally:
+        cursor.close()
+
+    return {
+        "delivered": len(delivered),
+        "failed": len(failed),
+        "deferred": len(unattempted),
+        "port_out_delivered": [row["ordering_key"] for row in delivered if row["endpoint"] == ENDPOINT_PORT_OUT],
+        "port_in_delivered": [row["source_id"] for row in delivered
+                              if row["endpoint"] == ENDPOINT_PORT_IN and row["source_id"] is not None],
+    }
+
+
+def purge_delivered(connection, limit: int = 1000) -> int:
+    """Delete delivered rows older than BSS_OUTBOX_RETENTION_DAYS (bounded per call)"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM bss_outbox WHERE status = 'DELIVERED' AND delivered_at < NOW() - INTERVAL %s DAY LIMIT %s",
+            (settings.BSS_OUTBOX_RETENTION_DAYS, limit)
+        )
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
@@ -0,0 +1,90 @@
+"""
+Concurrent delivery of JSON webhooks to BSS.
+
+post_webhooks() posts a batch of payloads to one BSS endpoint with at most
+BSS_WEBHOOK_CONCURRENCY requests in flight, over a per-process requests.Session whose
+connection pool is sized to match, so keep-alive connections are reused across the batch
+instead of one TCP/TLS handshake per notification. Every item gets a WebhookResult; the
+caller persists the successes in one statement and retries only the failures.
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+
+from config import settings
+from services.logger import logger
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+
+class WebhookResult:
+    """Outcome of one webhook post; key identifies the item (e.g. reference_code)"""
+    __slots__ = ("key", "status_code", "error")
+
+    def __init__(self, key: Any, status_code: Optional[int] = None, error: Optional[str] = None):
+        self.key = key
+        self.status_code = status_code
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    @property
+    def retryable(self) -> bool:
+        """Transport errors, 429 and 5xx are worth another attempt; other 4xx are not"""
+        if self.ok:
+            return False
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def get_bss_session() -> requests.Session:
+    """Process-wide pooled session for BSS callbacks (rebuilt after a fork)"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.BSS_WEBHOOK_CONCURRENCY, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(settings.get_headers_bss())
+        session.verify = settings.SSL_VERIFICATION
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def post_webhook(url: str, key: Any, payload: Dict[str, Any],
+                 session: Optional[requests.Session] = None) -> WebhookResult:
+    """POST one payload; transport errors and non-200 answers are returned, not raised"""
+    session = session or get_bss_session()
+    json_payload = json.dumps(payload, ensure_ascii=False)
+    logger.debug("BSS webhook payload for %s: %s", key, json_payload)
+    try:
+        response = session.post(url, data=json_payload.encode("utf-8"), timeout=settings.APIGEE_API_QUERY_TIMEOUT)
+    except requests.exceptions.RequestException as exc:
+        logger.error("Webhook error for %s: %s", key, str(exc))
+        return WebhookResult(key, error=str(exc))
+    if response.status_code != 200:
+        logger.error("Webhook failed for %s with status code: %s", key, response.status_code)
+    return WebhookResult(key, status_code=response.status_code)
+
+
+def post_webhooks(url: str, items: Iterable[Tuple[Any, Dict[str, Any]]],
+                  concurrency: Optional[int] = None) -> List[WebhookResult]:
+    """
+    POST each (key, payload) to url with bounded concurrency.
+
+    Returns:
+        list: WebhookResult per item, in input order
+    """
+    items = list(items)
+    if not items:
+        return []
+    session = get_bss_session()
+    workers = max(1, min(concurrency or settings.BSS_WEBHOOK_CONCURRENCY, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bss-webhook") as pool:
+        return list(pool.map(lambda item: post_webhook(url, *item, session=session), items))
@@ -2,12 +2,16 @@ from fastapi import HTTPException
 import mysql.connector
 from mysql.connector import Error
 from config import settings
-from services.time_services import calculate_countdown_working_hours, normalize_datetime, parse_timestamp
-from datetime import timedelta, datetime
+from services.time_services import calculate_countdown_working_hours, normalize_datetime, parse_timestamp, get_next_window_start, get_window_end
+from datetime import timedelta, datetime, date
 from services.logger import logger, payload_logger, log_payload
 import aiomysql
-from typing import Dict, Any
-import json
+from services.nc_records import PortOutNotification
+from services.portout_seen import lookup_seen, mark_stored, mark_submitted, is_seen
+from services.bss_outbox import enqueue_port_out_callbacks, enqueue_return_callback
+from services.redis_client import get_redis
+from services.portability_cache import LOOKUP_MSISDN, LOOKUP_REFERENCE_CODE, invalidate_portability_msisdn, invalidate_portability_msisdns
+from typing import Dict, Any, List, Optional, Tuple
 
 async def async_get_db_connection():
     """Create and return async MySQL database connection"""
@@ -33,6 +37,93 @@ def get_db_connection():
     except Error as e:
         raise HTTPException(status_code=500, detail=f"Database connection error: {str(e)}") from e
 
+SEND_SLOT_KEY = "mnp:send-slot:{}"
+
+# Next slot index of a window; the counter is seeded with the backlog found in MySQL on first use
+_NEXT_SEND_SLOT_SCRIPT = """
+redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2])
+return redis.call('incr', KEYS[1]) - 1
+"""
+
+
+def _count_pending_submit(window_start: datetime, window_end: datetime) -> int:
+    """Requests already waiting to be submitted in [window_start, window_end)"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+
+        # Both tables are submitted to NC, they share the same throughput budget
+        backlog_query = """
+            SELECT
+                (SELECT COUNT(*) FROM portability_requests
+                 WHERE scheduled_at >= %s AND scheduled_at < %s AND status_nc = 'PENDING_SUBMIT')
+              + (SELECT COUNT(*) FROM return_requests
+                 WHERE scheduled_at >= %s AND scheduled_at < %s AND status_nc = 'PENDING_SUBMIT')
+        """
+        cursor.execute(backlog_query, (window_start, window_end, window_start, window_end))
+        return cursor.fetchone()[0] or 0
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+def _next_send_slot(window_start: datetime, window_end: datetime) -> int:
+    """Atomically take the next slot index of a window (Redis INCR, seeded from MySQL)"""
+    client = get_redis()
+    key = SEND_SLOT_KEY.format(window_start.strftime("%Y%m%d%H%M"))
+    seed = 0
+    if not client.exists(key):
+        seed = _count_pending_submit(window_start, window_end)
+    ttl = int((window_end - datetime.now()).total_seconds()) + 3600
+    return int(client.eval(_NEXT_SEND_SLOT_SCRIPT, 1, key, seed, max(ttl, 60)))
+
+
+def deferred_backlog_end(window_start: datetime) -> datetime:
+    """End of the send slots allocate_send_slot() handed out in a window (window_start when none)"""
+    taken = int(get_redis().get(SEND_SLOT_KEY.format(window_start.strftime("%Y%m%d%H%M"))) or 0)
+    return window_start + timedelta(seconds=int(taken * 60 / max(1, settings.NC_THROUGHPUT_PER_MINUTE)))
+
+
+def allocate_send_slot(delta, with_jitter=False) -> datetime:
+    """
+    Calculate scheduled_at for a request, load-leveling requests deferred to the next working window.
+
+    Within working hours this is calculate_countdown_working_hours(). When the request is pushed to
+    the next window, it takes the next slot of that window from a Redis counter (seeded with the
+    PENDING_SUBMIT backlog of the window): window_start + slot / NC_THROUGHPUT_PER_MINUTE. A window
+    that is full rolls over to the following one. The slot is persisted by the caller in
+    scheduled_at, so load at window open follows the NC throughput budget instead of random jitter.
+    """
+    _, status, scheduled_at = calculate_countdown_working_hours(delta=delta, with_jitter=with_jitter)
+    if status != "NEXT_TIMEBAND":
+        return scheduled_at
+
+    if isinstance(delta, int):
+        delta = timedelta(seconds=delta)
+    window_start = get_next_window_start(datetime.now() + delta).replace(microsecond=0)
+    slot_seconds = 60 / max(1, settings.NC_THROUGHPUT_PER_MINUTE)
+
+    try:
+        # A year of full windows is a configuration error, fall back to jitter
+        for _ in range(2 * 366):
+            window_end = get_window_end(window_start)
+            slot_index = _next_send_slot(window_start, window_end)
+            slot = window_start + timedelta(seconds=int(slot_index * slot_seconds))
+            if slot < window_end:
+                logger.debug("Allocated send slot %s (window_start %s, slot %s)", slot, window_start, slot_index)
+                return slot
+            window_start = get_next_window_start(window_end)
+        logger.error("No free send slot within a year, falling back to jitter")
+        return scheduled_at
+
+    except Exception as e:
+        logger.error("Failed to allocate send slot, falling back to jitter: %s", str(e))
+        return scheduled_at
+
 def save_portin_request_db(alta_data: dict):
     """
     1. Save it to the database immediately.
@@ -60,9 +151,7 @@ def save_portin_request_db(alta_data: dict):
         # scheduled_at=calculate_countdown_working_hours(timedelta(minutes=0),with_jitter=False)
         # initial_delta = timedelta(seconds=0)
         initial_delta = timedelta(seconds=-5)  # Negative for "before"
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False)
+        scheduled_at = allocate_send_slot(initial_delta)
 
         insert_query = """
             INSERT INTO portability_requests
@@ -134,10 +223,7 @@ def save_cancel_request_db(request_data: dict, request_type: str = 'CANCEL', cou
     try:
         # Calculate scheduled_at time
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
         # request_type="CANCEL"
         # status_bss="bss_portin_received_by_mnp"
         status_bss="PROCESSING"
@@ -203,10 +289,7 @@ def save_cancel_request_db_online(request_data: dict, request_type: str = 'CANCE
     try:
         # Calculate scheduled_at time
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
         status_bss = "PROCESSING"
         status_nc = "PENDING_SUBMIT"
 
@@ -383,10 +466,7 @@ def save_portability_request_new(alta_data: dict, request_type: str = 'PORT_IN',
 
         # Calculate scheduled_at
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
 
         print(f"save_portability_request(): Inserting new portability request into database with session_code: {alta_data.get('session_code')}")
         logger.debug("save_portability_request(): Inserting new portability request into database with session_code: %s", alta_data.get('session_code'))
@@ -500,143 +580,419 @@ def save_portability_request_new(alta_data: dict, request_type: str = 'PORT_IN',
         if connection and connection.is_connected():
             connection.close()
 
-def insert_portout_response_to_db(parsed_data):
+PORTOUT_METADATA_INSERT_SQL = """
+    INSERT INTO portout_metadata
+        (response_code, response_description, paged_request_code,
+         total_records, is_last_page)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+PORTOUT_REQUEST_INSERT_SQL = """
+    INSERT INTO portout_request (
+        metadata_id, notification_id, creation_date, synchronized,
+        reference_code, status, state_date, creation_date_request,
+        reading_mark_date, state_change_deadline, subscriber_request_date,
+        donor_operator_code, receiver_operator_code, extraordinary_donor_activation,
+        contract_code, receiver_NRN, port_window_date, port_window_by_subscriber, 
+        MSISDN, msisdn_single, msisdn_ranges,
+        subscriber_id_type, subscriber_id_number, subscriber_first_name,
+        subscriber_last_name_1, subscriber_last_name_2, created_at, updated_at, 
+        status_nc, status_bss, subscriber_type, company_name
+    )
+    VALUES (
+        %s, %s, %s, %s,
+        %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, %s, %s, %s, %s, %s,
+        %s, %s, %s,
+        %s, %s, NOW(), NOW(), %s, %s, %s, %s
+    )
+"""
+
+PORTOUT_MSISDN_RANGE_INSERT_SQL = """
+    INSERT INTO portout_msisdn_range (portout_request_id, reference_code, range_start, range_end, span, port_window_date)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+
+def insert_portout_records_to_db(response_info, records, batch_size=None):
     """
-    Inserts parsed Port-Out response data into MySQL tables:
-    - portout_metadata
-    - portout_request
-    using mysql.connector.
+    Bulk-insert port-out records into portout_metadata / portout_request.
+
+    PortOutNotification records are consumed from any iterable (e.g. PortOutNotificationStream) in batches of
+    batch_size: one SELECT ... IN finds the reference codes already stored, and the new rows
+    of the batch go in with a single executemany, so only one batch is held in memory.
+    Their MSISDNs and MSISDN ranges are also written to portout_msisdn_range (numeric,
+    indexed) for find_portout_msisdn_ranges().
+    The BSS callbacks of the pending requests are written to bss_outbox in the same
+    transaction (services/bss_outbox.py).
+    Reference codes the Redis seen-set (services/portout_seen.py) knows as submitted to BSS
+    are dropped without a query.
 
     Args:
-        parsed_data (dict): Output of parse_portout_response()
+        response_info (dict): response_info of the NC page (written to portout_metadata)
+        records (iterable): PortOutNotification records
+        batch_size (int): rows per batch, defaults to settings.PORT_OUT_INGEST_BATCH_SIZE
+
+    Returns:
+        tuple: (metadata_id, pending_ids) where pending_ids are the portout_request ids not
+               yet submitted to BSS (new rows and stored rows with submitted_to_bss = 0),
+               in page order. metadata_id is None when nothing was written.
+    """
+    batch_size = batch_size or settings.PORT_OUT_INGEST_BATCH_SIZE
+    connection = None
+    cursor = None
+    metadata_id = None
+    pending_ids = []
+    inserted = 0
+    skipped = 0
+    newly_stored = []  # added to the seen-set once committed
+    newly_submitted = []
+
+    def select_ids(columns, reference_codes):
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"SELECT {columns} FROM portout_request WHERE reference_code IN ({placeholders}) ORDER BY id",
+            reference_codes
+        )
+        return cursor.fetchall()
 
-    Insert each time when new port-out response is received and total_records > 0    
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        cursor.execute(PORTOUT_METADATA_INSERT_SQL, (
+            response_info.get("response_code"),
+            response_info.get("response_description"),
+            response_info.get("paged_request_code"),
+            response_info.get("total_records"),
+            1 if str(response_info.get("is_last_page")).lower() in ("true", "1") else 0
+        ))
+        metadata_id = cursor.lastrowid  # link to requests
+
+        def flush(batch):
+            nonlocal inserted, skipped
+            _, seen_submitted = lookup_seen(req.reference_code for req in batch)
+            skipped += len(seen_submitted)
+            reference_codes = list({req.reference_code for req in batch if req.reference_code} - seen_submitted)
+            stored = {}
+            if reference_codes:
+                for row in select_ids("id, reference_code, submitted_to_bss", reference_codes):
+                    # First row wins if a reference code was ever stored twice
+                    stored.setdefault(row["reference_code"], (row["id"], row["submitted_to_bss"]))
+                newly_stored.extend(stored)
+                newly_submitted.extend(code for code, (_, submitted) in stored.items() if submitted == 1)
+
+            rows = []
+            new_codes = []
+            new_requests = []
+            callbacks = []
+            for req in batch:
+                reference_code = req.reference_code
+                if reference_code in seen_submitted:
+                    continue
+                if reference_code in stored:
+                    row_id, submitted = stored[reference_code]
+                    if row_id is not None and submitted != 1 and row_id not in pending_ids:
+                        pending_ids.append(row_id)
+                        callbacks.append((row_id, req))
+                    continue
+                # Same reference code twice in one page is inserted once
+                stored[reference_code] = (None, 0)
+                new_codes.append(reference_code)
+                new_requests.append(req)
+                rows.append(req.to_row(metadata_id))
+
+            if rows:
+                cursor.executemany(PORTOUT_REQUEST_INSERT_SQL, rows)
+                inserted += len(rows)
+                # Auto-increment ids of a multi-row insert are not guaranteed consecutive
+                ids = {row["reference_code"]: row["id"] for row in reversed(select_ids("id, reference_code", new_codes))}
+                pending_ids.extend(ids[code] for code in new_codes if code in ids)
+                newly_stored.extend(new_codes)
+
+                range_rows = [
+                    (ids[req.reference_code], req.reference_code, start, end, end - start,
+                     normalize_datetime(req.port_window_date))
+                    for req in new_requests if req.reference_code in ids
+                    for start, end in req.msisdn_intervals()
+                ]
+                if range_rows:
+                    cursor.executemany(PORTOUT_MSISDN_RANGE_INSERT_SQL, range_rows)
+                callbacks.extend((ids[req.reference_code], req) for req in new_requests if req.reference_code in ids)
+
+            # BSS callbacks go to bss_outbox in the same transaction as the rows
+            enqueue_port_out_callbacks(cursor, callbacks)
+
+        batch = []
+        for req in records:
+            batch.append(req)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        connection.commit()
+        mark_stored(newly_stored)
+        mark_submitted(newly_submitted)
+        logger.info("Inserted port-out metadata_id=%s with %s new requests (%s known from the seen-set)",
+                    metadata_id, inserted, skipped)
+        return metadata_id, pending_ids
+
+    except Error as e:
+        logger.error("MySQL error inserting port-out records: %s", e)
+        if connection:
+            connection.rollback()
+        return None, []
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+# Columns of portability_requests returned by the status/search API, in SELECT order
+PORTABILITY_REQUEST_FIELDS = (
+    "id", "country_code", "request_type", "reference_code", "session_code",
+    "status_bss", "status_nc", "response_code", "response_status", "description",
+    "msisdn", "document_type", "document_number", "name_surname", "contract_number",
+    "donor_operator", "recipient_operator", "desired_porting_date",
+    "requested_at", "scheduled_at", "completed_at", "created_at", "updated_at",
+)
+PORTABILITY_REQUEST_COLUMNS = ", ".join(PORTABILITY_REQUEST_FIELDS)
+
+
+def load_portability_request(request_id):
     """
+    Load one portability_requests row for the status API (services/portability_cache.py loader).
 
+    Returns:
+        dict or None: row with dates as ISO strings, so it can be cached as JSON
+    """
+    connection = None
+    cursor = None
     try:
-        # 1. Get database connection
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT {PORTABILITY_REQUEST_COLUMNS} FROM portability_requests WHERE id = %s", (request_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {key: value.isoformat() if isinstance(value, (datetime, date)) else value for key, value in row.items()}
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
 
-        # 2. Insert into portout_metadata
-        meta = parsed_data["response_info"]
 
-        insert_meta_sql = """
-            INSERT INTO portout_metadata
-                (response_code, response_description, paged_request_code,
-                 total_records, is_last_page)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        meta_values = (
-            meta.get("response_code"),
-            meta.get("response_description"),
-            meta.get("paged_request_code"),
-            meta.get("total_records"),
-            1 if str(meta.get("is_last_page")).lower() in ("true", "1") else 0
+def find_portability_request_id(lookup, value):
+    """
+    Id of the request with a reference_code, or of the latest PORT_IN of an MSISDN
+    (services/portability_cache.py resolver).
+    """
+    if lookup == LOOKUP_REFERENCE_CODE:
+        query = "SELECT id FROM portability_requests WHERE reference_code = %s ORDER BY id DESC LIMIT 1"
+    elif lookup == LOOKUP_MSISDN:
+        query = "SELECT id FROM portability_requests WHERE msisdn = %s AND request_type = 'PORT_IN' ORDER BY id DESC LIMIT 1"
+    else:
+        raise ValueError(f"Unknown portability request lookup: {lookup}")
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(query, (value,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+def load_portout_requests(request_ids):
+    """
+    Load portout_request rows by id in one query (callback_bss_portout).
+
+    Returns:
+        list: rows (cursor(dictionary=True)) in the order of request_ids; unknown ids are skipped
+    """
+    request_ids = [int(request_id) for request_id in request_ids]
+    if not request_ids:
+        return []
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(request_ids))
+        cursor.execute(f"SELECT * FROM portout_request WHERE id IN ({placeholders})", request_ids)
+        rows = {row["id"]: row for row in cursor.fetchall()}
+        return [rows[request_id] for request_id in request_ids if request_id in rows]
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+def find_submitted_portout_codes(reference_codes):
+    """
+    Reference codes among reference_codes whose portout_request row has submitted_to_bss = 1
+    (one SELECT ... IN instead of a query per notification).
+    """
+    reference_codes = list({code for code in reference_codes if code})
+    if not reference_codes:
+        return set()
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"SELECT reference_code FROM portout_request WHERE submitted_to_bss = 1 AND reference_code IN ({placeholders})",
+            reference_codes
         )
+        return {row["reference_code"] for row in cursor.fetchall()}
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
 
-        cursor.execute(insert_meta_sql, meta_values)
-        metadata_id = cursor.lastrowid  # link to requests
 
-        # 3. Insert each port-out request
-        status_nc = 'RECEIVED'
-        status_bss = 'PENDING'
-        insert_req_sql = """
-            INSERT INTO portout_request (
-                metadata_id, notification_id, creation_date, synchronized,
-                reference_code, status, state_date, creation_date_request,
-                reading_mark_date, state_change_deadline, subscriber_request_date,
-                donor_operator_code, receiver_operator_code, extraordinary_donor_activation,
-                contract_code, receiver_NRN, port_window_date, port_window_by_subscriber, 
-                MSISDN, msisdn_single, msisdn_ranges,
-                subscriber_id_type, subscriber_id_number, subscriber_first_name,
-                subscriber_last_name_1, subscriber_last_name_2, created_at, updated_at, 
-                status_nc, status_bss, subscriber_type, company_name
-            )
-            VALUES (
-                %s, %s, %s, %s,
-                %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s,
-                %s, %s, NOW(), NOW(), %s, %s, %s, %s
-            )
-        """
+def mark_portout_requests_submitted(reference_codes, status_bss="PORT_OUT_REQUEST_SUBMITTED"):
+    """
+    Flag the delivered port-out requests with a single UPDATE ... WHERE reference_code IN (...).
 
-        for req in parsed_data["requests"]:
-            sub = req["subscriber"]
+    Returns:
+        int: rows updated
+    """
+    reference_codes = list({code for code in reference_codes if code})
+    if not reference_codes:
+        return 0
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        placeholders = ", ".join(["%s"] * len(reference_codes))
+        cursor.execute(
+            f"""
+            UPDATE portout_request
+            SET status_bss = %s,
+                submitted_to_bss = 1,
+                updated_at = NOW()
+            WHERE reference_code IN ({placeholders})
+            """,
+            [status_bss] + reference_codes
+        )
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
 
-            if check_if_port_out_request_in_db(req):
-                continue
+# A port-out range is open until it is rejected (closed = 1) or its port window has passed
+OPEN_PORTOUT_RANGE_FILTER = "r.closed = 0 AND (r.port_window_date IS NULL OR r.port_window_date >= NOW())"
 
-            company_name = sub.get("razon_social")
-            logger.debug("Company Name: %s", company_name)
-            if company_name:  # This checks for non-empty and non-None
-                subscriber_type = "COMPANY"
-            else:
-                subscriber_type = "PERSON"
-            logger.debug("Subscriber_type: %s", subscriber_type)
+CLOSE_PORTOUT_MSISDN_RANGES_SQL = "UPDATE portout_msisdn_range SET closed = 1 WHERE reference_code = %s AND closed = 0"
 
-            # Handle MSISDN data - convert to JSON strings
-            msisdn_single = req.get("msisdn_single", [])
-            msisdn_ranges = req.get("msisdn_ranges", [])
-            
-            # Convert to JSON strings for database storage
-            msisdn_single_json = json.dumps(msisdn_single) if msisdn_single else None
-            msisdn_ranges_json = json.dumps(msisdn_ranges) if msisdn_ranges else None
 
-            # For backward compatibility, get first single MSISDN if available
-            single_msisdn = msisdn_single[0] if msisdn_single else None
+def find_portout_msisdn_ranges(range_start, range_end=None, limit=100):
+    """
+    Open port-out requests whose MSISDNs overlap [range_start, range_end] (a single MSISDN
+    when range_end is None), newest first.
 
-            req_values = (
-                metadata_id,
-                req.get("notification_id"),
-                normalize_datetime(req.get("creation_date")),
-                1 if str(req.get("synchronized")).lower() in ("true", "1") else 0,
-                req.get("reference_code"),
-                req.get("status"),
-                normalize_datetime(req.get("state_date")),
-                normalize_datetime(req.get("creation_date_request")),
-                normalize_datetime(req.get("reading_mark_date")),
-                normalize_datetime(req.get("state_change_deadline")),
-                normalize_datetime(req.get("subscriber_request_date")),
-                req.get("donor_operator_code"),
-                req.get("receiver_operator_code"),
-                1 if str(req.get("extraordinary_donor_activation")).lower() in ("true", "1") else 0,
-                req.get("contract_code"),
-                req.get("receiver_NRN"),
-                normalize_datetime(req.get("port_window_date")),
-                1 if str(req.get("port_window_by_subscriber")).lower() in ("true", "1") else 0,
-                single_msisdn,  # For backward compatibility
-                msisdn_single_json,  # New JSON field
-                msisdn_ranges_json,  # New JSON field
-                sub.get("id_type"),
-                sub.get("id_number"),
-                sub.get("first_name"),
-                sub.get("last_name_1"),
-                sub.get("last_name_2"),
-                status_nc,
-                status_bss,
-                subscriber_type,
-                company_name
-            )
-            cursor.execute(insert_req_sql, req_values)
+    Rejected ranges and ranges whose port window has passed are closed (closed = 1, see
+    close_expired_portout_msisdn_ranges), so MAX(span) of the open ranges, read from
+    idx_range_open_span, only reflects port-outs in progress. An overlapping open range starts
+    no earlier than range_start - MAX(span): an index range scan on idx_range_open_start_end
+    with no assumption on how ranges nest.
 
-        # 4. Commit all inserts
-        connection.commit()
-        print(f"Successfully inserted metadata_id={metadata_id} with {len(parsed_data['requests'])} requests")
+    Returns:
+        list: dicts with the matched range and the port-out request it belongs to
+    """
+    range_start = int(range_start)
+    range_end = range_start if range_end is None else int(range_end)
+    if range_end < range_start:
+        range_start, range_end = range_end, range_start
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT MAX(span) AS max_span FROM portout_msisdn_range WHERE closed = 0")
+        max_span = (cursor.fetchone() or {}).get("max_span")
+        if max_span is None:
+            return []
+        cursor.execute(
+            f"""
+            SELECT r.range_start, r.range_end, r.portout_request_id, r.reference_code,
+                   p.status, p.status_nc, p.status_bss, p.submitted_to_bss,
+                   p.port_window_date, p.donor_operator_code, p.receiver_operator_code, p.created_at
+            FROM portout_msisdn_range r
+            JOIN portout_request p ON p.id = r.portout_request_id
+            WHERE r.range_start BETWEEN %s AND %s
+              AND r.range_end >= %s
+              AND {OPEN_PORTOUT_RANGE_FILTER}
+            ORDER BY r.portout_request_id DESC
+            LIMIT %s
+            """,
+            (range_start - int(max_span), range_end, range_start, int(limit))
+        )
+        return cursor.fetchall()
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
 
-    except Error as e:
-        print(f" MySQL Error: {e}")
-        connection.rollback()
 
+def close_expired_portout_msisdn_ranges(limit: int = 1000) -> int:
+    """Close open port-out ranges whose port window has passed (bounded per call)"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE portout_msisdn_range SET closed = 1 WHERE closed = 0 AND port_window_date < NOW() LIMIT %s",
+            (limit,)
+        )
+        connection.commit()
+        return cursor.rowcount
     finally:
         if cursor:
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
 
+
+def insert_portout_response_to_db(parsed_data):
+    """
+    Inserts parsed Port-Out response data into MySQL tables:
+    - portout_metadata
+    - portout_request
+    using mysql.connector.
+
+    Args:
+        parsed_data (dict): Output of parse_portout_response()
+
+    Insert each time when new port-out response is received and total_records > 0    
+    """
+    records = (PortOutNotification.from_dict(req) for req in parsed_data["requests"])
+    metadata_id, _ = insert_portout_records_to_db(parsed_data["response_info"], records)
+    return metadata_id
+
 def insert_portout_response_to_db_01(parsed_data):
     """
     Inserts parsed Port-Out response data into MySQL tables:
@@ -857,6 +1213,10 @@ def check_if_port_out_request_in_db(request_data: dict) -> bool:
 
     logger.debug("Checking reference_code: %s", reference_code)
 
+    # Known from the seen-set: the row was committed, no query needed
+    if is_seen(reference_code.strip()):
+        return True
+
     connection = None
     cursor = None
     try:
@@ -871,6 +1231,8 @@ def check_if_port_out_request_in_db(request_data: dict) -> bool:
         cursor.execute(query, (reference_code.strip(),))
         result = cursor.fetchone()
         exists = (result[0] if result else 0) > 0
+        if exists:
+            mark_stored([reference_code.strip()])
 
         logger.debug("Reference code '%s' exists in portout_request: %s", reference_code, exists)
         return exists
@@ -885,6 +1247,96 @@ def check_if_port_out_request_in_db(request_data: dict) -> bool:
         if connection and connection.is_connected():
             connection.close()
 
+PORTABILITY_REQUEST_INSERT_COLUMNS = (
+    "country_code", "request_type", "session_code",
+    "donor_operator", "recipient_operator",
+    "document_type", "document_number",
+    "contract_number", "routing_number",
+    "desired_porting_date", "iccid", "msisdn",
+    "status_bss", "status_nc", "scheduled_at", "requested_at",
+    "first_name", "first_surname", "second_surname", "nationality",
+    "subscriber_type", "is_legal_entity", "company_name", "name_surname",
+    "batch_id",
+)
+PORTABILITY_REQUEST_INSERT = (
+    f"INSERT INTO portability_requests ({', '.join(PORTABILITY_REQUEST_INSERT_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(PORTABILITY_REQUEST_INSERT_COLUMNS))})"
+)
+
+# Per-item result of a bulk port-in (GET /port-in-legal/bulk/{batch_id})
+PORT_IN_BATCH_ITEM_FIELDS = (
+    "id", "msisdn", "status_nc", "status_bss", "response_code", "description",
+    "reference_code", "porting_window", "updated_at",
+)
+
+def _portability_request_row(alta_data: dict, request_type: str, country_code: str,
+                             scheduled_at: Optional[datetime], batch_id: Optional[int] = None) -> Dict[str, Any]:
+    """Columns of PORTABILITY_REQUEST_INSERT for a person or legal entity port-in payload"""
+    subscriber_data = alta_data.get('subscriber', {})
+    doc_data = subscriber_data.get('identification_document', {})
+    personal_data = subscriber_data.get('personal_data', {})
+
+    # --- Determine entity type ---
+    is_legal_entity = bool(alta_data.get('is_legal_entity', False))
+    subscriber_type = subscriber_data.get('subscriber_type', 'person')
+    is_legal_entity_val = 1 if (is_legal_entity or subscriber_type == 'company') else 0
+
+    # --- Handle company vs person ---
+    if is_legal_entity_val:
+        company_name_val = personal_data.get('company_name') or alta_data.get('company_name') or 'UNKNOWN_COMPANY'
+        first_name = company_name_val
+        first_surname = ''
+        second_surname = ''
+        name_surname = company_name_val
+    else:
+        first_name = personal_data.get('first_name', 'UNKNOWN_SUBSCRIBER')
+        first_surname = personal_data.get('first_surname', '')
+        second_surname = personal_data.get('second_surname', '')
+        name_surname = f"{first_name} {first_surname} {second_surname}".strip()
+        company_name_val = None
+
+    return {
+        "country_code": country_code,
+        "request_type": request_type,
+        "session_code": alta_data.get('session_code'),
+        "donor_operator": alta_data.get('donor_operator'),
+        "recipient_operator": alta_data.get('recipient_operator'),
+        "document_type": doc_data.get('document_type'),
+        "document_number": doc_data.get('document_number'),
+        "contract_number": alta_data.get('contract_number'),
+        "routing_number": alta_data.get('routing_number'),
+        "desired_porting_date": alta_data.get('desired_porting_date'),
+        "iccid": alta_data.get('iccid'),
+        "msisdn": alta_data.get('msisdn'),
+        "status_bss": "PROCESSING",
+        "status_nc": "PENDING_SUBMIT",
+        "scheduled_at": scheduled_at,
+        "requested_at": alta_data.get('requested_at'),
+        "first_name": first_name,
+        "first_surname": first_surname,
+        "second_surname": second_surname,
+        "nationality": personal_data.get('nationality', 'ESP'),
+        "subscriber_type": subscriber_type,
+        "is_legal_entity": is_legal_entity_val,
+        "company_name": company_name_val,
+        "name_surname": name_surname,
+        "batch_id": batch_id,
+    }
+
+def _insert_values(row: Dict[str, Any]) -> tuple:
+    return tuple(row[column] for column in PORTABILITY_REQUEST_INSERT_COLUMNS)
+
+def _missing_field_error(e: Error) -> Optional[ValueError]:
+    """ValueError naming the column of a MySQL 'Field doesn't have a default value' error (1364)"""
+    if getattr(e, "errno", None) != 1364:
+        return None
+    msg = str(e)
+    if "Field '" in msg:
+        field_name = msg.split("Field '")[1].split("' doesn't")[0]
+        logger.error("Missing required field '%s' in DB insert", field_name)
+        return ValueError(f"Missing required field: {field_name}")
+    return ValueError("Missing required field in database insert")
+
 def save_portability_request_person_legal(alta_data: dict, request_type: str = 'PORT_IN', country_code: str = "ESP") -> int:
     """
     Save portability request (either person or legal entity) into portability_requests table.
@@ -896,103 +1348,28 @@ def save_portability_request_person_legal(alta_data: dict, request_type: str = '
         connection = get_db_connection()
         cursor = connection.cursor()
 
-        subscriber_data = alta_data.get('subscriber', {})
-        doc_data = subscriber_data.get('identification_document', {})
-        personal_data = subscriber_data.get('personal_data', {})
-
-        # --- Determine entity type ---
-        is_legal_entity = bool(alta_data.get('is_legal_entity', False))
-        subscriber_type = subscriber_data.get('subscriber_type', 'person')
-        is_legal_entity_val = 1 if (is_legal_entity or subscriber_type == 'company') else 0
-
         logger.debug("---- save_portability_request_person_legal(): %s", alta_data)
 
-        # --- Handle company vs person ---
-        if is_legal_entity_val:
-            company_name_val = personal_data.get('company_name') or alta_data.get('company_name') or 'UNKNOWN_COMPANY'
-            first_name = company_name_val
-            first_surname = ''
-            second_surname = ''
-            name_surname = company_name_val
-        else:
-            first_name = personal_data.get('first_name', 'UNKNOWN_SUBSCRIBER')
-            first_surname = personal_data.get('first_surname', '')
-            second_surname = personal_data.get('second_surname', '')
-            name_surname = f"{first_name} {first_surname} {second_surname}".strip()
-            company_name_val = None
-
-        status_bss = "PROCESSING"
-        status_nc = "PENDING_SUBMIT"
-
         # --- Calculate scheduled_at ---
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta,
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
 
-        insert_query = """
-        INSERT INTO portability_requests (
-            country_code, request_type, session_code,
-            donor_operator, recipient_operator,
-            document_type, document_number,
-            contract_number, routing_number,
-            desired_porting_date, iccid, msisdn,
-            status_bss, status_nc, scheduled_at, requested_at,
-            first_name, first_surname, second_surname, nationality,
-            subscriber_type, is_legal_entity, company_name, name_surname
-        ) VALUES (
-            %s, %s, %s,
-            %s, %s,
-            %s, %s,
-            %s, %s,
-            %s, %s, %s,
-            %s, %s, %s, %s,
-            %s, %s, %s, %s,
-            %s, %s, %s, %s
-        )
-        """
-
-        values = (
-            country_code,
-            request_type,
-            alta_data.get('session_code'),
-            alta_data.get('donor_operator'),
-            alta_data.get('recipient_operator'),
-            doc_data.get('document_type'),
-            doc_data.get('document_number'),
-            alta_data.get('contract_number'),
-            alta_data.get('routing_number'),
-            alta_data.get('desired_porting_date'),
-            alta_data.get('iccid'),
-            alta_data.get('msisdn'),
-            status_bss,
-            status_nc,
-            scheduled_at,
-            alta_data.get('requested_at'),
-            first_name,
-            first_surname,
-            second_surname,
-            personal_data.get('nationality', 'ESP'),
-            subscriber_type,
-            is_legal_entity_val,
-            company_name_val,
-            name_surname
-        )
+        row = _portability_request_row(alta_data, request_type, country_code, scheduled_at)
 
         logger.debug(
             "Executing INSERT: company_name=%s | is_legal_entity=%s | subscriber_type=%s",
-            company_name_val, is_legal_entity_val, subscriber_type
+            row["company_name"], row["is_legal_entity"], row["subscriber_type"]
         )
 
-        cursor.execute(insert_query, values)
+        cursor.execute(PORTABILITY_REQUEST_INSERT, _insert_values(row))
         connection.commit()
+        invalidate_portability_msisdn(alta_data.get('msisdn'))
 
         new_request_id = cursor.lastrowid
         logger.info(
             "Inserted new portability request with ID: %s, Type: %s",
             new_request_id,
-            'LEGAL' if is_legal_entity_val else 'PERSONAL'
+            'LEGAL' if row["is_legal_entity"] else 'PERSONAL'
         )
 
         return new_request_id
@@ -1001,16 +1378,11 @@ def save_portability_request_person_legal(alta_data: dict, request_type: str = '
         if connection:
             connection.rollback()
 
-        if getattr(e, "errno", None) == 1364:
-            msg = str(e)
-            if "Field '" in msg:
-                field_name = msg.split("Field '")[1].split("' doesn't")[0]
-                logger.error("Missing required field '%s' in DB insert", field_name)
-                raise ValueError(f"Missing required field: {field_name}") from e
-            raise ValueError("Missing required field in database insert") from e
-        else:
-            logger.error("MySQL error (%s): %s", getattr(e, "errno", "?"), e)
-            raise
+        missing_field = _missing_field_error(e)
+        if missing_field:
+            raise missing_field from e
+        logger.error("MySQL error (%s): %s", getattr(e, "errno", "?"), e)
+        raise
 
     finally:
         if cursor:
@@ -1018,6 +1390,227 @@ def save_portability_request_person_legal(alta_data: dict, request_type: str = '
         if connection and connection.is_connected():
             connection.close()
 
+def save_port_in_batch(items: List[dict], request_type: str = 'PORT_IN', country_code: str = "ESP") -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Save a bulk port-in: one port_in_batch row and all its portability_requests in one
+    multi-row INSERT (executemany), committed together. NC submission is left to
+    tasks/bulk_port_in.py, so every row stays PENDING_SUBMIT here.
+
+    Returns:
+        tuple: (batch id, [(request id, msisdn)] in the order of items)
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+
+        # No send slot: the dispatcher paces the submissions after the deferred backlog
+        scheduled_at = None
+
+        cursor.execute("INSERT INTO port_in_batch (item_count) VALUES (%s)", (len(items),))
+        batch_id = cursor.lastrowid
+
+        cursor.executemany(
+            PORTABILITY_REQUEST_INSERT,
+            [_insert_values(_portability_request_row(item, request_type, country_code, scheduled_at, batch_id)) for item in items]
+        )
+        # Auto-increment ids follow the row order of the statement
+        cursor.execute("SELECT id, msisdn FROM portability_requests WHERE batch_id = %s ORDER BY id", (batch_id,))
+        rows = [(row[0], row[1]) for row in cursor.fetchall()]
+        connection.commit()
+        invalidate_portability_msisdns([msisdn for _, msisdn in rows])
+
+        logger.info("Inserted port-in batch %s with %s requests", batch_id, len(rows))
+        return batch_id, rows
+
+    except Error as e:
+        if connection:
+            connection.rollback()
+
+        missing_field = _missing_field_error(e)
+        if missing_field:
+            raise missing_field from e
+        logger.error("MySQL error (%s): %s", getattr(e, "errno", "?"), e)
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def load_port_in_batch(batch_id: int) -> Optional[dict]:
+    """
+    A port_in_batch row with its requests (PORT_IN_BATCH_ITEM_FIELDS each, in id order).
+
+    Returns:
+        dict or None: None when the batch does not exist
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT id, item_count, status, dispatched_at, created_at FROM port_in_batch WHERE id = %s", (batch_id,))
+        batch = cursor.fetchone()
+        if not batch:
+            return None
+        cursor.execute(
+            f"SELECT {', '.join(PORT_IN_BATCH_ITEM_FIELDS)} FROM portability_requests WHERE batch_id = %s ORDER BY id",
+            (batch_id,)
+        )
+        batch["items"] = cursor.fetchall()
+        return batch
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def load_port_in_batch_queue(batch_id: int) -> Optional[Tuple[int, List[int]]]:
+    """
+    Next requests of an ACCEPTED port_in_batch to queue for NC submission: its requests still
+    PENDING_SUBMIT above queued_through_id, in id order.
+
+    Returns:
+        tuple or None: (queued_through_id, request ids); None when the batch is unknown or
+                       already fully dispatched
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT queued_through_id FROM port_in_batch WHERE id = %s AND status = 'ACCEPTED'", (batch_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        queued_through = row[0]
+        cursor.execute(
+            "SELECT id FROM portability_requests WHERE batch_id = %s AND id > %s AND status_nc = 'PENDING_SUBMIT' ORDER BY id",
+            (batch_id, queued_through)
+        )
+        return queued_through, [row[0] for row in cursor.fetchall()]
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def advance_port_in_batch(batch_id: int, queued_through: int, last_queued: int, done: bool) -> bool:
+    """
+    Move queued_through_id of a port_in_batch from queued_through to last_queued, marking it
+    DISPATCHED when done. Conditional on queued_through, so of two concurrent dispatch runs
+    only one queues the same requests.
+
+    Returns:
+        bool: False when another run advanced the batch first
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            """
+            UPDATE port_in_batch
+            SET queued_through_id = %s,
+                status = %s,
+                dispatched_at = IF(%s, NOW(), dispatched_at)
+            WHERE id = %s AND status = 'ACCEPTED' AND queued_through_id = %s
+            """,
+            (last_queued, 'DISPATCHED' if done else 'ACCEPTED', done, batch_id, queued_through)
+        )
+        connection.commit()
+        return cursor.rowcount == 1
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def claim_port_in_batch_item(request_id: int) -> bool:
+    """
+    Move a bulk port-in request from PENDING_SUBMIT to SUBMITTING; False when another task has it.
+    updated_at is the claim time, see fail_stuck_port_in_batch_items().
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE portability_requests SET status_nc = 'SUBMITTING', updated_at = NOW() WHERE id = %s AND status_nc = 'PENDING_SUBMIT'",
+            (request_id,)
+        )
+        connection.commit()
+        return cursor.rowcount == 1
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def fail_stuck_port_in_batch_items(timeout_seconds: int, limit: int = 500) -> List[int]:
+    """
+    Mark as ERROR bulk port-in requests left SUBMITTING for more than timeout_seconds (the
+    worker died between claim_port_in_batch_item() and the NC result). They are not submitted
+    again: NC may have accepted them, so BSS has to check before resubmitting.
+
+    Returns:
+        list: ids of the requests marked ERROR
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            """
+            SELECT id FROM portability_requests
+            WHERE status_nc = 'SUBMITTING' AND batch_id IS NOT NULL
+              AND updated_at < NOW() - INTERVAL %s SECOND
+            ORDER BY id
+            LIMIT %s
+            """,
+            (timeout_seconds, limit)
+        )
+        request_ids = [row[0] for row in cursor.fetchall()]
+        if request_ids:
+            placeholders = ", ".join(["%s"] * len(request_ids))
+            # status_nc re-checked: a late NC result wins over the timeout
+            cursor.execute(
+                f"""
+                UPDATE portability_requests
+                SET status_nc = 'ERROR', description = 'NC submission interrupted, outcome unknown', updated_at = NOW()
+                WHERE id IN ({placeholders}) AND status_nc = 'SUBMITTING'
+                """,
+                request_ids
+            )
+        connection.commit()
+        return request_ids
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+def find_undispatched_port_in_batches(limit: int = 50) -> List[int]:
+    """Ids of port_in_batch rows still ACCEPTED (not or not fully queued), oldest first"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM port_in_batch WHERE status = 'ACCEPTED' ORDER BY created_at, id LIMIT %s", (limit,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
 def save_return_request_db(request_data: dict, request_type: str = 'RETURN') -> int:
     """
     Save return request to database (synchronous)
@@ -1033,10 +1626,7 @@ def save_return_request_db(request_data: dict, request_type: str = 'RETURN') ->
     try:
         # Calculate scheduled_at time
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
         status_bss = "PROCESSING"
         status_nc = "PENDING_SUBMIT"
 
@@ -1155,10 +1745,7 @@ def save_cancel_return_request_db(request_data: dict, request_type: str = 'CANCE
     try:
         # Calculate scheduled_at time
         initial_delta = timedelta(seconds=-5)
-        _, _, scheduled_at = calculate_countdown_working_hours(
-            delta=initial_delta, 
-            with_jitter=False
-        )
+        scheduled_at = allocate_send_slot(initial_delta)
         status_bss = "PROCESSING"
         status_nc = "PENDING_SUBMIT"
         reference_code = request_data["reference_code"]
@@ -1210,10 +1797,12 @@ def save_cancel_return_request_db(request_data: dict, request_type: str = 'CANCE
         if connection:
             connection.close()
 
-def update_return_request_with_nc_response(reference_code: str, nc_response: Dict[str, Any]) -> None:
+def update_return_request_with_nc_response(reference_code: str, nc_response: Dict[str, Any],
+                                           notify_bss: bool = False, msisdn: str = "") -> None:
     """
     Synchronous version for updating return_requests table
     Always updates scheduled_at for next check when status is pending
+    With notify_bss the BSS return callback is written to bss_outbox in the same transaction
     """
     connection = None
     cursor = None
@@ -1298,6 +1887,8 @@ def update_return_request_with_nc_response(reference_code: str, nc_response: Dic
         
         # Execute the update
         cursor.execute(update_query, values)
+        if notify_bss:
+            enqueue_return_callback(cursor, reference_code, msisdn, nc_response)
         connection.commit()
 
         # Check if any rows were affected
@@ -0,0 +1,295 @@
+"""
+Idempotency keys for BSS-facing POST endpoints.
+
+BSS retries port-in, cancel and return requests on timeout. Without a key every retry
+creates a new portability row and a new NC submission. A request carrying an
+Idempotency-Key header is claimed once per (endpoint, key):
+
+    idempotency_key table   UNIQUE (endpoint, idempotency_key); INSERT IGNORE decides which
+                            request owns the key, across workers and pods
+    Redis                   mnp:idem:<endpoint>:<key> caches the completed response, so a
+                            replay is answered without touching MySQL; ...:<key>:owner is set
+                            while the owner runs, so waiting duplicates poll Redis only
+
+claim() returns one of:
+
+    NEW          the caller owns the key: process the request, then complete() or release()
+    COMPLETED    the stored response of the first request, to be replayed as is
+    IN_PROGRESS  the first request is still running; poll wait() until it answers
+    CONFLICT     the key was used for a different request body
+
+The owner renew()s locked_until while its request runs. A claim whose owner died
+(locked_until passed) or whose record expired (IDEMPOTENCY_TTL_SECONDS) is taken over by
+the next claim.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from services.database_service import get_db_connection
+from services.logger import logger
+from services.redis_client import get_redis
+
+NEW = "NEW"
+COMPLETED = "COMPLETED"
+IN_PROGRESS = "IN_PROGRESS"
+CONFLICT = "CONFLICT"
+
+REDIS_KEY_PREFIX = "mnp:idem"
+
+CLAIM_SQL = """
+    INSERT IGNORE INTO idempotency_key
+        (endpoint, idempotency_key, request_hash, status, locked_until, expires_at)
+    VALUES (%s, %s, %s, 'IN_PROGRESS', NOW() + INTERVAL %s SECOND, NOW() + INTERVAL %s SECOND)
+"""
+
+SELECT_SQL = """
+    SELECT id, request_hash, status, response_status, response_body, media_type,
+           expires_at < NOW() AS expired,
+           status = 'IN_PROGRESS' AND locked_until < NOW() AS abandoned
+    FROM idempotency_key
+    WHERE endpoint = %s AND idempotency_key = %s
+"""
+
+# Conditions re-checked in the UPDATE so only one of several concurrent claimers wins
+TAKEOVER_SQL = """
+    UPDATE idempotency_key
+    SET request_hash = %s, status = 'IN_PROGRESS', response_status = NULL, response_body = NULL,
+        media_type = NULL, locked_until = NOW() + INTERVAL %s SECOND, expires_at = NOW() + INTERVAL %s SECOND
+    WHERE id = %s
+      AND (expires_at < NOW() OR (status = 'IN_PROGRESS' AND locked_until < NOW()))
+"""
+
+
+def request_fingerprint(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def _redis_key(endpoint: str, key: str) -> str:
+    return f"{REDIS_KEY_PREFIX}:{endpoint}:{key}"
+
+
+def _owner_key(endpoint: str, key: str) -> str:
+    return f"{_redis_key(endpoint, key)}:owner"
+
+
+def _mark_owned(endpoint: str, key: str) -> None:
+    try:
+        get_redis().set(_owner_key(endpoint, key), 1, ex=settings.IDEMPOTENCY_LOCK_SECONDS)
+    except Exception as e:
+        logger.warning("Could not mark idempotency key %s %s in progress: %s", endpoint, key, e)
+
+
+def _unmark_owned(endpoint: str, key: str) -> None:
+    try:
+        get_redis().delete(_owner_key(endpoint, key))
+    except Exception as e:
+        logger.warning("Could not clear idempotency key %s %s in progress: %s", endpoint, key, e)
+
+
+def _cached_response(endpoint: str, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        cached = get_redis().get(_redis_key(endpoint, key))
+    except Exception as e:
+        logger.warning("Idempotency cache unavailable, falling back to MySQL: %s", e)
+        return None
+    return json.loads(cached) if cached else None
+
+
+def _cache_response(endpoint: str, key: str, record: Dict[str, Any], ttl_seconds: int) -> None:
+    if ttl_seconds <= 0:
+        return
+    try:
+        get_redis().set(_redis_key(endpoint, key), json.dumps(record), ex=ttl_seconds)
+    except Exception as e:
+        logger.warning("Could not cache idempotent response for %s %s: %s", endpoint, key, e)
+
+
+def _record(request_hash: str, status_code: int, body: str, media_type: Optional[str]) -> Dict[str, Any]:
+    return {"request_hash": request_hash, "status_code": status_code, "body": body, "media_type": media_type}
+
+
+def _checked(record: Dict[str, Any], request_hash: str) -> Tuple[str, Dict[str, Any]]:
+    return (COMPLETED if record["request_hash"] == request_hash else CONFLICT), record
+
+
+def claim(endpoint: str, key: str, request_hash: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Claim (endpoint, key) for a request whose body hashes to request_hash.
+
+    Returns:
+        tuple: (NEW / COMPLETED / IN_PROGRESS / CONFLICT, stored response record or None)
+    """
+    cached = _cached_response(endpoint, key)
+    if cached:
+        return _checked(cached, request_hash)
+
+    lock_seconds = settings.IDEMPOTENCY_LOCK_SECONDS
+    ttl_seconds = settings.IDEMPOTENCY_TTL_SECONDS
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(CLAIM_SQL, (endpoint, key, request_hash, lock_seconds, ttl_seconds))
+        if cursor.rowcount == 1:
+            connection.commit()
+            _mark_owned(endpoint, key)
+            return NEW, None
+
+        cursor.execute(SELECT_SQL, (endpoint, key))
+        row = cursor.fetchone()
+        if row is None:
+            # Deleted by release() in between; the caller polls again
+            connection.commit()
+            return IN_PROGRESS, None
+        if row["expired"] or row["abandoned"]:
+            cursor.execute(TAKEOVER_SQL, (request_hash, lock_seconds, ttl_seconds, row["id"]))
+            connection.commit()
+            if cursor.rowcount == 1:
+                logger.info("Idempotency key %s %s taken over (expired or abandoned)", endpoint, key)
+                _mark_owned(endpoint, key)
+                return NEW, None
+            return IN_PROGRESS, None
+        connection.commit()
+
+        if row["request_hash"] != request_hash:
+            return CONFLICT, None
+        if row["status"] != COMPLETED:
+            return IN_PROGRESS, None
+        record = _record(row["request_hash"], row["response_status"], row["response_body"], row["media_type"])
+        _cache_response(endpoint, key, record, settings.IDEMPOTENCY_CACHE_TTL_SECONDS)
+        return COMPLETED, record
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+def wait(endpoint: str, key: str, request_hash: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Redis-only poll of a key claimed by another request.
+
+    Returns:
+        tuple: (COMPLETED / CONFLICT, record) once the response is cached, (IN_PROGRESS, None)
+               while the owner runs, or None when claim() has to ask MySQL again (the owner
+               released the key or died, or Redis is unavailable)
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.get(_redis_key(endpoint, key))
+        pipe.exists(_owner_key(endpoint, key))
+        cached, owned = pipe.execute()
+    except Exception as e:
+        logger.warning("Idempotency cache unavailable, falling back to MySQL: %s", e)
+        return None
+    if cached:
+        return _checked(json.loads(cached), request_hash)
+    return (IN_PROGRESS, None) if owned else None
+
+
+def renew(endpoint: str, key: str, request_hash: str) -> bool:
+    """Extend locked_until of a claim whose request is still running; False when the claim is lost"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            """
+            UPDATE idempotency_key
+            SET locked_until = NOW() + INTERVAL %s SECOND
+            WHERE endpoint = %s AND idempotency_key = %s AND request_hash = %s AND status = 'IN_PROGRESS'
+            """,
+            (settings.IDEMPOTENCY_LOCK_SECONDS, endpoint, key, request_hash)
+        )
+        connection.commit()
+        renewed = cursor.rowcount == 1
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+    if renewed:
+        _mark_owned(endpoint, key)
+    return renewed
+
+
+def complete(endpoint: str, key: str, request_hash: str, status_code: int, body: str,
+             media_type: Optional[str]) -> bool:
+    """
+    Store the response of the request that owns the key, for replays.
+
+    Returns:
+        bool: False when the claim was lost (taken over after locked_until passed) and
+              nothing was stored
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            """
+            UPDATE idempotency_key
+            SET status = 'COMPLETED', response_status = %s, response_body = %s, media_type = %s
+            WHERE endpoint = %s AND idempotency_key = %s AND request_hash = %s AND status = 'IN_PROGRESS'
+            """,
+            (status_code, body, media_type, endpoint, key, request_hash)
+        )
+        connection.commit()
+        stored = cursor.rowcount == 1
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+    if not stored:
+        logger.error("Idempotency key %s %s lost before its response was stored (claim taken over), "
+                     "duplicates are not answered with this response", endpoint, key)
+        return False
+    _cache_response(endpoint, key, _record(request_hash, status_code, body, media_type),
+                    settings.IDEMPOTENCY_CACHE_TTL_SECONDS)
+    _unmark_owned(endpoint, key)
+    return True
+
+
+def release(endpoint: str, key: str, request_hash: str) -> None:
+    """Give up the key without a stored response (the request failed), so a retry runs again"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            "DELETE FROM idempotency_key WHERE endpoint = %s AND idempotency_key = %s AND request_hash = %s AND status = 'IN_PROGRESS'",
+            (endpoint, key, request_hash)
+        )
+        connection.commit()
+        released = cursor.rowcount == 1
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+    if released:
+        _unmark_owned(endpoint, key)
+
+
+def purge_expired(limit: int = 1000) -> int:
+    """Delete expired keys (bounded per call)"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM idempotency_key WHERE expires_at < NOW() LIMIT %s", (limit,))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
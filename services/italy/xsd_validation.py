@@ -0,0 +1,134 @@
+"""
+Cached XSD validation of Italy MNP files (mnp_schema.xsd).
+
+The schema is compiled once per process into a C-backed lxml.etree.XMLSchema (lxml is in
+requirements.txt); the pure-Python xmlschema.XMLSchema is only a fallback for images without it.
+
+Files are validated from bytes, letting the parser honour the XML declaration (ISO-8859-1 or
+UTF-8) instead of decoding and re-encoding the content. Files above
+MNP_XSD_POOL_THRESHOLD_BYTES are validated in a process pool so large batches do not block
+the event loop or the GIL of the API worker.
+"""
+import asyncio
+import re
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+from config import settings
+from services.logger import logger
+
+try:
+    from lxml import etree as lxml_etree  # type: ignore
+except ImportError:  # pragma: no cover - depends on the deployment image
+    lxml_etree = None
+
+MAX_ERRORS = 20
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+ValidationResult = Tuple[bool, List[str]]
+
+
+def _to_bytes(content: Union[bytes, str]) -> bytes:
+    """Bytes are used as-is; text (e.g. a form field) loses its declaration and is encoded as UTF-8"""
+    if isinstance(content, bytes):
+        return content
+    return XML_DECLARATION.sub('', content, count=1).encode('utf-8')
+
+
+class MnpSchemaValidator:
+    """Compiled mnp_schema.xsd, lxml backend when available, xmlschema otherwise"""
+
+    def __init__(self, schema_path: Optional[str] = None):
+        self.schema_path = schema_path or settings.MNP_SCHEMA_PATH
+        started = time.perf_counter()
+        if lxml_etree is not None:
+            self.backend = 'lxml'
+            self._parser = lxml_etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True)
+            self._schema = lxml_etree.XMLSchema(lxml_etree.parse(self.schema_path))
+        else:
+            self.backend = 'xmlschema'
+            import xmlschema  # type: ignore
+            self._schema = xmlschema.XMLSchema(self.schema_path)
+        self.load_seconds = time.perf_counter() - started
+        logger.info("MNP schema %s compiled with %s in %.3fs", self.schema_path, self.backend, self.load_seconds)
+
+    def validate(self, content: Union[bytes, str]) -> ValidationResult:
+        """Validate one MNP file; returns (is_valid, errors) with at most MAX_ERRORS messages"""
+        data = _to_bytes(content)
+        if self.backend == 'lxml':
+            try:
+                document = lxml_etree.fromstring(data, self._parser)
+            except lxml_etree.XMLSyntaxError as e:
+                return False, [f"Invalid XML: {e}"]
+            if self._schema.validate(document):
+                return True, []
+            return False, [f"line {err.line}: {err.message}" for err in list(self._schema.error_log)[:MAX_ERRORS]]
+
+        try:
+            document = ET.fromstring(data)
+        except ET.ParseError as e:
+            return False, [f"Invalid XML: {e}"]
+        errors = []
+        for err in self._schema.iter_errors(document):
+            errors.append(err.reason or str(err))
+            if len(errors) >= MAX_ERRORS:
+                break
+        return not errors, errors
+
+
+_validator: Optional[MnpSchemaValidator] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_mnp_validator() -> MnpSchemaValidator:
+    """Process-wide validator, compiled on first use"""
+    global _validator
+    if _validator is None:
+        _validator = MnpSchemaValidator()
+    return _validator
+
+
+def _validate_in_worker(content: bytes) -> ValidationResult:
+    return get_mnp_validator().validate(content)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Each pool process compiles its own schema once
+        _pool = ProcessPoolExecutor(max_workers=settings.MNP_XSD_POOL_WORKERS, initializer=get_mnp_validator)
+    return _pool
+
+
+async def validate_mnp_file(content: Union[bytes, str]) -> ValidationResult:
+    """Validate an MNP file without blocking the event loop; large files go to the process pool"""
+    data = _to_bytes(content)
+    loop = asyncio.get_running_loop()
+    if len(data) >= settings.MNP_XSD_POOL_THRESHOLD_BYTES and settings.MNP_XSD_POOL_WORKERS > 0:
+        return await loop.run_in_executor(_get_pool(), _validate_in_worker, data)
+    return get_mnp_validator().validate(data)
+
+
+def validate_mnp_files(contents: List[Union[bytes, str]]) -> List[ValidationResult]:
+    """Validate a batch of MNP files, spreading large ones over the process pool"""
+    payloads = [_to_bytes(content) for content in contents]
+    results: List[Optional[ValidationResult]] = [None] * len(payloads)
+    futures = {}
+    for i, data in enumerate(payloads):
+        if len(data) >= settings.MNP_XSD_POOL_THRESHOLD_BYTES and settings.MNP_XSD_POOL_WORKERS > 0:
+            futures[i] = _get_pool().submit(_validate_in_worker, data)
+        else:
+            results[i] = get_mnp_validator().validate(data)
+    for i, future in futures.items():
+        results[i] = future.result()
+    return results
+
+
+def shutdown_validation_pool() -> None:
+    """Stop the validation process pool (FastAPI lifespan shutdown)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,159 @@
+"""
+Non-blocking logging pipeline.
+
+The mnp_gateway and mnp_payload loggers keep a single BoundedQueueHandler; their real
+FileHandler/StreamHandler objects run behind a QueueListener, i.e. one background writer
+thread per logger and per process. Logging from async endpoints and Celery loops only
+snapshots the record and puts it on a bounded queue; when the queue is full the record is
+dropped and counted (mnp_log_records_dropped_total) instead of blocking the caller. The
+writer thread publishes the queue depth (mnp_log_queue_depth) after each record it writes.
+
+Writer threads do not survive fork(), so Celery prefork children and pre-forked web workers
+restart their own listeners (os.register_at_fork). flush_queue_logging() drains the queues
+and is called from the FastAPI lifespan, the Celery worker shutdown signals and atexit.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List
+
+from prometheus_client import Gauge
+
+from services.metrics import LOG_QUEUE_DEPTH, LOG_RECORDS_DROPPED
+from services.payload_log import LazyPayload
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped and counted when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue, logger_name: str):
+        super().__init__(log_queue)
+        self.logger_name = logger_name
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Snapshot the message now (args may be mutated later); exc_info stays for the formatters,
+        # the record never leaves the process. Records with LazyPayload args are formatted
+        # by the writer thread, that is the point of deferring them.
+        record = copy.copy(record)
+        if isinstance(record.args, tuple) and any(isinstance(arg, LazyPayload) for arg in record.args):
+            return record
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.labels(logger=self.logger_name).inc()
+
+
+class _DepthReportingListener(QueueListener):
+    """QueueListener that sets the queue depth gauge from the writer thread after each record"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, depth: Gauge, **kwargs):
+        super().__init__(log_queue, *handlers, **kwargs)
+        self.depth = depth
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self.depth.set(self.queue.qsize())
+
+
+class _Pipeline:
+    def __init__(self, logger: logging.Logger, handlers: List[logging.Handler], maxsize: int):
+        self.logger = logger
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.queue_handler = BoundedQueueHandler(queue.Queue(maxsize), logger.name)
+        self.listener = None
+        self.start()
+
+    def start(self) -> None:
+        self.listener = _DepthReportingListener(
+            self.queue_handler.queue, *self.handlers,
+            depth=LOG_QUEUE_DEPTH.labels(logger=self.logger.name), respect_handler_level=True,
+        )
+        self.listener.start()
+
+    def stop(self) -> None:
+        if self.listener is not None and self.listener._thread is not None:
+            # Enqueues the sentinel and joins: every record queued so far is written
+            self.listener.stop()
+            self.listener.depth.set(0)
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+
+    def detach(self) -> None:
+        """Stop the writer thread and log synchronously again (late shutdown messages are kept)"""
+        self.stop()
+        self.logger.handlers = list(self.handlers)
+
+    def restart_after_fork(self) -> None:
+        # The parent's writer thread does not exist in the child; records copied with the queue
+        # belong to the parent, so the child starts from an empty queue and its own thread
+        self.queue_handler.queue = queue.Queue(self.maxsize)
+        self.queue_handler.dropped = 0
+        self.start()
+
+
+_pipelines: Dict[str, _Pipeline] = {}
+_lock = threading.Lock()
+
+
+def install_queue_logging(logger: logging.Logger, maxsize: int) -> BoundedQueueHandler:
+    """
+    Move the handlers currently attached to logger behind a bounded queue and a writer thread.
+    Calling it again for the same logger replaces (and flushes) the previous pipeline.
+    """
+    with _lock:
+        previous = _pipelines.pop(logger.name, None)
+        if previous is not None:
+            previous.stop()
+        handlers = [h for h in logger.handlers if not isinstance(h, BoundedQueueHandler)]
+        pipeline = _Pipeline(logger, handlers, maxsize)
+        logger.handlers = [pipeline.queue_handler]
+        _pipelines[logger.name] = pipeline
+        return pipeline.queue_handler
+
+
+def flush_queue_logging() -> None:
+    """Write out everything queued and stop the writer threads (process shutdown)"""
+    with _lock:
+        for pipeline in _pipelines.values():
+            pipeline.detach()
+        _pipelines.clear()
+
+
+def get_queue_logging_stats() -> Dict[str, Dict[str, int]]:
+    """Per-logger queue depth, capacity and dropped records of this process"""
+    return {
+        name: {
+            "queued": pipeline.queue_handler.queue.qsize(),
+            "maxsize": pipeline.maxsize,
+            "dropped": pipeline.queue_handler.dropped,
+        }
+        for name, pipeline in _pipelines.items()
+    }
+
+
+def _restart_after_fork() -> None:
+    global _lock
+    _lock = threading.Lock()
+    for pipeline in _pipelines.values():
+        pipeline.restart_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+atexit.register(flush_queue_logging)
@@ -5,6 +5,9 @@ import threading
 from datetime import datetime, timezone
 import sys
 from config import settings
+from services.log_queue import install_queue_logging
+from services.payload_archive import get_archive_handler
+from services.payload_log import PayloadSource, lazy_payload
 
 class LoggerService:
     """Centralized logging service compliant with the required JSON format"""
@@ -136,6 +139,8 @@ class LoggerService:
         
         if not handlers:
             self.logger.addHandler(logging.NullHandler())
+        else:
+            install_queue_logging(self.logger, settings.LOG_QUEUE_SIZE)
     
     def setup_payload_logger(self):
         """Configure payload-specific logger with required JSON format"""
@@ -223,6 +228,11 @@ class LoggerService:
             payload_file_handler = logging.FileHandler(self.payload_log_file)
             payload_file_handler.setFormatter(payload_formatter)
             handlers.append(payload_file_handler)
+
+        # Indexed compressed archive of the same payloads (services/payload_archive.py)
+        archive_handler = get_archive_handler()
+        if archive_handler is not None:
+            handlers.append(archive_handler)
         
         # Add all configured handlers to payload logger
         for handler in handlers:
@@ -230,6 +240,8 @@ class LoggerService:
         
         if not handlers:
             self.payload_logger.addHandler(logging.NullHandler())
+        else:
+            install_queue_logging(self.payload_logger, settings.LOG_QUEUE_SIZE)
     
     def suppress_celery_logs(self):
         """Suppress Celery logs from our log files"""
@@ -252,13 +264,20 @@ class LoggerService:
             return True
         return False
     
-    def log_payload(self, service_type: str, operation: str, direction: str, payload: str):
-        """Unified payload logging method"""
+    def log_payload(self, service_type: str, operation: str, direction: str, payload: PayloadSource, request_id=None):
+        """
+        Unified payload logging method.
+        payload may be bytes, str, a dict or a callable returning one of them; it is only
+        evaluated (capped and minified) by the background writer when the record is sampled.
+        request_id (portability_requests.id) is indexed by the payload archive.
+        """
         if not self.should_log_payload(service_type):
             return
-        
-        log_message = f"{service_type}_{operation}_{direction}: {payload}"
-        self.payload_logger.info(log_message)
+        lazy = lazy_payload(direction, payload)
+        if lazy is None:
+            return
+        extra = {"payload_request_id": request_id} if request_id is not None else None
+        self.payload_logger.info("%s_%s_%s: %s", service_type, operation, direction, lazy, extra=extra)
 
 # Create singleton instance
 logger_service = LoggerService()
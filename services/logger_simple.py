@@ -1,8 +1,10 @@
 import logging
 import json
-import re
 from pythonjsonlogger import jsonlogger
 from config import settings
+from services.log_queue import install_queue_logging
+from services.payload_archive import get_archive_handler
+from services.payload_log import PayloadSource, lazy_payload
 
 class LoggerService:
     def __init__(self):
@@ -48,6 +50,9 @@ class LoggerService:
             stdout_handler = logging.StreamHandler()
             stdout_handler.setFormatter(json_formatter)
             self.logger.addHandler(stdout_handler)
+
+        # Writes happen on a background thread, callers only enqueue
+        install_queue_logging(self.logger, settings.LOG_QUEUE_SIZE)
     
     def setup_payload_logger(self):
         """Configure basic payload logger (keeping original format)"""
@@ -73,6 +78,13 @@ class LoggerService:
             stdout_handler = logging.StreamHandler()
             stdout_handler.setFormatter(formatter)
             self.payload_logger.addHandler(stdout_handler)
+
+        # Indexed compressed archive of the same payloads (services/payload_archive.py)
+        archive_handler = get_archive_handler()
+        if archive_handler is not None:
+            self.payload_logger.addHandler(archive_handler)
+
+        install_queue_logging(self.payload_logger, settings.LOG_QUEUE_SIZE)
     
     def should_log_payload(self, service_type: str) -> bool:
         """Check if payload should be logged based on configuration"""
@@ -83,25 +95,20 @@ class LoggerService:
             return True
         return False
     
-    def log_payload(self, service_type: str, operation: str, direction: str, payload: str):
-        """Logs cleaned XML payload in a truly single line."""
+    def log_payload(self, service_type: str, operation: str, direction: str, payload: PayloadSource, request_id=None):
+        """
+        Logs the payload minified to a single line.
+        payload may be bytes, str, a dict or a callable returning one of them; it is only
+        evaluated (capped and minified) by the background writer when the record is sampled.
+        request_id (portability_requests.id) is indexed by the payload archive.
+        """
         if not self.should_log_payload(service_type):
             return
-
-        if payload:
-            # Replace all whitespace (newlines, tabs, multiple spaces) with a single space
-            cleaned_payload = re.sub(r'\s+', ' ', payload).strip()
-
-            # Remove spaces between XML tags for compact output
-            cleaned_payload = re.sub(r'>\s+<', '><', cleaned_payload)
-        else:
-            cleaned_payload = payload
-
-        # Construct single-line log message
-        log_message = f"{service_type}_{operation}_{direction}: {cleaned_payload}"
-
-        # Write to the payload logger
-        self.payload_logger.info(log_message)
+        lazy = lazy_payload(direction, payload)
+        if lazy is None:
+            return
+        extra = {"payload_request_id": request_id} if request_id is not None else None
+        self.payload_logger.info("%s_%s_%s: %s", service_type, operation, direction, lazy, extra=extra)
 
 # Create singleton instance
 logger_service = LoggerService()
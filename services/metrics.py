@@ -0,0 +1,83 @@
+# services/metrics.py
+"""
+Prometheus metrics shared by the API and the Celery workers, and how they are exported.
+
+With PROMETHEUS_MULTIPROC_DIR set, prometheus_client writes each process's values to files in
+that directory and collector_registry() merges them, so a scrape sees every gunicorn worker or
+Celery pool child. Gauges declare how their per-process values are combined (multiprocess_mode,
+ignored in single-process mode); gauges fed by set_function() are only exported in
+single-process mode, so gauges here are set() by the code that owns the value.
+
+The API exports through gunicorn.conf.py / METRICS_PORT, the Celery worker through
+start_worker_metrics() on CELERY_METRICS_PORT (celery_app.py).
+"""
+import glob
+import logging
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, multiprocess, start_http_server
+
+from config import settings
+
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    # Metric files are created when the first value is; the worker has no gunicorn on_starting
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# Logging pipeline Metrics (services/log_queue.py)
+LOG_RECORDS_DROPPED = Counter(
+    'mnp_log_records_dropped_total',
+    'Log records dropped because the logging queue was full',
+    ['logger']
+)
+
+LOG_QUEUE_DEPTH = Gauge(
+    'mnp_log_queue_depth',
+    'Log records waiting for the background writer',
+    ['logger'],
+    multiprocess_mode='livesum'
+)
+
+
+def collector_registry() -> CollectorRegistry:
+    """Registry to expose: all processes in multiprocess mode, this process otherwise"""
+    if not settings.PROMETHEUS_MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+    return registry
+
+
+def start_metrics_server(port: int) -> bool:
+    """
+    Serve /metrics on its own port from a background thread, so scrapes do not queue behind
+    business requests. Returns False when the port is disabled (0) or already taken.
+    """
+    if not port:
+        return False
+    try:
+        start_http_server(port, registry=collector_registry())
+    except OSError as e:
+        logging.getLogger(__name__).warning("Metrics port %s not started: %s", port, e)
+        return False
+    return True
+
+
+def start_worker_metrics(port: int) -> bool:
+    """
+    Export the metrics of a Celery worker (main process, before the pool is started).
+
+    The metric files of earlier runs are removed first, except this process's own: it already
+    opened them when the metrics above were defined. Pool children write their own files.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        own = f"_{os.getpid()}.db"
+        for path in glob.glob(os.path.join(settings.PROMETHEUS_MULTIPROC_DIR, '*.db')):
+            if not path.endswith(own):
+                os.remove(path)
+    return start_metrics_server(port)
+
+
+def mark_process_dead() -> None:
+    """Drop this process's live gauges from the merged view (process shutdown)"""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid(), settings.PROMETHEUS_MULTIPROC_DIR)
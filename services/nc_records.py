@@ -0,0 +1,276 @@
+"""
+Compact record types for parsed NC notifications and status responses.
+
+Port-out notifications and NC status results used to travel as nested dicts with repeated
+string keys (parser -> DB insert -> Celery message -> BSS webhook). These frozen, slotted
+dataclasses hold the same data without a per-instance __dict__, and carry the conversions
+each pipeline step needs (DB row, compact Celery message, BSS JSON payload), so the field
+mapping lives here instead of in the hot loops.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from services.soap_response import SoapResponse
+from services.time_services import normalize_datetime
+
+
+def _flag(value: Any) -> int:
+    """NC boolean text ('true'/'false') or DB tinyint -> 1/0"""
+    return 1 if str(value).lower() in ("true", "1") else 0
+
+
+@dataclass(frozen=True, slots=True)
+class MsisdnRange:
+    initial_value: str
+    final_value: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"initial_value": self.initial_value, "final_value": self.final_value}
+
+
+@dataclass(frozen=True, slots=True)
+class Subscriber:
+    id_type: Optional[str] = None
+    id_number: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name_1: Optional[str] = None
+    last_name_2: Optional[str] = None
+    razon_social: Optional[str] = None
+
+    @property
+    def subscriber_type(self) -> str:
+        return "COMPANY" if self.razon_social else "PERSON"
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {
+            "id_type": self.id_type,
+            "id_number": self.id_number,
+            "first_name": self.first_name,
+            "last_name_1": self.last_name_1,
+            "last_name_2": self.last_name_2,
+            "razon_social": self.razon_social,
+        }
+
+
+# Scalar fields of PortOutNotification in declaration order (also the compact message order)
+NOTIFICATION_SCALAR_FIELDS = (
+    "notification_id", "creation_date", "synchronized", "reference_code", "status",
+    "state_date", "creation_date_request", "reading_mark_date", "state_change_deadline",
+    "subscriber_request_date", "donor_operator_code", "receiver_operator_code",
+    "extraordinary_donor_activation", "contract_code", "receiver_NRN",
+    "port_window_date", "port_window_by_subscriber",
+)
+
+SUBSCRIBER_FIELDS = ("id_type", "id_number", "first_name", "last_name_1", "last_name_2", "razon_social")
+
+
+@dataclass(frozen=True, slots=True)
+class PortOutNotification:
+    """One port-out request notified by NC (obtenerNotificacionesAltaPortabilidadMovilComoDonante...)"""
+    notification_id: Optional[str] = None
+    creation_date: Optional[str] = None
+    synchronized: Optional[str] = None
+    reference_code: Optional[str] = None
+    status: Optional[str] = None
+    state_date: Optional[str] = None
+    creation_date_request: Optional[str] = None
+    reading_mark_date: Optional[str] = None
+    state_change_deadline: Optional[str] = None
+    subscriber_request_date: Optional[str] = None
+    donor_operator_code: Optional[str] = None
+    receiver_operator_code: Optional[str] = None
+    extraordinary_donor_activation: Optional[str] = None
+    contract_code: Optional[str] = None
+    receiver_NRN: Optional[str] = None
+    port_window_date: Optional[str] = None
+    port_window_by_subscriber: Optional[str] = None
+    msisdn_single: Tuple[str, ...] = ()
+    msisdn_ranges: Tuple[MsisdnRange, ...] = ()
+    subscriber: Subscriber = field(default_factory=Subscriber)
+
+    # Constructors
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PortOutNotification":
+        """From the legacy parse_portout_response() request dict"""
+        sub = data.get("subscriber") or {}
+        return cls(
+            *(data.get(name) for name in NOTIFICATION_SCALAR_FIELDS),
+            msisdn_single=tuple(data.get("msisdn_single") or ()),
+            msisdn_ranges=tuple(MsisdnRange(r["initial_value"], r["final_value"]) for r in data.get("msisdn_ranges") or ()),
+            subscriber=Subscriber(*(sub.get(name) for name in SUBSCRIBER_FIELDS)),
+        )
+
+    @classmethod
+    def from_message(cls, message: List[Any]) -> "PortOutNotification":
+        """From the positional list produced by to_message()"""
+        scalars = message[:len(NOTIFICATION_SCALAR_FIELDS)]
+        msisdn_single, msisdn_ranges, subscriber = message[len(NOTIFICATION_SCALAR_FIELDS):]
+        return cls(
+            *scalars,
+            msisdn_single=tuple(msisdn_single),
+            msisdn_ranges=tuple(MsisdnRange(*r) for r in msisdn_ranges),
+            subscriber=Subscriber(*subscriber),
+        )
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "PortOutNotification":
+        """From a portout_request row (cursor(dictionary=True)); dates come back as stored"""
+        def text(value):
+            return value if value is None or isinstance(value, str) else str(value)
+
+        ranges = json.loads(row["msisdn_ranges"]) if row.get("msisdn_ranges") else []
+        single = json.loads(row["msisdn_single"]) if row.get("msisdn_single") else ([row["MSISDN"]] if row.get("MSISDN") else [])
+        return cls(
+            *(text(row.get(name)) for name in NOTIFICATION_SCALAR_FIELDS),
+            msisdn_single=tuple(single),
+            msisdn_ranges=tuple(MsisdnRange(r["initial_value"], r["final_value"]) for r in ranges),
+            subscriber=Subscriber(
+                row.get("subscriber_id_type"),
+                row.get("subscriber_id_number"),
+                row.get("subscriber_first_name"),
+                row.get("subscriber_last_name_1"),
+                row.get("subscriber_last_name_2"),
+                row.get("company_name"),
+            ),
+        )
+
+    # Converters
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Legacy nested dict, as returned by parse_portout_response()"""
+        data: Dict[str, Any] = {name: getattr(self, name) for name in NOTIFICATION_SCALAR_FIELDS}
+        data["msisdn_single"] = list(self.msisdn_single)
+        data["msisdn_ranges"] = [r.to_dict() for r in self.msisdn_ranges]
+        data["subscriber"] = self.subscriber.to_dict()
+        return data
+
+    def to_message(self) -> List[Any]:
+        """Compact JSON-serialisable positional list for Celery messages"""
+        message: List[Any] = [getattr(self, name) for name in NOTIFICATION_SCALAR_FIELDS]
+        message.append(list(self.msisdn_single))
+        message.append([[r.initial_value, r.final_value] for r in self.msisdn_ranges])
+        message.append([getattr(self.subscriber, name) for name in SUBSCRIBER_FIELDS])
+        return message
+
+    def to_row(self, metadata_id: Optional[int], status_nc: str = 'RECEIVED', status_bss: str = 'PENDING') -> tuple:
+        """Values for PORTOUT_REQUEST_INSERT_SQL in services/database_service.py"""
+        sub = self.subscriber
+        return (
+            metadata_id,
+            self.notification_id,
+            normalize_datetime(self.creation_date),
+            _flag(self.synchronized),
+            self.reference_code,
+            self.status,
+            normalize_datetime(self.state_date),
+            normalize_datetime(self.creation_date_request),
+            normalize_datetime(self.reading_mark_date),
+            normalize_datetime(self.state_change_deadline),
+            normalize_datetime(self.subscriber_request_date),
+            self.donor_operator_code,
+            self.receiver_operator_code,
+            _flag(self.extraordinary_donor_activation),
+            self.contract_code,
+            self.receiver_NRN,
+            normalize_datetime(self.port_window_date),
+            _flag(self.port_window_by_subscriber),
+            self.msisdn_single[0] if self.msisdn_single else None,  # For backward compatibility
+            json.dumps(list(self.msisdn_single)) if self.msisdn_single else None,
+            json.dumps([r.to_dict() for r in self.msisdn_ranges]) if self.msisdn_ranges else None,
+            sub.id_type,
+            sub.id_number,
+            sub.first_name,
+            sub.last_name_1,
+            sub.last_name_2,
+            status_nc,
+            status_bss,
+            sub.subscriber_type,
+            sub.razon_social,
+        )
+
+    def msisdn_intervals(self) -> List[Tuple[int, int]]:
+        """Numeric (start, end) of every MSISDN range, singles as (n, n); rows of portout_msisdn_range"""
+        intervals = []
+        for start, end in [(m, m) for m in self.msisdn_single] + [(r.initial_value, r.final_value) for r in self.msisdn_ranges]:
+            if not (str(start).isdigit() and str(end).isdigit()):
+                continue
+            start, end = int(start), int(end)
+            intervals.append((min(start, end), max(start, end)))
+        return intervals
+
+    def to_bss_json(self) -> Dict[str, Any]:
+        """Payload of the BSS port-out webhook (BSS_WEBHOOK_PORT_OUT_URL)"""
+        sub = self.subscriber
+        return {
+            "request_type": "Port-OUT",
+            "notification_id": self.notification_id,
+            "creation_date": normalize_datetime(self.creation_date),
+            "synchronized": _flag(self.synchronized),
+            "reference_code": self.reference_code,
+            "status": self.status,
+            "state_date": normalize_datetime(self.state_date),
+            "creation_date_request": normalize_datetime(self.creation_date_request),
+            "reading_mark_date": normalize_datetime(self.reading_mark_date),
+            "state_change_deadline": normalize_datetime(self.state_change_deadline),
+            "subscriber_request_date": normalize_datetime(self.subscriber_request_date),
+            "donor_operator_code": self.donor_operator_code,
+            "receiver_operator_code": self.receiver_operator_code,
+            "extraordinary_donor_activation": _flag(self.extraordinary_donor_activation),
+            "contract_code": self.contract_code,
+            "receiver_NRN": self.receiver_NRN,
+            "port_window_date": normalize_datetime(self.port_window_date),
+            "port_window_by_subscriber": _flag(self.port_window_by_subscriber),
+            "msisdn_single": list(self.msisdn_single),
+            "msisdn_ranges": [r.to_dict() for r in self.msisdn_ranges],
+            "subscriber_type": sub.subscriber_type,
+            "company_name": sub.razon_social,
+            "subscriber": {
+                "id_type": sub.id_type,
+                "id_number": sub.id_number,
+                "first_name": sub.first_name,
+                "last_name_1": sub.last_name_1,
+                "last_name_2": sub.last_name_2,
+            },
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class NcStatus:
+    """Status of one port-in process from ConsultarProcesosPortabilidadMovil"""
+    response_code: Optional[str] = None
+    description: Optional[str] = None
+    reference_code: Optional[str] = None
+    state: Optional[str] = None
+    process_type: Optional[str] = None
+    porting_window: Optional[str] = None
+    creation_date: Optional[str] = None
+    reject_reason: Optional[str] = None
+    reject_date: Optional[str] = None
+
+    @classmethod
+    def from_response(cls, content: Union[bytes, str, SoapResponse], reference_code: str) -> Optional["NcStatus"]:
+        """
+        Status of the <registro> matching reference_code, None if the response is not
+        parseable or does not contain it (same matching as parse_soap_response_nested_multi).
+        """
+        try:
+            parsed = SoapResponse.parse(content)
+        except Exception:
+            return None
+        wanted = str(reference_code).strip()
+        for reg in parsed.records("registro"):
+            if reg.get("codigoReferencia") == wanted:
+                return cls(
+                    response_code=parsed.last("codigoRespuesta"),
+                    description=parsed.last("descripcion"),
+                    reference_code=reg.get("codigoReferencia"),
+                    state=reg.get("estado"),
+                    process_type=reg.get("tipoProceso"),
+                    porting_window=reg.get("fechaVentanaCambio"),
+                    creation_date=reg.get("fechaCreacion"),
+                    reject_reason=reg.get("causaRechazo"),
+                    reject_date=reg.get("fechaRechazo"),
+                )
+        return None
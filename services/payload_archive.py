@@ -0,0 +1,431 @@
+"""
+Indexed, compressed archive of NC/BSS payloads.
+
+Every payload written to the mnp_payload logger is also appended, by PayloadArchiveHandler in
+the logger's background writer thread, to a segment file under PAYLOAD_ARCHIVE_DIR:
+
+    <ts>-<host>-<pid>-<seq>.seg    b"MNPARCH1 <zdict id>\\n" + one zlib stream per exchange
+                                   (JSON header [ts, service, operation, direction, request_id], "\\n", payload)
+    <ts>-<host>-<pid>-<seq>.idx    fixed-size entries appended while the segment is active
+    <ts>-<host>-<pid>-<seq>.sidx   the same entries sorted by key, written when the segment rotates
+
+Each exchange is compressed on its own (random access by offset) with a preset dictionary built
+from the SOAP templates, which is what makes small envelopes compress well. An index entry maps
+the hash of one key (reference_code, msisdn, request_id or soap_action) to the timestamp, offset
+and length of the exchange. Lookups mmap the index files: sorted indexes are binary searched,
+the few active ones are scanned, and only the matching records are read and decompressed.
+
+Every process writes its own segments, so API workers and Celery children never share a file.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import socket
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from services.payload_log import LazyPayload, minify_payload
+
+SEGMENT_MAGIC = b"MNPARCH1"
+SEGMENT_SUFFIX = ".seg"
+ACTIVE_INDEX_SUFFIX = ".idx"
+SORTED_INDEX_SUFFIX = ".sidx"
+
+# key hash, timestamp (epoch seconds), offset in the segment, compressed length
+INDEX_ENTRY = struct.Struct("<8sIII")
+KEY_HASH_SIZE = 8
+
+KEY_KINDS = ("reference_code", "msisdn", "request_id", "soap_action")
+HEADER_FIELDS = ("ts", "service", "operation", "direction", "request_id")
+
+REFERENCE_CODE_RE = re.compile(rb"<(?:\w+:)?codigoReferencia>\s*([^<\s]+)\s*<")
+MSISDN_RE = re.compile(rb"<(?:\w+:)?(?:MSISDN|msisdn|valorInicial)>\s*(\d+)\s*<")
+SOAP_ACTION_RE = re.compile(rb"<(?:\w+:)?Body[^>]*>\s*<(?:\w+:)?(\w+)")
+JSON_REFERENCE_CODE_RE = re.compile(rb"""['"]reference_code['"]\s*:\s*['"]([^'"]+)['"]""")
+JSON_MSISDN_RE = re.compile(rb"""['"]msisdn['"]\s*:\s*['"]?(\d+)""")
+
+COMPRESSION_LEVEL = 6
+
+# NC response vocabulary for the preset dictionary (responses are not built from templates)
+NC_RESPONSE_VOCABULARY = (
+    '<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Header/><S:Body>'
+    '<ns2:respuestaConsultarProcesosPortabilidadMovil xmlns:ns2="http://nc.aopm.es/v1-10/portabilidad" '
+    'xmlns="http://nc.aopm.es/v1-10"><ns2:codigoRespuesta>0000 00000</ns2:codigoRespuesta>'
+    '<ns2:descripcion>La operación se ha realizado con éxito</ns2:descripcion><ns2:registro>'
+    '<ns2:codigoReferencia></ns2:codigoReferencia><ns2:estado></ns2:estado>'
+    '<ns2:tipoProceso>ALTA_PORTABILIDAD_MOVIL</ns2:tipoProceso><ns2:fechaEstado></ns2:fechaEstado>'
+    '<ns2:fechaCreacion></ns2:fechaCreacion><ns2:fechaMarcaLectura></ns2:fechaMarcaLectura>'
+    '<ns2:fechaVentanaCambio>T02:00:00+01:00</ns2:fechaVentanaCambio>'
+    '<ns2:codigoOperadorDonante></ns2:codigoOperadorDonante><ns2:codigoOperadorReceptor></ns2:codigoOperadorReceptor>'
+    '<ns2:causaRechazo></ns2:causaRechazo><ns2:fechaRechazo></ns2:fechaRechazo>'
+    '<ns2:causaCancelacion></ns2:causaCancelacion><ns2:fechaCancelacion></ns2:fechaCancelacion>'
+    '<ns2:rangoMSISDN><ns2:valorInicial></ns2:valorInicial><ns2:valorFinal></ns2:valorFinal></ns2:rangoMSISDN>'
+    '<ns2:MSISDN></ns2:MSISDN></ns2:registro><ns2:notificacion><ns2:solicitud><ns2:sincronizada>false</ns2:sincronizada>'
+    '<ns2:abonado><ns2:documentoIdentificacion><ns2:tipo>NIF</ns2:tipo><ns2:documento></ns2:documento>'
+    '</ns2:documentoIdentificacion><ns2:datosPersonales><ns2:nombre></ns2:nombre><ns2:primerApellido></ns2:primerApellido>'
+    '<ns2:segundoApellido></ns2:segundoApellido></ns2:datosPersonales></ns2:abonado></ns2:solicitud></ns2:notificacion>'
+    '<ns2:codigoPeticionPaginada></ns2:codigoPeticionPaginada><ns2:ultimaPagina>true</ns2:ultimaPagina>'
+    '</ns2:respuestaConsultarProcesosPortabilidadMovil></S:Body></S:Envelope>'
+)
+
+
+def key_hash(kind: str, value: Any) -> bytes:
+    return hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=KEY_HASH_SIZE).digest()
+
+
+def extract_keys(data: bytes, request_id: Any = None) -> Dict[str, List[str]]:
+    """Lookup keys found in a minified payload (SOAP envelope, JSON or dict repr)"""
+    keys: Dict[str, List[str]] = {}
+    references = REFERENCE_CODE_RE.findall(data) or JSON_REFERENCE_CODE_RE.findall(data)
+    msisdns = MSISDN_RE.findall(data) or JSON_MSISDN_RE.findall(data)
+    if references:
+        keys["reference_code"] = sorted({v.decode("ascii", "replace") for v in references})
+    if msisdns:
+        keys["msisdn"] = sorted({v.decode("ascii") for v in msisdns})
+    action = SOAP_ACTION_RE.search(data)
+    if action:
+        keys["soap_action"] = [action.group(1).decode("ascii")]
+    if request_id is not None:
+        keys["request_id"] = [str(request_id)]
+    return keys
+
+
+def build_zdict() -> bytes:
+    """Preset compression dictionary: SOAP templates and NC response vocabulary (zlib window: last 32 KiB)"""
+    from templates import soap_templates
+
+    templates = sorted(
+        (value for name, value in vars(soap_templates).items() if name.isupper() and isinstance(value, str)),
+        key=len,
+    )
+    templates.append(NC_RESPONSE_VOCABULARY)
+    return minify_payload("".join(templates).encode("utf-8"))[-32768:]
+
+
+def _zdict_id(zdict: bytes) -> str:
+    return hashlib.blake2b(zdict, digest_size=8).hexdigest()
+
+
+class PayloadArchive:
+    """Segment writer and index reader of one archive directory"""
+
+    def __init__(self, directory: Optional[str] = None, segment_bytes: Optional[int] = None,
+                 retention_days: Optional[int] = None, zdict: Optional[bytes] = None):
+        self.directory = directory or settings.PAYLOAD_ARCHIVE_DIR
+        self.segment_bytes = segment_bytes or settings.PAYLOAD_ARCHIVE_SEGMENT_BYTES
+        self.retention_days = retention_days if retention_days is not None else settings.PAYLOAD_ARCHIVE_RETENTION_DAYS
+        self.zdict = build_zdict() if zdict is None else zdict
+        self.zdict_id = _zdict_id(self.zdict)
+        self._zdicts: Dict[str, bytes] = {self.zdict_id: self.zdict}
+        self._segment_dicts: Dict[str, bytes] = {}
+        self._host = socket.gethostname().replace("-", "_")
+        self._pid = None
+        self._seq = 0
+        self._base = None
+        self._segment = None
+        self._index = None
+        self._size = 0
+
+    # Writer
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        zdict_file = os.path.join(self.directory, f"zdict-{self.zdict_id}.bin")
+        if not os.path.exists(zdict_file):
+            tmp_file = f"{zdict_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(self.zdict)
+            os.replace(tmp_file, zdict_file)
+
+        if self._pid != os.getpid():
+            # Forked: the parent's segment is not ours (every record was flushed, closing is safe)
+            self._close_files()
+            self._pid = os.getpid()
+            self._seq = 0
+        self._seq += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._base = os.path.join(self.directory, f"{stamp}-{self._host}-{self._pid}-{self._seq}")
+        self._segment = open(self._base + SEGMENT_SUFFIX, "ab")
+        self._index = open(self._base + ACTIVE_INDEX_SUFFIX, "ab")
+        header = SEGMENT_MAGIC + b" " + self.zdict_id.encode("ascii") + b"\n"
+        self._segment.write(header)
+        self._segment.flush()
+        self._size = len(header)
+
+    def _close_files(self) -> None:
+        for f in (self._segment, self._index):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self._segment = self._index = None
+
+    def append(self, header: Dict[str, Any], payload: bytes, keys: Dict[str, List[str]]) -> None:
+        """Append one exchange; header carries HEADER_FIELDS ("ts" in epoch seconds)"""
+        if self._segment is None or self._pid != os.getpid():
+            self._open_segment()
+
+        compact = json.dumps([header.get(name) for name in HEADER_FIELDS], separators=(",", ":"))
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=self.zdict)
+        record = compressor.compress(compact.encode("utf-8") + b"\n" + payload) + compressor.flush()
+
+        offset = self._size
+        self._segment.write(record)
+        self._segment.flush()  # data before index: readers never see an entry pointing past EOF
+        self._size += len(record)
+        self._index.write(b"".join(
+            INDEX_ENTRY.pack(key_hash(kind, value), int(header["ts"]), offset, len(record))
+            for kind, values in keys.items() for value in values
+        ))
+        self._index.flush()
+
+        if self._size >= self.segment_bytes:
+            self.seal()
+
+    def seal(self) -> None:
+        """Close the active segment and replace its append index with a sorted one"""
+        base = self._base
+        self._close_files()
+        self._base = None
+        if base is None:
+            return
+        seal_index(base + ACTIVE_INDEX_SUFFIX)
+        self.maintain()
+
+    def maintain(self) -> None:
+        """
+        Seal the append indexes left by dead processes of this host (Celery children exit
+        without running atexit) and delete segments older than the retention period.
+        """
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days else None
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(ACTIVE_INDEX_SUFFIX):
+                parts = name[:-len(ACTIVE_INDEX_SUFFIX)].split("-")
+                if len(parts) == 4 and parts[1] == self._host and not _pid_alive(int(parts[2])):
+                    try:
+                        seal_index(path)
+                    except OSError:
+                        pass
+                continue
+            if cutoff is None or not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                base = path[:-len(SEGMENT_SUFFIX)]
+                for suffix in (SORTED_INDEX_SUFFIX, ACTIVE_INDEX_SUFFIX, SEGMENT_SUFFIX):
+                    if os.path.exists(base + suffix):
+                        os.remove(base + suffix)
+            except OSError:
+                continue
+
+    # Reader
+
+    def _index_files(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        sealed = {name[:-len(SORTED_INDEX_SUFFIX)] for name in names if name.endswith(SORTED_INDEX_SUFFIX)}
+        files = [name for name in names if name.endswith(SORTED_INDEX_SUFFIX)]
+        # An append index is only read while its segment has not been sealed yet
+        files += [name for name in names
+                  if name.endswith(ACTIVE_INDEX_SUFFIX) and name[:-len(ACTIVE_INDEX_SUFFIX)] not in sealed]
+        return [os.path.join(self.directory, name) for name in files]
+
+    def _segment_zdict(self, segment_path: str) -> bytes:
+        zdict = self._segment_dicts.get(segment_path)
+        if zdict is None:
+            with open(segment_path, "rb") as f:
+                magic, zdict_id = f.readline().split()
+            if magic != SEGMENT_MAGIC:
+                raise ValueError(f"{segment_path} is not a payload archive segment")
+            zdict_id = zdict_id.decode("ascii")
+            if zdict_id not in self._zdicts:
+                with open(os.path.join(self.directory, f"zdict-{zdict_id}.bin"), "rb") as f:
+                    self._zdicts[zdict_id] = f.read()
+            zdict = self._segment_dicts[segment_path] = self._zdicts[zdict_id]
+        return zdict
+
+    def read_record(self, segment_path: str, offset: int, length: int) -> Tuple[Dict[str, Any], bytes]:
+        with open(segment_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        decompressor = zlib.decompressobj(zdict=self._segment_zdict(segment_path))
+        raw = decompressor.decompress(data) + decompressor.flush()
+        header, _, payload = raw.partition(b"\n")
+        return dict(zip(HEADER_FIELDS, json.loads(header))), payload
+
+    def find(self, kind: str, value: Any, since: Optional[float] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Exchanges whose kind key equals value, oldest first (at most limit, the most recent kept)"""
+        if kind not in KEY_KINDS:
+            raise ValueError(f"Unknown payload archive key {kind!r}, expected one of {KEY_KINDS}")
+        value = str(value).strip()
+        wanted = key_hash(kind, value)
+
+        hits = []
+        for index_path in self._index_files():
+            segment_path = index_path.rsplit(".", 1)[0] + SEGMENT_SUFFIX
+            for ts, offset, length in search_index(index_path, wanted):
+                if since is None or ts >= int(since):
+                    hits.append((ts, segment_path, offset, length))
+        hits.sort()
+
+        exchanges = []
+        for ts, segment_path, offset, length in reversed(hits):
+            try:
+                header, payload = self.read_record(segment_path, offset, length)
+            except (OSError, ValueError, zlib.error):
+                continue  # segment expired meanwhile, or a truncated write
+            if value not in extract_keys(payload, header["request_id"]).get(kind, ()):
+                continue  # 64-bit hash collision
+            header["timestamp"] = datetime.fromtimestamp(header.pop("ts"), timezone.utc).isoformat()
+            header["payload"] = payload.decode("utf-8", "replace")
+            exchanges.append(header)
+            if len(exchanges) >= limit:
+                break
+        exchanges.reverse()
+        return exchanges
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def seal_index(index_path: str) -> None:
+    """Rewrite an append index as a sorted index (entries ordered by key hash)"""
+    with open(index_path, "rb") as f:
+        data = f.read()
+    size = INDEX_ENTRY.size
+    entries = sorted(data[i:i + size] for i in range(0, len(data) - len(data) % size, size))
+    sorted_path = index_path[:-len(ACTIVE_INDEX_SUFFIX)] + SORTED_INDEX_SUFFIX
+    tmp_file = f"{sorted_path}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(b"".join(entries))
+    os.replace(tmp_file, sorted_path)
+    os.remove(index_path)
+
+
+def search_index(index_path: str, wanted: bytes) -> Iterator[Tuple[int, int, int]]:
+    """(timestamp, offset, length) of the entries for one key hash, via mmap"""
+    try:
+        with open(index_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            count = file_size // INDEX_ENTRY.size  # an active index may end with a partial entry
+            if not count:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = INDEX_ENTRY.size
+                if index_path.endswith(SORTED_INDEX_SUFFIX):
+                    lo, hi = 0, count
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if mm[mid * size:mid * size + KEY_HASH_SIZE] < wanted:
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    while lo < count and mm[lo * size:lo * size + KEY_HASH_SIZE] == wanted:
+                        _, ts, offset, length = INDEX_ENTRY.unpack_from(mm, lo * size)
+                        yield ts, offset, length
+                        lo += 1
+                else:
+                    position = mm.find(wanted)
+                    while position != -1 and position + size <= count * size:
+                        if position % size == 0:
+                            _, ts, offset, length = INDEX_ENTRY.unpack_from(mm, position)
+                            yield ts, offset, length
+                        position = mm.find(wanted, position + 1)
+    except (FileNotFoundError, ValueError):
+        return  # sealed or expired between listdir() and open()
+
+
+class PayloadArchiveHandler(logging.Handler):
+    """
+    mnp_payload handler archiving the records produced by log_payload(); runs in the
+    logger's writer thread, where the LazyPayload is resolved once for every handler.
+    """
+
+    def __init__(self, archive: PayloadArchive):
+        super().__init__(logging.INFO)
+        self.archive = archive
+
+    def emit(self, record: logging.LogRecord) -> None:
+        args = record.args
+        if not (isinstance(args, tuple) and len(args) == 4 and isinstance(args[3], LazyPayload)):
+            return
+        try:
+            service_type, operation, direction, lazy = args
+            data = lazy.data()
+            request_id = getattr(record, "payload_request_id", None)
+            header = {
+                "ts": round(record.created, 3),
+                "service": service_type,
+                "operation": operation,
+                "direction": direction,
+                "request_id": None if request_id is None else str(request_id),
+            }
+            self.archive.append(header, data, extract_keys(data, request_id))
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        try:
+            if self.archive._pid == os.getpid():
+                self.archive.seal()
+        finally:
+            super().close()
+
+
+_archive: Optional[PayloadArchive] = None
+_handler: Optional[PayloadArchiveHandler] = None
+
+
+def get_payload_archive() -> PayloadArchive:
+    """Process-wide archive of PAYLOAD_ARCHIVE_DIR"""
+    global _archive
+    if _archive is None:
+        _archive = PayloadArchive()
+    return _archive
+
+
+def get_archive_handler() -> Optional[PayloadArchiveHandler]:
+    """Shared handler for the mnp_payload logger, None when the archive is disabled"""
+    global _handler
+    if not settings.PAYLOAD_ARCHIVE_ENABLED:
+        return None
+    if _handler is None:
+        _handler = PayloadArchiveHandler(get_payload_archive())
+    return _handler
+
+
+def find_exchanges(since: Optional[float] = None, limit: int = 100, **criteria: Any) -> List[Dict[str, Any]]:
+    """
+    Archived exchanges matching every given criterion (reference_code, msisdn, request_id,
+    soap_action); the first criterion drives the index lookup, the others filter its hits.
+    """
+    criteria = {kind: str(value).strip() for kind, value in criteria.items() if value}
+    if not criteria:
+        raise ValueError(f"At least one of {KEY_KINDS} is required")
+    (kind, value), *filters = criteria.items()
+    exchanges = get_payload_archive().find(kind, value, since=since, limit=limit if not filters else 1_000_000)
+    if filters:
+        exchanges = [
+            e for e in exchanges
+            if all(v in extract_keys(e["payload"].encode("utf-8"), e["request_id"]).get(k, ()) for k, v in filters)
+        ][-limit:]
+    return exchanges
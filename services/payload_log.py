@@ -0,0 +1,79 @@
+"""
+Lazy, capped and sampled payload logging.
+
+log_payload() callers pass the payload as-is (bytes, str, dict, or a zero-argument callable
+returning one of those) instead of building strings up front. When payload logging is off
+for the service type, or the record is not sampled for its direction, nothing is evaluated.
+Otherwise the payload is wrapped in a LazyPayload and handed to the payload logger as a
+logging argument: the background writer (services/log_queue.py) resolves it, caps it at the
+per-direction size limit and minifies it, so the caller only pays for the enqueue.
+"""
+import random
+from typing import Any, Callable, Union
+
+from config import settings
+
+PayloadSource = Union[bytes, str, dict, list, Callable[[], Any], None]
+
+TRUNCATED_MARKER = "...[truncated {} bytes]"
+
+
+def payload_limits(direction: str):
+    """(max_bytes, sample_rate) for REQUEST / RESPONSE payloads"""
+    if direction == 'RESPONSE':
+        return settings.PAYLOAD_LOG_MAX_BYTES_RESPONSE, settings.PAYLOAD_LOG_SAMPLE_RATE_RESPONSE
+    return settings.PAYLOAD_LOG_MAX_BYTES_REQUEST, settings.PAYLOAD_LOG_SAMPLE_RATE_REQUEST
+
+
+def is_sampled(sample_rate: float) -> bool:
+    return sample_rate >= 1 or (sample_rate > 0 and random.random() < sample_rate)
+
+
+def minify_payload(data: bytes) -> bytes:
+    """Collapse every whitespace run to one space and drop whitespace between tags (C-level passes)"""
+    return b" ".join(data.split()).replace(b"> <", b"><")
+
+
+class LazyPayload:
+    """Payload resolved, capped and minified only when the log record is formatted"""
+    __slots__ = ("source", "max_bytes", "_data")
+
+    def __init__(self, source: PayloadSource, max_bytes: int):
+        # Mutable containers are rendered now, they could change before the writer runs
+        self.source = repr(source) if isinstance(source, (dict, list)) else source
+        self.max_bytes = max_bytes
+        self._data = None
+
+    def data(self) -> bytes:
+        """Full minified payload (uncapped), resolved once and shared by all writer handlers"""
+        if self._data is None:
+            source = self.source
+            if callable(source):
+                source = source()
+            if source is None:
+                data = b""
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                data = bytes(source)
+            else:
+                data = (source if isinstance(source, str) else str(source)).encode("utf-8", "replace")
+            self._data = minify_payload(data)
+        return self._data
+
+    def __str__(self) -> str:
+        data = self.data()
+        truncated = 0
+        if self.max_bytes and len(data) > self.max_bytes:
+            truncated = len(data) - self.max_bytes
+            data = data[:self.max_bytes]
+        text = data.decode("utf-8", "replace")
+        if truncated:
+            text += TRUNCATED_MARKER.format(truncated)
+        return text
+
+
+def lazy_payload(direction: str, payload: PayloadSource):
+    """LazyPayload for the direction's size cap, or None when this record is not sampled"""
+    max_bytes, sample_rate = payload_limits(direction)
+    if not is_sampled(sample_rate):
+        return None
+    return LazyPayload(payload, max_bytes)
@@ -0,0 +1,113 @@
+"""
+Adaptive polling policy for NC status checks.
+
+Each (request_type, response_status) pair maps to an interval schedule. Consecutive
+"no change" checks back off exponentially (tracked in portability_requests.poll_count),
+checks are made dense around the porting window and requests older than the max age
+are only polled at the ceiling interval.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import settings
+
+# The first check after a status change keeps the previous fixed delay
+# (TIME_DELTA_FOR_STATUS_CHECK, seconds); after that:
+# base_minutes: interval after the first check without a status change
+# max_minutes: ceiling for the exponential backoff
+# factor: growth per further check without a status change
+DEFAULT_POLLING_SCHEDULE = {"base_minutes": 15, "max_minutes": 240, "factor": 2.0}
+
+POLLING_SCHEDULES = {
+    # Just submitted, NC usually answers quickly
+    ("PORT_IN", ""): {"base_minutes": 5, "max_minutes": 60, "factor": 2.0},
+    ("PORT_IN", None): {"base_minutes": 5, "max_minutes": 60, "factor": 2.0},
+    # Waiting for donor confirmation, can take days
+    ("PORT_IN", "ASOL"): {"base_minutes": 30, "max_minutes": 240, "factor": 2.0},
+    # Confirmed, nothing happens until the porting window
+    ("PORT_IN", "ACON"): {"base_minutes": 60, "max_minutes": 360, "factor": 2.0},
+    ("CANCELLATION", ""): {"base_minutes": 5, "max_minutes": 60, "factor": 2.0},
+    ("CANCELLATION", None): {"base_minutes": 5, "max_minutes": 60, "factor": 2.0},
+    ("CANCELLATION", "ASOL"): {"base_minutes": 15, "max_minutes": 120, "factor": 2.0},
+}
+
+# Final NC states, no further checks are scheduled
+FINAL_STATUSES = ('APOR', 'AREC', 'ACAN')
+
+
+def get_polling_schedule(request_type: Optional[str], response_status: Optional[str]) -> dict:
+    """Get the interval schedule for a request type and NC status"""
+    return POLLING_SCHEDULES.get((request_type, response_status), DEFAULT_POLLING_SCHEDULE)
+
+
+def is_near_porting_window(porting_window: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """Check if now is within POLLING_WINDOW_PROXIMITY_MINUTES before or after the porting window"""
+    if not porting_window:
+        return False
+    if now is None:
+        now = datetime.now()
+    proximity = timedelta(minutes=settings.POLLING_WINDOW_PROXIMITY_MINUTES)
+    return abs(porting_window - now) <= proximity
+
+
+def next_poll_delay(request_type: Optional[str], response_status: Optional[str], poll_count: int = 0,
+                    porting_window: Optional[datetime] = None, created_at: Optional[datetime] = None,
+                    now: Optional[datetime] = None) -> Optional[timedelta]:
+    """
+    Calculate the delay until the next NC status check.
+
+    Args:
+        request_type: PORT_IN, CANCELLATION, ...
+        response_status: estado reported by NC (ASOL, ACON, ...)
+        poll_count: number of consecutive checks without a status change
+        porting_window: fechaVentanaCambio if already known
+        created_at: creation time of the request, used for the max-age cap
+        now: reference time (defaults to datetime.now())
+
+    Returns:
+        timedelta to feed into calculate_countdown_working_hours(), None for a final status
+    """
+    if now is None:
+        now = datetime.now()
+
+    schedule = get_polling_schedule(request_type, response_status)
+    max_minutes = schedule["max_minutes"]
+
+    if response_status in FINAL_STATUSES:
+        return None
+
+    # First check after a status change: same fixed delay as before the adaptive schedule
+    if poll_count <= 0:
+        return timedelta(seconds=settings.TIME_DELTA_FOR_STATUS_CHECK)
+
+    # Poll densely around the cut-over so APOR is visible quickly
+    if is_near_porting_window(porting_window, now):
+        return timedelta(minutes=settings.POLLING_NEAR_WINDOW_MINUTES)
+
+    # Old requests are only polled at the ceiling interval
+    if created_at and now - created_at > timedelta(hours=settings.POLLING_MAX_AGE_HOURS):
+        return timedelta(minutes=max(max_minutes, settings.POLLING_MAX_AGE_INTERVAL_MINUTES))
+
+    interval = schedule["base_minutes"] * (schedule["factor"] ** (poll_count - 1))
+    interval = min(interval, max_minutes)
+
+    # Never sleep past the start of the dense polling phase
+    if porting_window and porting_window > now:
+        window_start = porting_window - timedelta(minutes=settings.POLLING_WINDOW_PROXIMITY_MINUTES)
+        minutes_to_window = (window_start - now).total_seconds() / 60
+        interval = min(interval, max(minutes_to_window, settings.POLLING_NEAR_WINDOW_MINUTES))
+
+    return timedelta(minutes=interval)
+
+
+def dispatch_countdown(porting_window: Optional[datetime] = None, now: Optional[datetime] = None) -> int:
+    """
+    Countdown in seconds for queuing a due status check.
+    Checks near the porting window run immediately, others are spread over
+    POLLING_DISPATCH_SPREAD_SECONDS so a beat tick does not hit NC in one burst.
+    """
+    if is_near_porting_window(porting_window, now):
+        return 0
+    return random.randint(0, max(0, settings.POLLING_DISPATCH_SPREAD_SECONDS))
+
@@ -0,0 +1,224 @@
+"""
+Read-through cache of single portability requests (GET /portability-requests/...).
+
+BSS polls a request's status far more often than the status changes, and every poll used to
+open a MySQL connection. Lookups now go through two layers:
+
+    in-process LRU   PORTABILITY_CACHE_LOCAL_SIZE entries for PORTABILITY_CACHE_LOCAL_TTL_SECONDS;
+                     kept short because writers in Celery workers cannot reach it
+    Redis            mnp:preq:rec:<id>       {"etag", "record"} for PORTABILITY_CACHE_TTL_SECONDS
+                     mnp:preq:ref:<code>     request id of a reference_code
+                     mnp:preq:msisdn:<n>     id of the latest PORT_IN for an MSISDN
+                                             (PORTABILITY_CACHE_MSISDN_TTL_SECONDS)
+
+Writers call invalidate_portability_request() after committing a change to status_nc,
+status_bss or response_status. It bumps mnp:preq:gen:<id> and deletes the record; a reader
+only stores what it loaded if the generation it saw before querying MySQL is still current,
+so a read racing with an update cannot put the old row back.
+
+The ETag is a hash of the record, so an If-None-Match poll of an unchanged request is
+answered 304 from the cache. Redis errors fall back to MySQL.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config import settings
+from services.logger import logger
+from services.redis_client import get_redis
+
+KEY_PREFIX = "mnp:preq"
+LOOKUP_REFERENCE_CODE = "ref"
+LOOKUP_MSISDN = "msisdn"
+
+# Store the loaded record only if the generation read before the query is unchanged
+_FILL_SCRIPT = """
+local gen = redis.call('get', KEYS[1]) or '0'
+if gen == ARGV[1] then
+    redis.call('set', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class _LocalLRU:
+    """Small TTL'd LRU shared by the request threads of one worker process"""
+
+    def __init__(self, size: int, ttl_seconds: float):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        if self.size <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_local = _LocalLRU(settings.PORTABILITY_CACHE_LOCAL_SIZE, settings.PORTABILITY_CACHE_LOCAL_TTL_SECONDS)
+
+
+def _record_key(request_id: int) -> str:
+    return f"{KEY_PREFIX}:rec:{request_id}"
+
+
+def _gen_key(request_id: int) -> str:
+    return f"{KEY_PREFIX}:gen:{request_id}"
+
+
+def _lookup_key(lookup: str, value: str) -> str:
+    return f"{KEY_PREFIX}:{lookup}:{value}"
+
+
+def _entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    """{"etag", "record"}; the ETag changes with any field, updated_at included"""
+    digest = hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return {"etag": f'"{digest[:32]}"', "record": record}
+
+
+def get_portability_request(request_id: int,
+                            load: Callable[[int], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Cached {"etag", "record"} of a portability request, loading it with load(request_id) on a miss.
+
+    Returns:
+        dict or None: None when the request does not exist (misses are not cached)
+    """
+    if not settings.PORTABILITY_CACHE_ENABLED:
+        record = load(request_id)
+        return _entry(record) if record else None
+
+    local_key = _record_key(request_id)
+    entry = _local.get(local_key)
+    if entry is not None:
+        return entry
+
+    redis_client = None
+    generation = None
+    try:
+        redis_client = get_redis()
+        cached, generation = redis_client.mget(_record_key(request_id), _gen_key(request_id))
+        if cached:
+            entry = json.loads(cached)
+            _local.put(local_key, entry)
+            return entry
+    except Exception as e:
+        logger.warning("Portability request cache unavailable, reading MySQL: %s", e)
+        redis_client = None
+
+    record = load(request_id)
+    if not record:
+        return None
+    entry = _entry(record)
+    if redis_client is not None:
+        try:
+            redis_client.eval(_FILL_SCRIPT, 2, _gen_key(request_id), _record_key(request_id),
+                              generation.decode() if generation else "0",
+                              json.dumps(entry), settings.PORTABILITY_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.warning("Could not cache portability request %s: %s", request_id, e)
+    _local.put(local_key, entry)
+    return entry
+
+
+def get_request_id(lookup: str, value: str,
+                   resolve: Callable[[str, str], Optional[int]]) -> Optional[int]:
+    """
+    Request id for a reference_code (LOOKUP_REFERENCE_CODE) or the latest PORT_IN of an MSISDN
+    (LOOKUP_MSISDN), resolving it with resolve(lookup, value) on a miss.
+    """
+    if not settings.PORTABILITY_CACHE_ENABLED:
+        return resolve(lookup, value)
+
+    key = _lookup_key(lookup, value)
+    request_id = _local.get(key)
+    if request_id is not None:
+        return request_id
+    try:
+        cached = get_redis().get(key)
+        if cached:
+            request_id = int(cached)
+            _local.put(key, request_id)
+            return request_id
+    except Exception as e:
+        logger.warning("Portability request cache unavailable, reading MySQL: %s", e)
+
+    request_id = resolve(lookup, value)
+    if request_id is None:
+        return None
+    # A reference code never moves to another request; the latest port-in of an MSISDN does
+    ttl = settings.PORTABILITY_CACHE_TTL_SECONDS if lookup == LOOKUP_REFERENCE_CODE else settings.PORTABILITY_CACHE_MSISDN_TTL_SECONDS
+    try:
+        get_redis().set(key, request_id, ex=ttl)
+    except Exception as e:
+        logger.warning("Could not cache %s lookup %s: %s", lookup, value, e)
+    _local.put(key, request_id)
+    return request_id
+
+
+def invalidate_portability_request(request_id: Optional[int]) -> None:
+    """Drop a request from the cache after its status change was committed"""
+    if request_id is not None:
+        invalidate_portability_requests([request_id])
+
+
+def invalidate_portability_requests(request_ids: Iterable[int]) -> None:
+    """invalidate_portability_request() for several requests in one Redis round trip"""
+    request_ids = list(request_ids)
+    if not request_ids or not settings.PORTABILITY_CACHE_ENABLED:
+        return
+    for request_id in request_ids:
+        _local.pop(_record_key(request_id))
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for request_id in request_ids:
+            pipe.incr(_gen_key(request_id))
+            pipe.expire(_gen_key(request_id), settings.PORTABILITY_CACHE_TTL_SECONDS * 2)
+            pipe.delete(_record_key(request_id))
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Could not invalidate cached portability requests %s: %s", request_ids, e)
+
+
+def invalidate_portability_msisdn(msisdn: Optional[str]) -> None:
+    """Forget the latest port-in of an MSISDN after a new one was inserted"""
+    if msisdn:
+        invalidate_portability_msisdns([msisdn])
+
+
+def invalidate_portability_msisdns(msisdns: Iterable[str]) -> None:
+    """invalidate_portability_msisdn() for several MSISDNs (bulk port-in) in one Redis round trip"""
+    keys = [_lookup_key(LOOKUP_MSISDN, msisdn) for msisdn in msisdns if msisdn]
+    if not keys or not settings.PORTABILITY_CACHE_ENABLED:
+        return
+    for key in keys:
+        _local.pop(key)
+    try:
+        get_redis().delete(*keys)
+    except Exception as e:
+        logger.warning("Could not invalidate cached MSISDN lookups %s: %s", keys, e)
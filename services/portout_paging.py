@@ -0,0 +1,131 @@
+"""
+Paged fetch of NC port-out notifications within one check_status_port_out run.
+
+NC answers obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar
+one page at a time: codigoPeticionPaginada identifies the next page and ultimaPagina marks the
+end. iter_portout_pages() follows the sequence until the last page, the per-run time budget or
+the page cap, and pipelines it: as soon as the header of page N is parsed, the request for page
+N+1 is already in flight on a background thread while the caller persists page N and hands it
+to BSS.
+
+The code of the next page to fetch is checkpointed in Redis (PortOutCursor) only after the
+caller has persisted a page, so a crash or a budget stop resumes mid-sequence on the next run;
+a page persisted twice is harmless because ingestion skips existing reference codes.
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+from config import settings
+from services.logger import logger
+from services.portout_stream import PortOutNotificationStream
+from services.redis_client import acquire_lock, get_redis, release_lock
+from services.soap_response import SUCCESS_CODE
+
+CURSOR_KEY = "mnp:portout:cursor"
+RUN_LOCK_KEY = "mnp:portout:run-lock"
+
+# Fetches one page: paged_request_code (None for the first page) -> (SOAP request, raw SOAP response)
+PageFetcher = Callable[[Optional[str]], Tuple[Any, bytes]]
+
+
+class PortOutPage:
+    """One fetched page; records are streamed from content by the caller"""
+    __slots__ = ("number", "request_code", "request_payload", "content", "stream", "meta", "next_code", "is_last")
+
+    def __init__(self, number: int, request_code: Optional[str], fetched: Tuple[Any, bytes]):
+        self.number = number
+        self.request_code = request_code
+        self.request_payload, self.content = fetched
+        self.stream = PortOutNotificationStream(self.content)
+        self.meta = self.stream.read_header()
+        self.next_code = self.meta.get("paged_request_code")
+        self.is_last = (str(self.meta.get("is_last_page")).lower() == "true"
+                        or self.total_records == 0 or not self.next_code)
+
+    @property
+    def total_records(self) -> int:
+        return int(self.meta.get("total_records") or 0)
+
+    @property
+    def ok(self) -> bool:
+        return (self.meta.get("response_code") or "").strip() == SUCCESS_CODE
+
+
+class PortOutCursor:
+    """Redis checkpoint of the paging sequence, plus the lock that keeps runs from overlapping"""
+
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+
+    def load(self) -> Optional[str]:
+        try:
+            value = get_redis().get(CURSOR_KEY)
+        except Exception as e:
+            logger.warning("Port-out paging checkpoint unavailable, starting from the first page: %s", e)
+            return None
+        return value.decode("utf-8") if value else None
+
+    def save(self, paged_request_code: Optional[str]) -> None:
+        """Next page to fetch; None clears the checkpoint (sequence finished)"""
+        try:
+            if paged_request_code:
+                get_redis().set(CURSOR_KEY, paged_request_code, ex=settings.PORT_OUT_CURSOR_TTL_SECONDS)
+            else:
+                get_redis().delete(CURSOR_KEY)
+        except Exception as e:
+            logger.warning("Could not checkpoint port-out paging cursor %s: %s", paged_request_code, e)
+
+    def acquire(self) -> bool:
+        """One paging run at a time; a run outliving the beat interval makes the next tick skip"""
+        ttl = settings.PORT_OUT_RUN_BUDGET_SECONDS + 2 * settings.APIGEE_API_QUERY_TIMEOUT + 30
+        try:
+            return acquire_lock(RUN_LOCK_KEY, self.token, ttl)
+        except Exception as e:
+            logger.warning("Port-out run lock unavailable, running unlocked: %s", e)
+            return True
+
+    def release(self) -> None:
+        try:
+            release_lock(RUN_LOCK_KEY, self.token)
+        except Exception as e:
+            logger.warning("Could not release port-out run lock: %s", e)
+
+
+def iter_portout_pages(fetch_page: PageFetcher, start_code: Optional[str] = None,
+                       budget_seconds: Optional[float] = None,
+                       max_pages: Optional[int] = None) -> Iterator[PortOutPage]:
+    """
+    Yield the pages of one paging sequence, prefetching page N+1 while page N is consumed.
+    Stops after the last page, when the budget is spent or after max_pages; an expired
+    start_code (NC error on a resumed sequence) restarts from the first page once.
+    """
+    budget_seconds = settings.PORT_OUT_RUN_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    max_pages = settings.PORT_OUT_MAX_PAGES_PER_RUN if max_pages is None else max_pages
+    deadline = time.monotonic() + budget_seconds
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="portout-fetch") as fetcher:
+        code = start_code
+        future = fetcher.submit(fetch_page, code)
+        number = 1
+        while True:
+            page = PortOutPage(number, code, future.result())
+            if not page.ok and page.request_code and number == 1:
+                logger.warning("Port-out paging checkpoint %s rejected by NC (%s %s), restarting from the first page",
+                               page.request_code, page.meta.get("response_code"), page.meta.get("response_description"))
+                code = None
+                future = fetcher.submit(fetch_page, None)
+                continue
+
+            prefetch = (not page.is_last and page.ok and number < max_pages
+                        and time.monotonic() < deadline)
+            if prefetch:
+                code = page.next_code
+                future = fetcher.submit(fetch_page, code)
+
+            yield page
+
+            if not prefetch:
+                return
+            number += 1
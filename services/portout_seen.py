@@ -0,0 +1,79 @@
+"""
+Redis seen-set of port-out reference codes.
+
+NC returns the same pending port-out notifications on every poll until they are confirmed or
+rejected, so most records of a page are already in portout_request, and most of those were
+already sent to BSS. Two Redis sorted sets remember them (member = reference_code, score =
+time it was last confirmed against MySQL):
+
+    mnp:portout:seen:stored      the row exists in portout_request
+    mnp:portout:seen:submitted   the row exists and submitted_to_bss = 1
+
+Members are only added after the corresponding MySQL commit, so a hit is a fact that was true
+in the database and ingestion/callbacks skip the record without a query. A miss (never seen,
+trimmed after PORT_OUT_SEEN_TTL_SECONDS, or Redis unavailable) falls back to MySQL as before.
+"""
+import time
+from typing import Iterable, Set, Tuple
+
+from config import settings
+from services.logger import logger
+from services.redis_client import get_redis
+
+STORED_KEY = "mnp:portout:seen:stored"
+SUBMITTED_KEY = "mnp:portout:seen:submitted"
+
+
+def _codes(reference_codes: Iterable[str]) -> list:
+    return list({code for code in reference_codes if code})
+
+
+def lookup_seen(reference_codes: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """(stored, submitted) subsets of reference_codes known to Redis; submitted is within stored"""
+    codes = _codes(reference_codes)
+    if not codes or not settings.PORT_OUT_SEEN_CACHE_ENABLED:
+        return set(), set()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zmscore(STORED_KEY, codes)
+        pipe.zmscore(SUBMITTED_KEY, codes)
+        stored_scores, submitted_scores = pipe.execute()
+    except Exception as e:
+        logger.warning("Port-out seen-set unavailable, falling back to MySQL: %s", e)
+        return set(), set()
+    submitted = {code for code, score in zip(codes, submitted_scores) if score is not None}
+    stored = {code for code, score in zip(codes, stored_scores) if score is not None} | submitted
+    return stored, submitted
+
+
+def is_seen(reference_code: str) -> bool:
+    """True when the reference code is known to be in portout_request"""
+    stored, _ = lookup_seen([reference_code])
+    return reference_code in stored
+
+
+def _mark(key: str, reference_codes: Iterable[str]) -> None:
+    codes = _codes(reference_codes)
+    if not codes or not settings.PORT_OUT_SEEN_CACHE_ENABLED:
+        return
+    now = time.time()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(key, dict.fromkeys(codes, now))
+        # Forget codes not confirmed for a while; NC stops returning them once they are answered
+        pipe.zremrangebyscore(key, "-inf", now - settings.PORT_OUT_SEEN_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Could not update port-out seen-set %s: %s", key, e)
+
+
+def mark_stored(reference_codes: Iterable[str]) -> None:
+    """Call after the rows are committed to portout_request"""
+    _mark(STORED_KEY, reference_codes)
+
+
+def mark_submitted(reference_codes: Iterable[str]) -> None:
+    """Call after submitted_to_bss = 1 is committed"""
+    codes = _codes(reference_codes)
+    _mark(STORED_KEY, codes)
+    _mark(SUBMITTED_KEY, codes)
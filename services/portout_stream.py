@@ -0,0 +1,224 @@
+"""
+Streaming parser for NC port-out notification pages.
+
+obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar can return
+pages with hundreds of <notificacion> elements. Instead of building the whole tree and running
+'.//{*}tag' searches per notification, the response is read with ET.iterparse: every leaf is
+mapped to its record field once when it closes, a compact record is yielded at the end of each
+<notificacion> as a PortOutNotification (services/nc_records.py) and the processed elements
+are cleared, so memory stays bounded by one notification and parse time is linear in the page size.
+"""
+import io
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Union
+
+from services.nc_records import MsisdnRange, PortOutNotification, Subscriber
+from services.soap_response import local_name
+
+NOTIFICATION = "notificacion"
+SOLICITUD = "solicitud"
+MSISDN_RANGE = "rangoMSISDN"
+
+# Response-level leaves (outside any notificacion) -> response_info key
+RESPONSE_FIELDS = {
+    "codigoRespuesta": "response_code",
+    "descripcion": "response_description",
+    "codigoPeticionPaginada": "paged_request_code",
+    "totalRegistros": "total_records",
+    "ultimaPagina": "is_last_page",
+}
+
+# Leaves of <notificacion> outside <solicitud> -> record key
+NOTIFICATION_FIELDS = {
+    "codigoNotificacion": "notification_id",
+    "fechaCreacion": "creation_date",
+    "sincronizada": "synchronized",
+}
+
+# Leaves anywhere under <solicitud> -> record key
+SOLICITUD_FIELDS = {
+    "codigoReferencia": "reference_code",
+    "estado": "status",
+    "fechaEstado": "state_date",
+    "fechaCreacion": "creation_date_request",
+    "fechaMarcaLectura": "reading_mark_date",
+    "fechaLimiteCambioEstado": "state_change_deadline",
+    "fechaSolicitudPorAbonado": "subscriber_request_date",
+    "codigoOperadorDonante": "donor_operator_code",
+    "codigoOperadorReceptor": "receiver_operator_code",
+    "operadorDonanteAltaExtraordinaria": "extraordinary_donor_activation",
+    "codigoContrato": "contract_code",
+    "NRNReceptor": "receiver_NRN",
+    "fechaVentanaCambio": "port_window_date",
+    "fechaVentanaCambioPorAbonado": "port_window_by_subscriber",
+}
+
+# (parent, leaf) under <abonado> -> subscriber key
+SUBSCRIBER_FIELDS = {
+    ("documentoIdentificacion", "tipo"): "id_type",
+    ("documentoIdentificacion", "documento"): "id_number",
+    ("datosPersonales", "nombre"): "first_name",
+    ("datosPersonales", "primerApellido"): "last_name_1",
+    ("datosPersonales", "segundoApellido"): "last_name_2",
+    ("datosPersonales", "razonSocial"): "razon_social",
+}
+
+RECORD_KEYS = tuple(NOTIFICATION_FIELDS.values()) + tuple(SOLICITUD_FIELDS.values())
+SUBSCRIBER_KEYS = tuple(SUBSCRIBER_FIELDS.values())
+
+
+def _leaf_text(elem: ET.Element) -> Optional[str]:
+    if elem.text is None:
+        return None
+    return elem.text.strip() or None
+
+
+def _new_record() -> Dict:
+    # Scratch fields of the notification being parsed, turned into a PortOutNotification at its end
+    record = dict.fromkeys(RECORD_KEYS)
+    record["msisdn_single"] = []
+    record["msisdn_ranges"] = []
+    record["subscriber"] = dict.fromkeys(SUBSCRIBER_KEYS)
+    return record
+
+
+def _build_notification(record: Dict) -> PortOutNotification:
+    return PortOutNotification(
+        **{key: record[key] for key in RECORD_KEYS},
+        msisdn_single=tuple(record["msisdn_single"]),
+        msisdn_ranges=tuple(record["msisdn_ranges"]),
+        subscriber=Subscriber(**record["subscriber"]),
+    )
+
+
+class PortOutNotificationStream:
+    """
+    Iterate the port-out notifications of an NC response one record at a time.
+
+    Records are PortOutNotification instances; record.to_dict() gives the entries of
+    parse_portout_response()["requests"].
+    response_info is filled from the response header, which NC sends before the first
+    notification, so it is complete once read_header() returns or iteration has started.
+    """
+
+    def __init__(self, content: Union[bytes, str]):
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        content = content.lstrip()
+        if content.startswith(b"\xef\xbb\xbf"):
+            content = content[3:].lstrip()
+        self._events = ET.iterparse(io.BytesIO(content), events=("start", "end"))
+        self._path: List[str] = []
+        self._path_elems: List[ET.Element] = []
+        self._container: Optional[ET.Element] = None
+        self._record: Optional[Dict] = None
+        self._in_solicitud = False
+        self._has_solicitud = False
+        self._range: Dict[str, Optional[str]] = {}
+        self._exhausted = False
+        self.response_info: Dict[str, Optional[str]] = dict.fromkeys(RESPONSE_FIELDS.values())
+        self.count = 0
+
+    def read_header(self) -> Dict[str, Optional[str]]:
+        """Parse up to the first notification (or the end of the document) and return response_info"""
+        while self._record is None and not self._exhausted:
+            try:
+                event, elem = next(self._events)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._handle(event, elem)
+        return self.response_info
+
+    def __iter__(self) -> Iterator[PortOutNotification]:
+        for event, elem in self._events:
+            record = self._handle(event, elem)
+            if record is not None:
+                self.count += 1
+                yield record
+        self._exhausted = True
+
+    def _handle(self, event: str, elem: ET.Element) -> Optional[PortOutNotification]:
+        name = local_name(elem.tag)
+
+        if event == "start":
+            if name == NOTIFICATION:
+                self._record = _new_record()
+                self._has_solicitud = False
+                self._container = self._path_elems[-1] if self._path_elems else None
+            elif self._record is not None:
+                if name == SOLICITUD:
+                    self._in_solicitud = True
+                    self._has_solicitud = True
+                elif name == MSISDN_RANGE:
+                    self._range = {}
+            self._path.append(name)
+            self._path_elems.append(elem)
+            return None
+
+        # end event
+        self._path.pop()
+        self._path_elems.pop()
+        record = self._record
+
+        if record is None:
+            if len(elem) == 0 and name in RESPONSE_FIELDS:
+                key = RESPONSE_FIELDS[name]
+                if self.response_info[key] is None:
+                    self.response_info[key] = _leaf_text(elem)
+            return None
+
+        if name == NOTIFICATION:
+            self._record = None
+            self._in_solicitud = False
+            elem.clear()
+            # Drop the processed notification from its parent so the tree does not grow
+            if self._container is not None:
+                self._container.remove(elem)
+            return _build_notification(record) if self._has_solicitud else None
+
+        if name == SOLICITUD:
+            self._in_solicitud = False
+        elif name == MSISDN_RANGE:
+            if self._range.get("initial_value") and self._range.get("final_value"):
+                record["msisdn_ranges"].append(MsisdnRange(self._range["initial_value"], self._range["final_value"]))
+            self._range = {}
+        elif len(elem) == 0:
+            self._set_leaf(record, name, _leaf_text(elem))
+        return None
+
+    def _set_leaf(self, record: Dict, name: str, value: Optional[str]) -> None:
+        parent = self._path[-1] if self._path else None
+        if not self._in_solicitud:
+            key = NOTIFICATION_FIELDS.get(name)
+            if key and record[key] is None:
+                record[key] = value
+            return
+
+        if parent == MSISDN_RANGE:
+            if name == "valorInicial":
+                self._range.setdefault("initial_value", value)
+            elif name == "valorFinal":
+                self._range.setdefault("final_value", value)
+            return
+
+        subscriber_key = SUBSCRIBER_FIELDS.get((parent, name))
+        if subscriber_key:
+            if record["subscriber"][subscriber_key] is None:
+                record["subscriber"][subscriber_key] = value
+            return
+
+        if name == "MSISDN":
+            if value and not record["msisdn_single"]:
+                record["msisdn_single"].append(value)
+            return
+
+        key = SOLICITUD_FIELDS.get(name)
+        if key and record[key] is None:
+            record[key] = value
+
+
+
+def iter_portout_notifications(content: Union[bytes, str]) -> Iterator[PortOutNotification]:
+    """Yield port-out notification records from an NC response without building the whole tree"""
+    return iter(PortOutNotificationStream(content))
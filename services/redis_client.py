@@ -0,0 +1,48 @@
+"""
+Shared Redis client (same instance as the Celery broker, REDIS_URL).
+
+Used for small coordination state that must survive a worker crash but does not belong in
+MySQL: run locks and paging checkpoints. One connection pool per process; forked children
+(Celery prefork) build their own on first use.
+"""
+import os
+from typing import Optional
+
+import redis  # type: ignore
+
+from config import settings
+
+_client: Optional["redis.Redis"] = None
+_client_pid: Optional[int] = None
+
+
+def get_redis() -> "redis.Redis":
+    """Process-wide Redis client for settings.REDIS_URL"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+# Compare-and-delete: a lock is only released by the holder that set it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def acquire_lock(name: str, token: str, ttl_seconds: int) -> bool:
+    """SET NX EX lock; expires by itself if the holder dies"""
+    return bool(get_redis().set(name, token, nx=True, ex=max(int(ttl_seconds), 1)))
+
+
+def release_lock(name: str, token: str) -> None:
+    get_redis().eval(_RELEASE_SCRIPT, 1, name, token)
@@ -0,0 +1,80 @@
+"""
+Report of Celery result backend memory use per task.
+
+Run with: python -m services.result_backend_report
+
+Results do not carry the task name (result_extended is off to keep them small), so the report
+looks it up in the hourly task name hashes written by celery_app.apply_result_expiry. Results
+stored before the index existed, or by producers without the signal, show up as "unknown".
+"""
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from celery_app import (
+    RESULT_NAME_INDEX_BUCKET, RESULT_NAME_INDEX_TTL, TASK_RESULT_POLICIES, app, result_name_index_key,
+)
+from config import settings
+
+RESULT_KEY_PREFIX = 'celery-task-meta-'
+UNKNOWN_GROUP = 'unknown'
+
+
+def _group_name(task_name: str) -> str:
+    """"<short task name> (<result_expires>s)" for the report"""
+    expires = TASK_RESULT_POLICIES.get(task_name, {}).get('result_expires', settings.CELERY_RESULT_EXPIRES)
+    return f"{task_name.rsplit('.', 1)[-1]} ({expires}s)"
+
+
+def _live_index_keys(now: float) -> List[str]:
+    """Task name hashes that can still hold entries for unexpired results, newest first"""
+    newest = int(now) // RESULT_NAME_INDEX_BUCKET
+    oldest = (int(now) - RESULT_NAME_INDEX_TTL) // RESULT_NAME_INDEX_BUCKET - 1
+    return [result_name_index_key(bucket) for bucket in range(newest, oldest - 1, -1)]
+
+
+def get_result_backend_usage(scan_count: int = 1000) -> Dict[str, Dict[str, int]]:
+    """
+    Scan the Redis result backend and aggregate stored results per task.
+
+    Each SCAN page costs one pipelined round trip: MEMORY USAGE of its keys plus an HMGET of
+    their task ids on every live task name hash.
+
+    Returns:
+        dict: {"<task> (<expires>s)": {"keys": n, "bytes": memory_usage}}, sorted by bytes descending
+    """
+    client = app.backend.client
+    index_keys = _live_index_keys(time.time())
+    usage = defaultdict(lambda: {"keys": 0, "bytes": 0})
+
+    cursor = 0
+    while True:
+        cursor, keys = client.scan(cursor, match=f"{RESULT_KEY_PREFIX}*", count=scan_count)
+        if keys:
+            task_ids = [(key.decode() if isinstance(key, bytes) else key)[len(RESULT_KEY_PREFIX):] for key in keys]
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.memory_usage(key)
+            for index_key in index_keys:
+                pipe.hmget(index_key, task_ids)
+            replies = pipe.execute()
+            sizes, lookups = replies[:len(keys)], replies[len(keys):]
+            for i, size in enumerate(sizes):
+                name = next((names[i] for names in lookups if names[i]), None)
+                group = _group_name(name.decode() if isinstance(name, bytes) else name) if name else UNKNOWN_GROUP
+                usage[group]["keys"] += 1
+                usage[group]["bytes"] += size or 0
+        if not cursor:
+            break
+
+    return dict(sorted(usage.items(), key=lambda item: item[1]["bytes"], reverse=True))
+
+
+if __name__ == "__main__":
+    report = get_result_backend_usage()
+    total_keys = sum(item["keys"] for item in report.values())
+    total_bytes = sum(item["bytes"] for item in report.values())
+    print(f"{'task':60} {'keys':>8} {'bytes':>12}")
+    for group, item in report.items():
+        print(f"{group:60} {item['keys']:>8} {item['bytes']:>12}")
+    print(f"{'TOTAL':60} {total_keys:>8} {total_bytes:>12}")
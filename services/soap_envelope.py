@@ -0,0 +1,72 @@
+"""
+Precompiled SOAP envelope builder.
+
+The str.format templates in templates/soap_templates.py are split once, at import time, into
+static UTF-8 byte fragments and field slots. Rendering only escapes the field values and writes
+them between the fragments into a single bytes body, so no template parsing, no ElementTree/minidom
+and no unescaped subscriber data (names, contract codes) ends up in the XML sent to NC. The escaping
+is the point: rendering costs about the same as str.format + encode of the unescaped template.
+"""
+from string import Formatter
+from typing import Any, List, Tuple
+
+# Slots with this suffix carry XML fragments built by our own code (already escaped)
+RAW_FIELD_SUFFIX = "_optional"
+
+
+def xml_escape(value: Any) -> str:
+    """Escape a value for use as XML element text"""
+    if value is None:
+        return ""
+    text = value if isinstance(value, str) else str(value)
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def xml_element(tag: str, value: Any) -> str:
+    """Build an escaped optional element, e.g. <por:ICCID>...</por:ICCID>"""
+    return f"<{tag}>{xml_escape(value)}</{tag}>"
+
+
+class SoapPayload(bytes):
+    """UTF-8 SOAP body, sent as-is by requests; str() gives the XML text for logging"""
+
+    def __str__(self) -> str:
+        return self.decode("utf-8")
+
+
+class SoapEnvelope:
+    """A str.format SOAP template compiled into byte fragments and field slots"""
+
+    def __init__(self, template: str):
+        self.template = template
+        self.slots: List[Tuple[bytes, str, bool]] = []
+        self.tail = b""
+        literal_parts = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            literal_parts.append(literal)
+            if field_name is None:
+                continue
+            if format_spec or conversion:
+                raise ValueError(f"Unsupported format spec in SOAP template field '{field_name}'")
+            prefix = "".join(literal_parts).encode("utf-8")
+            literal_parts = []
+            self.slots.append((prefix, field_name, field_name.endswith(RAW_FIELD_SUFFIX)))
+        self.tail = "".join(literal_parts).encode("utf-8")
+        self.fields = tuple(name for _, name, _ in self.slots)
+
+    def render(self, **values: Any) -> SoapPayload:
+        """Render the envelope, escaping all values except *_optional XML fragments"""
+        parts = []
+        append = parts.append
+        for prefix, field_name, raw in self.slots:
+            append(prefix)
+            value = values[field_name]
+            append((value or "").encode("utf-8") if raw else xml_escape(value).encode("utf-8"))
+        append(self.tail)
+        return SoapPayload(b"".join(parts))
@@ -0,0 +1,146 @@
+"""
+Parse-once SOAP response from the Central Node.
+
+The response body is parsed a single time (from response.content bytes) and all leaf elements
+are indexed by local name (namespace prefix stripped) in one pass over the tree. The
+parse_soap_response_* helpers in services/soap_services.py and the NC callers read from this
+index instead of running their own ET.fromstring and './/{*}' searches.
+"""
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Union
+
+SOAP_BODY = "Body"
+SUCCESS_CODE = "0000 00000"
+
+
+def local_name(tag: str) -> str:
+    """Strip the namespace from an element tag: '{ns}codigoRespuesta' -> 'codigoRespuesta'"""
+    return tag.rsplit('}', 1)[-1] if '}' in tag else tag
+
+
+def _text(elem: ET.Element) -> Optional[str]:
+    """Stripped element text, None for missing or blank text"""
+    if elem.text is None:
+        return None
+    text = elem.text.strip()
+    return text or None
+
+
+class SoapResponse:
+    """Parsed NC SOAP response with a local-name index of leaf elements"""
+
+    def __init__(self, content: Union[bytes, str]):
+        if isinstance(content, str):
+            content = content.strip().encode("utf-8")
+        else:
+            content = content.strip()
+        # Raises ET.ParseError for malformed XML, callers decide how to degrade
+        self.root = ET.fromstring(content)
+        self.body: Optional[ET.Element] = None
+        self.index: Dict[str, List[Optional[str]]] = {}
+        self._build_index()
+
+    @classmethod
+    def parse(cls, content: Union[bytes, str, "SoapResponse"]) -> "SoapResponse":
+        """Return content as SoapResponse, parsing it only if it is not parsed yet"""
+        if isinstance(content, SoapResponse):
+            return content
+        return cls(content)
+
+    def _build_index(self) -> None:
+        index = self.index
+        for elem in self.root.iter():
+            name = local_name(elem.tag)
+            if len(elem):
+                if name == SOAP_BODY and self.body is None:
+                    self.body = elem
+                continue
+            index.setdefault(name, []).append(_text(elem))
+
+    # Generic accessors
+
+    def first(self, name: str) -> Optional[str]:
+        """First non-empty value of a leaf element in document order"""
+        for value in self.index.get(name, ()):
+            if value is not None:
+                return value
+        return None
+
+    def last(self, name: str) -> Optional[str]:
+        """Last value of a leaf element in document order (may be None)"""
+        values = self.index.get(name)
+        return values[-1] if values else None
+
+    def all(self, name: str) -> List[Optional[str]]:
+        """All values of a leaf element in document order"""
+        return list(self.index.get(name, ()))
+
+    def find_path(self, path: str) -> Optional[str]:
+        """Value of a nested field 'parent/child', each step searched among descendants"""
+        current: Optional[ET.Element] = self.root
+        for part in path.split('/'):
+            current = next((el for el in current.iter() if el is not current and local_name(el.tag) == part), None)
+            if current is None:
+                return None
+        return _text(current)
+
+    def records(self, record_name: str = "registro") -> List[Dict[str, Optional[str]]]:
+        """Leaf values of every <record_name> element, first occurrence per local name"""
+        result = []
+        for elem in self.root.iter():
+            if local_name(elem.tag) != record_name:
+                continue
+            record: Dict[str, Optional[str]] = {}
+            for child in elem.iter():
+                if child is elem or len(child):
+                    continue
+                record.setdefault(local_name(child.tag), _text(child))
+            result.append(record)
+        return result
+
+    # Typed accessors for the common NC fields
+
+    @property
+    def response_code(self) -> Optional[str]:
+        return self.first("codigoRespuesta")
+
+    @property
+    def description(self) -> Optional[str]:
+        return self.first("descripcion")
+
+    @property
+    def reference_code(self) -> Optional[str]:
+        return self.first("codigoReferencia")
+
+    @property
+    def session_code(self) -> Optional[str]:
+        return self.first("codigoSesion")
+
+    @property
+    def state(self) -> Optional[str]:
+        return self.first("estado")
+
+    @property
+    def porting_window(self) -> Optional[str]:
+        return self.first("fechaVentanaCambio")
+
+    @property
+    def is_success(self) -> bool:
+        return self.response_code == SUCCESS_CODE
+
+    @property
+    def error_fields(self) -> List[Dict[str, Optional[str]]]:
+        """campoErroneo entries as [{"name": ..., "description": ...}]"""
+        errors = []
+        for elem in self.root.iter():
+            if local_name(elem.tag) != "campoErroneo":
+                continue
+            field = {"name": None, "description": None}
+            for child in elem:
+                child_name = local_name(child.tag)
+                if child_name == "nombre":
+                    field["name"] = _text(child)
+                elif child_name == "descripcion":
+                    field["description"] = _text(child)
+            errors.append(field)
+        return errors
@@ -4,7 +4,7 @@ from ast import List
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 from fastapi import HTTPException
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 # from db_utils import get_db_connection
 from services.database_service import get_db_connection
 from templates.soap_templates import PORTABILITY_REQUEST_TEMPLATE, CHECK_PORT_IN_STATUS_TEMPLATE, CANCEL_PORT_IN_REQUEST_TEMPLATE,CONSULT_PROCESS_PORT_IN,INITIATE_SESSION, CANCEL_PORT_IN_REQUEST_TEMPLATE_ONLINE
@@ -14,6 +14,25 @@ from datetime import date, datetime
 from templates.soap_templates import REJECT_PORT_OUT_REQUEST, CONFIRM_PORT_OUT_REQUEST, PORTABILITY_REQUEST_TEMPLATE_LEGAL
 from templates.soap_templates import RETURN_REQUEST_TEMPLATE, CANCEL_RETURN_TEMPLATE, STATUS_CHECK_RETURN_TEMPLATE
 from templates.soap_templates import MSISDN_STATUS_CHECK
+from services.soap_response import SoapResponse
+from services.portout_stream import PortOutNotificationStream
+from templates.soap_templates import CHECK_PORT_OUT_STATUS_TEMPLATE
+from services.soap_envelope import SoapEnvelope, xml_element
+
+# Templates precompiled into byte fragments, see services/soap_envelope.py
+PORTABILITY_REQUEST_TEMPLATE_ENVELOPE = SoapEnvelope(PORTABILITY_REQUEST_TEMPLATE)
+PORTABILITY_REQUEST_TEMPLATE_LEGAL_ENVELOPE = SoapEnvelope(PORTABILITY_REQUEST_TEMPLATE_LEGAL)
+CANCEL_PORT_IN_REQUEST_TEMPLATE_ENVELOPE = SoapEnvelope(CANCEL_PORT_IN_REQUEST_TEMPLATE)
+CANCEL_PORT_IN_REQUEST_TEMPLATE_ONLINE_ENVELOPE = SoapEnvelope(CANCEL_PORT_IN_REQUEST_TEMPLATE_ONLINE)
+CONSULT_PROCESS_PORT_IN_ENVELOPE = SoapEnvelope(CONSULT_PROCESS_PORT_IN)
+INITIATE_SESSION_ENVELOPE = SoapEnvelope(INITIATE_SESSION)
+CHECK_PORT_OUT_STATUS_TEMPLATE_ENVELOPE = SoapEnvelope(CHECK_PORT_OUT_STATUS_TEMPLATE)
+REJECT_PORT_OUT_REQUEST_ENVELOPE = SoapEnvelope(REJECT_PORT_OUT_REQUEST)
+CONFIRM_PORT_OUT_REQUEST_ENVELOPE = SoapEnvelope(CONFIRM_PORT_OUT_REQUEST)
+RETURN_REQUEST_TEMPLATE_ENVELOPE = SoapEnvelope(RETURN_REQUEST_TEMPLATE)
+CANCEL_RETURN_TEMPLATE_ENVELOPE = SoapEnvelope(CANCEL_RETURN_TEMPLATE)
+STATUS_CHECK_RETURN_TEMPLATE_ENVELOPE = SoapEnvelope(STATUS_CHECK_RETURN_TEMPLATE)
+MSISDN_STATUS_CHECK_ENVELOPE = SoapEnvelope(MSISDN_STATUS_CHECK)
 
 
 # Namespace definitions
@@ -395,43 +414,22 @@ def create_status_check_soap(mnp_request_id: int, reference_code: str, msisdn: s
 import xml.etree.ElementTree as ET
 from typing import List, Tuple, Optional
 
-def parse_soap_response_list(soap_xml: str, requested_fields: List[str]) -> Tuple[Optional[str], ...]:
+def parse_soap_response_list(soap_xml: Union[str, bytes, SoapResponse], requested_fields: List[str]) -> Tuple[Optional[str], ...]:
     """
     Parse SOAP response and extract requested fields, regardless of namespace prefix.
     Returns a tuple in the same order as requested_fields.
     """
-    result = []
-
     try:
-        root = ET.fromstring(soap_xml)
-
-        # Remove namespace prefix dynamically for easier matching
-        def strip_namespace(tag: str) -> str:
-            return tag.split('}')[-1] if '}' in tag else tag
-
-        # Build a simple mapping of all elements by localname (without namespace)
-        elements_by_name = {}
-        for elem in root.iter():
-            localname = strip_namespace(elem.tag)
-            elements_by_name[localname] = elem.text.strip() if elem.text else None
-
-        # Extract values for requested fields
-        for field in requested_fields:
-            value = elements_by_name.get(field)
-            result.append(value)
+        parsed = SoapResponse.parse(soap_xml)
+        # Last occurrence wins, as in the original localname mapping
+        return tuple(parsed.last(field) for field in requested_fields)
 
     except ET.ParseError as e:
         print(f"XML Parse error: {e}")
-        result = [None] * len(requested_fields)
     except Exception as e:
         print(f"Unexpected error: {e}")
-        result = [None] * len(requested_fields)
-
-    # Ensure consistent output
-    if len(result) != len(requested_fields):
-        result = [None] * len(requested_fields)
 
-    return tuple(result)
+    return tuple([None] * len(requested_fields))
 
 def parse_soap_response_list_not_work(soap_xml: str, requested_fields: List[str]) -> Tuple[Optional[str], ...]:
     """
@@ -484,58 +482,29 @@ def parse_soap_response_list_not_work(soap_xml: str, requested_fields: List[str]
     
     return tuple(result)
 
-def parse_soap_response_nested(soap_xml: str, requested_fields: List[str]) -> Tuple[Optional[str], ...]:
+def parse_soap_response_nested(soap_xml: Union[str, bytes, SoapResponse], requested_fields: List[str]) -> Tuple[Optional[str], ...]:
     """
     Parse SOAP response and return values as tuple for easy unpacking.
     Supports nested fields using '/' syntax.
     
     Args:
-        soap_xml: SOAP response XML string.
+        soap_xml: SOAP response XML string/bytes or an already parsed SoapResponse.
         requested_fields: List of field names or paths to extract.
                          Use '/' for nested fields: 'campoErroneo/nombre'
     
     Returns:
         Tuple with extracted field values in the same order as requested_fields.
     """
-    result: List[Optional[str]] = []
-
     try:
-        root = ET.fromstring(soap_xml)
-        
-        for field_path in requested_fields:
-            value = None
-            
-            if '/' in field_path:
-                # Handle nested fields: 'parent/child'
-                parts = field_path.split('/')
-                current_element = root
-                
-                # Navigate through the path
-                for part in parts:
-                    current_element = current_element.find(f'.//{{*}}{part}')
-                    if current_element is None:
-                        break
-                
-                value = current_element.text if current_element is not None else None
-            else:
-                # Handle simple fields (original behavior)
-                value = root.findtext(f'.//{{*}}{field_path}')
-            
-            # Handle empty strings and whitespace
-            if value is not None:
-                value = value.strip() if value.strip() else None
-                
-            result.append(value)
+        parsed = SoapResponse.parse(soap_xml)
+        return tuple(
+            parsed.find_path(field_path) if '/' in field_path else parsed.first(field_path)
+            for field_path in requested_fields
+        )
 
     except Exception as e:
         print(f"Error parsing SOAP XML: {e}")
-        result = [None] * len(requested_fields)
-
-    if len(result) != len(requested_fields):
-        result = [None] * len(requested_fields)
-
-    return tuple(result)
-
+        return tuple([None] * len(requested_fields))
 
 def json_from_db_to_soap_cancel(json_data, session_code):
     """
@@ -544,7 +513,7 @@ def json_from_db_to_soap_cancel(json_data, session_code):
     logger.debug("ENTER json_from_db_to_soap_cancel() %s with session code %s", json_data, session_code)
     # print("Received JSON data:", json_data)
      
-    return CANCEL_PORT_IN_REQUEST_TEMPLATE.format(
+    return CANCEL_PORT_IN_REQUEST_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         reference_code=json_data.get('reference_code'),
         cancellation_reason=json_data.get('cancellation_reason', ''),
@@ -559,7 +528,7 @@ def json_from_db_to_soap_cancel_online(json_data,session_code):
     logger.debug("ENTER json_from_db_to_soap_cancel_online() session_code %s", session_code)
     # print("Received JSON data:", json_data)
      
-    return CANCEL_PORT_IN_REQUEST_TEMPLATE_ONLINE.format(
+    return CANCEL_PORT_IN_REQUEST_TEMPLATE_ONLINE_ENVELOPE.render(
         session_code=session_code,
         reference_code=json_data.get('reference_code'),
         cancellation_reason=json_data.get('cancellation_reason', ''),
@@ -574,7 +543,7 @@ def create_status_check_soap_nc(mnp_request_id: int, session_code: str, msisdn:
     logger.info("received mnp_id: %s, session_code: %s, msisdn: %s", mnp_request_id, session_code, msisdn)
 
     
-    return CONSULT_PROCESS_PORT_IN.format(
+    return CONSULT_PROCESS_PORT_IN_ENVELOPE.render(
         session_code=session_code,
         msisdn=msisdn
     )
@@ -587,18 +556,18 @@ def create_initiate_soap(username, access_code,operator_code) -> str:
     # logger.info("received username: %s, access_code: %s, operator_code: %s", username, access_code,operator_code)
 
     
-    return INITIATE_SESSION.format(
+    return INITIATE_SESSION_ENVELOPE.render(
         username=username,
         access_code=access_code,
         operator_code=operator_code
     )
 
-def parse_soap_response_new(soap_string: str, fields: List[str]) -> List[Any]:
+def parse_soap_response_new(soap_string: Union[str, bytes, SoapResponse], fields: List[str]) -> List[Any]:
     """
     Parse SOAP response and extract requested fields.
     
     Args:
-        soap_string: SOAP XML response as string
+        soap_string: SOAP XML response as string/bytes or an already parsed SoapResponse
         fields: List of field names to extract
         
     Returns:
@@ -606,151 +575,77 @@ def parse_soap_response_new(soap_string: str, fields: List[str]) -> List[Any]:
         
     Example:
         response_code, description, session_code = parse_soap_response(
-            response.text, 
+            response.content, 
             ["codigoRespuesta", "descripcion", "codigoSesion"]
         )
     """
     try:
-        # Parse the XML
-        root = ET.fromstring(soap_string)
-        
-        # Register namespaces to handle them properly
-        namespaces = {
-            'S': 'http://schemas.xmlsoap.org/soap/envelope/',
-            'ns2': 'http://nc.aopm.es/v1-10',
-            'ns5': 'http://nc.aopm.es/v1-10/acceso'
-        }
-        
-        # Find the SOAP Body
-        body = root.find('.//S:Body', namespaces)
-        if body is None:
-            raise ValueError("SOAP Body not found")
-        
-        # Extract values for each requested field
-        results = []
-        for field in fields:
-            value = None
-            
-            # Try different namespace prefixes for the field
-            # Some fields are in ns2, some in ns5, etc.
-            for ns_prefix in ['ns2', 'ns5', 'ns3', 'ns4', 'ns6', 'ns7', 'ns8', 'ns9', 'ns10']:
-                if ns_prefix in namespaces:
-                    element = body.find(f'.//{ns_prefix}:{field}', namespaces)
-                    if element is not None and element.text:
-                        value = element.text.strip()
-                        break
-            
-            # If not found with namespace, try without namespace
-            if value is None:
-                element = body.find(f'.//{field}')
-                if element is not None and element.text:
-                    value = element.text.strip()
-            
-            results.append(value)
-        
-        return results
-        
+        parsed = SoapResponse.parse(soap_string)
     except ET.ParseError as e:
         raise ValueError(f"Failed to parse XML: {e}")
-    except Exception as e:
-        raise ValueError(f"Error parsing SOAP response: {e}")
 
+    if parsed.body is None:
+        raise ValueError("Error parsing SOAP response: SOAP Body not found")
+
+    return [parsed.first(field) for field in fields]
 
 # from typing import Dict, Optional
 
-def parse_soap_response_dict_flat(soap_string: str, fields: List[str]) -> Dict[str, Optional[str]]:
+def parse_soap_response_dict_flat(soap_string: Union[str, bytes, SoapResponse], fields: List[str]) -> Dict[str, Optional[str]]:
     """
     Parse SOAP response and return dictionary of requested fields.
     Always returns a dictionary with all requested fields (values may be None or str).
     """
-    # Initialize with None values but specify the type can be str or None
     result_dict: Dict[str, Optional[str]] = {field: None for field in fields}
     
     try:
-        root = ET.fromstring(soap_string)
-        namespaces = {
-            'S': 'http://schemas.xmlsoap.org/soap/envelope/',
-            'ns2': 'http://nc.aopm.es/v1-10',
-            'ns5': 'http://nc.aopm.es/v1-10/acceso'
-        }
-        
-        body = root.find('.//S:Body', namespaces)
-        if body is None:
+        parsed = SoapResponse.parse(soap_string)
+        if parsed.body is None:
             return result_dict
         
         for field in fields:
-            value = None
-            for ns_prefix in ['ns2', 'ns5', 'ns3', 'ns4', 'ns6', 'ns7', 'ns8', 'ns9', 'ns10']:
-                if ns_prefix in namespaces:
-                    element = body.find(f'.//{ns_prefix}:{field}', namespaces)
-                    if element is not None and element.text:
-                        value = element.text.strip()
-                        break
-            
-            if value is None:
-                element = body.find(f'.//{field}')
-                if element is not None and element.text:
-                    value = element.text.strip()
-            
-            result_dict[field] = value  # This should now work
+            result_dict[field] = parsed.first(field)
         
         return result_dict
         
     except Exception as e:
         logger.error("Error parsing SOAP response: %s",{e})
         return result_dict
-    
+
 from typing import Dict, Optional, List, Union
-def parse_soap_response_dict(soap_string: str, fields: List[str]) -> Dict[str, Optional[str]]:
+def parse_soap_response_dict(soap_string: Union[str, bytes, SoapResponse], fields: List[str]) -> Dict[str, Optional[str]]:
     """
     Simple SOAP parser that handles namespaces dynamically.
     """
     result_dict: Dict[str, Optional[str]] = {field: None for field in fields}
     
     try:
-        root = ET.fromstring(soap_string)
-        
-        # Define the namespaces we know about from your XML
-        namespaces = {
-            'S': 'http://schemas.xmlsoap.org/soap/envelope/',
-            'ns2': 'http://nc.aopm.es/v1-10',
-            'ns14': 'http://nc.aopm.es/v1-10/portabilidad'
-        }
-        
-        body = root.find('.//S:Body', namespaces)
-        if body is None:
+        parsed = SoapResponse.parse(soap_string)
+        if parsed.body is None:
             return result_dict
         
         # Extract main fields
         for field in fields:
             if field == "codigoRespuesta":
-                element = body.find('.//ns2:codigoRespuesta', namespaces)
-                if element is not None and element.text:
-                    result_dict[field] = element.text.strip()
+                result_dict[field] = parsed.response_code
             
             elif field == "descripcion":
-                element = body.find('.//ns2:descripcion', namespaces)
-                if element is not None and element.text:
-                    result_dict[field] = element.text.strip()
+                result_dict[field] = parsed.description
             
             elif field == "error_field":
                 # Get campoErroneo/nombre
-                element = body.find('.//ns2:campoErroneo/ns2:nombre', namespaces)
-                if element is not None and element.text:
-                    result_dict[field] = element.text.strip()
+                result_dict[field] = parsed.find_path("campoErroneo/nombre")
             
             elif field == "error_description":
                 # Get campoErroneo/descripcion
-                element = body.find('.//ns2:campoErroneo/ns2:descripcion', namespaces)
-                if element is not None and element.text:
-                    result_dict[field] = element.text.strip()
+                result_dict[field] = parsed.find_path("campoErroneo/descripcion")
         
         return result_dict
         
     except Exception as e:
         logger.error(f"Error parsing SOAP response: {e}")
         return result_dict
-    
+
 def json_from_db_to_soap_online(json_data, session_code):
     """
     Convert JSON data from new table structure to SOAP request
@@ -766,18 +661,18 @@ def json_from_db_to_soap_online(json_data, session_code):
     # Handle optional fields
     fecha_ventana_optional = ""
     if json_data.get('desired_porting_date'):
-        fecha_ventana_optional = f"<por:fechaVentanaCambio>{format_date(json_data['desired_porting_date'])}</por:fechaVentanaCambio>"
+        fecha_ventana_optional = xml_element("por:fechaVentanaCambio", format_date(json_data['desired_porting_date']))
     
     iccid_optional = ""
     if json_data.get('iccid'):
-        iccid_optional = f"<por:ICCID>{json_data['iccid']}</por:ICCID>"
+        iccid_optional = xml_element("por:ICCID", json_data['iccid'])
     
     # Use the actual fields from your table with fallbacks
     subscriber_type = json_data.get('subscriber_type', 'person')
     if subscriber_type.lower() == 'company':
         company_name = json_data.get('company_name', 'Test Company')
 
-        result = PORTABILITY_REQUEST_TEMPLATE_LEGAL.format(
+        result = PORTABILITY_REQUEST_TEMPLATE_LEGAL_ENVELOPE.render(
         session_code=session_code,
         request_date=format_date(json_data.get('requested_at')),
         donor_operator=json_data.get('donor_operator', ''),
@@ -801,7 +696,7 @@ def json_from_db_to_soap_online(json_data, session_code):
         second_surname = json_data.get('second_surname', 'Second')
         nationality = json_data.get('nationality', 'ESP')
 
-        result = PORTABILITY_REQUEST_TEMPLATE.format(
+        result = PORTABILITY_REQUEST_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         request_date=format_date(json_data.get('requested_at')),
         donor_operator=json_data.get('donor_operator', ''),
@@ -846,33 +741,24 @@ def parse_soap_response_nested_multi(xml, fields, reference_code):
     Works without needing lxml.
     """
     try:
-        xml = xml.strip()
-        root = ET.fromstring(xml)
+        parsed = SoapResponse.parse(xml)
     except Exception as e:
         print(f"Error parsing SOAP XML: {e}")
         return None
 
     # Find all <registro> elements, ignoring namespaces
-    registros = [el for el in root.iter() if el.tag.endswith('registro')]
+    registros = parsed.records("registro")
     if not registros:
         print("No registro elements found in XML")
         return None
 
-    # Extract global fields (codigoRespuesta, descripcion)
-    codigo_respuesta = None
-    descripcion = None
-    for el in root.iter():
-        if el.tag.endswith('codigoRespuesta'):
-            codigo_respuesta = el.text.strip() if el.text else None
-        elif el.tag.endswith('descripcion'):
-            descripcion = el.text.strip() if el.text else None
+    # Global fields (codigoRespuesta, descripcion), last occurrence in the document
+    codigo_respuesta = parsed.last("codigoRespuesta")
+    descripcion = parsed.last("descripcion")
 
     for reg in registros:
         # Match reference code
-        ref_el = next((el for el in reg if el.tag.endswith('codigoReferencia')), None)
-        ref_value = ref_el.text.strip() if ref_el is not None and ref_el.text else None
-
-        if ref_value == str(reference_code).strip():
+        if reg.get("codigoReferencia") == str(reference_code).strip():
             record = []
             for field in fields:
                 if field == "codigoRespuesta":
@@ -880,125 +766,44 @@ def parse_soap_response_nested_multi(xml, fields, reference_code):
                 elif field == "descripcion":
                     record.append(descripcion)
                 else:
-                    field_el = next((el for el in reg.iter() if el.tag.endswith(field)), None)
-                    record.append(field_el.text.strip() if field_el is not None and field_el.text else None)
+                    record.append(reg.get(field))
             return record
 
     # Not found
     return None
 
 from templates.soap_templates import CHECK_PORT_OUT_STATUS_TEMPLATE
-def create_status_check_port_out_soap_nc(session_code: str, operator_code: str, page_count: str) -> str:
+def create_status_check_port_out_soap_nc(session_code: str, operator_code: str, page_count: str,
+                                        paged_request_code: Optional[str] = None) -> str:
     """
     Create SOAP for Port-Out status check
     obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar
+    paged_request_code (codigoPeticionPaginada of the previous page) asks for the next page.
     """
     # print ("received mnp_id:", mnp_request_id, session_code, msisdn)
     logger.debug("create_status_check_port_out_soap_nc with session_code: %s", session_code)
 
-    
-    return CHECK_PORT_OUT_STATUS_TEMPLATE.format(
+    paged_request_optional = xml_element("v1:codigoPeticionPaginada", paged_request_code) if paged_request_code else ""
+    return CHECK_PORT_OUT_STATUS_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         operator_code=operator_code,
-        page_count=page_count
+        page_count=page_count,
+        paged_request_optional=paged_request_optional
     )
 # import xml.etree.ElementTree as ET
-def parse_portout_response(xml_string: str):
+def parse_portout_response(xml_string: Union[str, bytes]):
     """
     Parse SOAP XML with Port-Out notifications and return
     a structured, English-translated response.
-    """
-    xml_string = xml_string.lstrip().replace('\ufeff', '')
-    root = ET.fromstring(xml_string)
 
-    # Namespace-agnostic text extractor
-    def get_text(element, tag):
-        return element.findtext(f".//{{*}}{tag}")
-
-    # --- Response-level metadata ---
-    response_info = {
-        "response_code": get_text(root, "codigoRespuesta"),
-        "response_description": get_text(root, "descripcion"),
-        "paged_request_code": get_text(root, "codigoPeticionPaginada"),
-        "total_records": get_text(root, "totalRegistros"),
-        "is_last_page": get_text(root, "ultimaPagina")
-    }
-
-    # --- Extract Port-Out notifications ---
-    notifications = root.findall(".//{*}notificacion")
-    requests = []
-
-    for notif in notifications:
-        solicitud = notif.find(".//{*}solicitud")
-        if solicitud is None:
-            continue
-
-        get = lambda tag, _sol=solicitud: _sol.findtext(f".//{{*}}{tag}")
-
-        # Detect if abonado is persona física or jurídica
-        datos_personales = solicitud.find(".//{*}abonado/{*}datosPersonales")
-        razon_social = datos_personales.findtext(".//{*}razonSocial") if datos_personales is not None else None
-
-        # Build subscriber info
-        subscriber = {
-            "id_type": solicitud.findtext(".//{*}documentoIdentificacion/{*}tipo"),
-            "id_number": solicitud.findtext(".//{*}documentoIdentificacion/{*}documento"),
-            "first_name": solicitud.findtext(".//{*}datosPersonales/{*}nombre"),
-            "last_name_1": solicitud.findtext(".//{*}datosPersonales/{*}primerApellido"),
-            "last_name_2": solicitud.findtext(".//{*}datosPersonales/{*}segundoApellido"),
-            "razon_social": razon_social
-        }
-
-        # --- EXTRACT MSISDN DATA ---
-        individual_msisdns = []
-        msisdn_ranges = []
-        
-        # CASE 1: Check for MSISDN RANGES
-        rangos_msisdn = solicitud.findall(".//{*}rangoMSISDN")
-        
-        if rangos_msisdn:
-            for rango in rangos_msisdn:
-                initial_value = rango.findtext(".//{*}valorInicial")
-                final_value = rango.findtext(".//{*}valorFinal")
-                
-                if initial_value and final_value:
-                    msisdn_ranges.append({
-                        "initial_value": initial_value,
-                        "final_value": final_value
-                    })
-        
-        # CASE 2: Check for SINGLE MSISDN (directly under solicitud)
-        single_msisdn = get("MSISDN")
-        if single_msisdn:
-            individual_msisdns.append(single_msisdn)
-
-        request_data = {
-            "notification_id": get_text(notif, "codigoNotificacion"),
-            "creation_date": get_text(notif, "fechaCreacion"),
-            "synchronized": get_text(notif, "sincronizada"),
-            "reference_code": get("codigoReferencia"),
-            "status": get("estado"),
-            "state_date": get("fechaEstado"),
-            "creation_date_request": get("fechaCreacion"),
-            "reading_mark_date": get("fechaMarcaLectura"),
-            "state_change_deadline": get("fechaLimiteCambioEstado"),
-            "subscriber_request_date": get("fechaSolicitudPorAbonado"),
-            "donor_operator_code": get("codigoOperadorDonante"),
-            "receiver_operator_code": get("codigoOperadorReceptor"),
-            "extraordinary_donor_activation": get("operadorDonanteAltaExtraordinaria"),
-            "contract_code": get("codigoContrato"),
-            "receiver_NRN": get("NRNReceptor"),
-            "port_window_date": get("fechaVentanaCambio"),
-            "port_window_by_subscriber": get("fechaVentanaCambioPorAbonado"),
-            "msisdn_single": individual_msisdns,  # Clean list of single MSISDNs
-            "msisdn_ranges": msisdn_ranges,            # Clean list of ranges
-            "subscriber": subscriber
-        }
-
-        requests.append(request_data)
+    Materialises all records of the page; large pages should be consumed
+    record by record with PortOutNotificationStream instead.
+    """
+    stream = PortOutNotificationStream(xml_string)
+    requests = [record.to_dict() for record in stream]
 
     return {
-        "response_info": response_info,
+        "response_info": stream.response_info,
         "requests": requests
     }
 
@@ -1164,7 +969,7 @@ def soap_port_out_reject(session_code, reference_code, cancellation_reason):
     """
     logger.debug("ENTER soap_port_out_reject() reference_code %s", reference_code)
      
-    return REJECT_PORT_OUT_REQUEST.format(
+    return REJECT_PORT_OUT_REQUEST_ENVELOPE.render(
         session_code=session_code,
         reference_code=reference_code,
         reject_reason=cancellation_reason
@@ -1176,7 +981,7 @@ def soap_port_out_confirm(session_code, reference_code):
     """
     logger.debug("ENTER soap_port_out_reject() reference_code %s", reference_code)
      
-    return CONFIRM_PORT_OUT_REQUEST.format(
+    return CONFIRM_PORT_OUT_REQUEST_ENVELOPE.render(
         session_code=session_code,
         reference_code=reference_code
     )
@@ -1187,7 +992,7 @@ def soap_return_request(session_code, request_date, msisdn):
     """
     logger.debug("ENTER soap_reject_request reference_code %s", msisdn)
      
-    return RETURN_REQUEST_TEMPLATE.format(
+    return RETURN_REQUEST_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         request_date=request_date,
         msisdn=msisdn
@@ -1199,7 +1004,7 @@ def soap_cancel_return_request(session_code, reference_code, cancellation_reason
     """
     logger.debug("ENTER soap_cancel_return_request reference_code %s", reference_code)
      
-    return CANCEL_RETURN_TEMPLATE.format(
+    return CANCEL_RETURN_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         reference_code=reference_code,
         cancellation_reason=cancellation_reason
@@ -1212,7 +1017,7 @@ def soap_return_request_status_check(session_code, reference_code):
     """
     logger.debug("ENTER soap_status_check_return_request %s", reference_code)
      
-    return STATUS_CHECK_RETURN_TEMPLATE.format(
+    return STATUS_CHECK_RETURN_TEMPLATE_ENVELOPE.render(
         session_code=session_code,
         reference_code=reference_code
     )
@@ -1223,7 +1028,7 @@ def msisdn_status_check(session_code, msisdn):
     """
     logger.debug("ENTER msisdn_status_check %s",msisdn)
      
-    return MSISDN_STATUS_CHECK.format(
+    return MSISDN_STATUS_CHECK_ENVELOPE.render(
         session_code=session_code,
         msisdn=msisdn
     )
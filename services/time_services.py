@@ -515,6 +515,38 @@ def is_working_hours_now(check_time: Optional[datetime] = None) -> bool:
     
     return False
 
+def get_next_window_start(check_time: Optional[datetime] = None) -> datetime:
+    """
+    Get the start of the next working window (morning or afternoon, skipping holidays/weekends).
+    Returns check_time itself if it is already within working hours.
+    """
+    if check_time is None:
+        check_time = datetime.now()
+
+    if is_working_hours_now(check_time):
+        return check_time
+
+    candidate_date = check_time.date()
+    # A year of consecutive holidays is a configuration error, stop looking
+    for _ in range(366):
+        for start_hour in (MORNING_WINDOW_START, AFTERNOON_WINDOW_START):
+            window_start = datetime.combine(candidate_date, datetime.min.time()).replace(hour=start_hour)
+            if window_start > check_time and not is_holiday(window_start):
+                return window_start
+        candidate_date += timedelta(days=1)
+
+    raise ValueError("No working window found within a year, check NATIONAL_HOLIDAYS")
+
+def get_window_start(check_time: datetime) -> datetime:
+    """Start of the working window (morning or afternoon) that check_time falls in"""
+    start_hour = MORNING_WINDOW_START if MORNING_WINDOW_START <= check_time.hour < MORNING_WINDOW_END else AFTERNOON_WINDOW_START
+    return datetime.combine(check_time.date(), datetime.min.time()).replace(hour=start_hour)
+
+def get_window_end(window_start: datetime) -> datetime:
+    """End of the working window (morning or afternoon) that window_start falls in"""
+    end_hour = MORNING_WINDOW_END if MORNING_WINDOW_START <= window_start.hour < MORNING_WINDOW_END else AFTERNOON_WINDOW_END
+    return datetime.combine(window_start.date(), datetime.min.time()).replace(hour=end_hour)
+
 def normalize_datetime(dt_str):
     """Convert ISO8601 datetime string (e.g. '2025-10-31T17:25:33.038+01:00')
     into MySQL-compatible format 'YYYY-MM-DD HH:MM:SS'.
@@ -1,8 +1,10 @@
-import xmlschema
 from fastapi import FastAPI
-
-MNP_SCHEMA_PATH = "mnp_schema.xsd"
+from services.italy.xsd_validation import get_mnp_validator, shutdown_validation_pool
 
 def init_schema(app: FastAPI):
-    """Initialize and attach the MNP XML schema to the FastAPI app state."""
-    app.state.mnp_schema = xmlschema.XMLSchema(MNP_SCHEMA_PATH)
+    """Compile the MNP XML schema once per worker and attach the validator to the FastAPI app state."""
+    app.state.mnp_schema = get_mnp_validator()
+
+def close_schema(app: FastAPI):
+    """Stop the XSD validation process pool."""
+    shutdown_validation_pool()
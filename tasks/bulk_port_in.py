@@ -0,0 +1,148 @@
+import math
+import time
+from datetime import datetime
+
+from celery_app import app
+from config import settings
+from porting.spain_nc import submit_to_central_node_online
+from services.database_service import (
+    advance_port_in_batch, claim_port_in_batch_item, deferred_backlog_end, fail_stuck_port_in_batch_items,
+    find_undispatched_port_in_batches, load_port_in_batch_queue
+)
+from services.logger_simple import logger
+from services.redis_client import get_redis
+from services.time_services import get_window_end, get_window_start, is_working_hours_now
+
+PACING_KEY = "mnp:bulk-port-in:next-slot"
+# Redis broker default: an unacknowledged ETA task is redelivered after visibility_timeout
+DEFAULT_VISIBILITY_TIMEOUT = 3600
+# Margin kept below the visibility timeout for queueing and worker delays
+HORIZON_MARGIN_SECONDS = 300
+
+# Reserve up to ARGV[2] consecutive send slots ARGV[3] seconds apart, starting no earlier than
+# now and the floor ARGV[5], and before the horizon ARGV[4]; returns {first slot, slots reserved}.
+# Shared by all batches, so concurrent batches do not add up.
+_RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[3])
+local start = math.max(now, tonumber(ARGV[5]), tonumber(redis.call('get', KEYS[1]) or '0'))
+local reserved = math.min(tonumber(ARGV[2]), math.max(0, math.ceil((tonumber(ARGV[4]) - start) / interval)))
+if reserved > 0 then
+    local next_slot = start + reserved * interval
+    redis.call('set', KEYS[1], tostring(next_slot), 'EX', math.ceil(next_slot - now) + 60)
+end
+return {tostring(start), reserved}
+"""
+
+
+def _dispatch_horizon(now: float) -> float:
+    """
+    Epoch time no send slot may reach: the end of the current working window, and the broker
+    visibility timeout (a task with a longer ETA would be redelivered to a second worker)
+    """
+    visibility_timeout = app.conf.broker_transport_options.get('visibility_timeout', DEFAULT_VISIBILITY_TIMEOUT)
+    horizon = now + visibility_timeout - HORIZON_MARGIN_SECONDS
+    if not settings.IGNORE_WORKING_HOURS:
+        horizon = min(horizon, get_window_end(datetime.fromtimestamp(now)).timestamp())
+    return horizon
+
+
+def _deferred_backlog_end(now: float) -> float:
+    """
+    Epoch time the requests deferred to the current working window (allocate_send_slot(), paced
+    at NC_THROUGHPUT_PER_MINUTE) have all been sent; bulk items start after them, so NC never
+    gets both rates at once
+    """
+    if settings.IGNORE_WORKING_HOURS:
+        return now
+    return deferred_backlog_end(get_window_start(datetime.fromtimestamp(now))).timestamp()
+
+
+def _reserve_send_slots(count: int, interval: float, horizon: float):
+    """(epoch time of the first slot, slots reserved) of up to count paced NC send slots before horizon"""
+    now = time.time()
+    try:
+        floor = _deferred_backlog_end(now)
+        start, reserved = get_redis().eval(_RESERVE_SCRIPT, 1, PACING_KEY, now, count, interval, horizon, floor)
+        return float(start), int(reserved)
+    except Exception as e:
+        logger.warning("Bulk port-in pacing slots unavailable, pacing this batch alone: %s", e)
+        return now, min(count, max(0, math.ceil((horizon - now) / interval)))
+
+
+@app.task
+def dispatch_port_in_batch(batch_id):
+    """
+    Queue the NC submissions of a bulk port-in (POST /port-in-legal/bulk), spaced
+    60 / BULK_PORT_IN_SUBMIT_PER_MINUTE seconds apart across all batches, after the requests
+    deferred to this working window.
+
+    Only the slots before _dispatch_horizon() are queued; the rest of the batch stays ACCEPTED
+    and is continued by sweep_port_in_batches. Outside working hours the batch is left for the
+    sweep as well, instead of every item being answered ACCS PERME by NC.
+    """
+    if not settings.IGNORE_WORKING_HOURS and not is_working_hours_now():
+        return f"Port-in batch {batch_id} left for the next working window"
+
+    queue = load_port_in_batch_queue(batch_id)
+    if queue is None:
+        return f"Port-in batch {batch_id} not found or already dispatched"
+    queued_through, request_ids = queue
+    if not request_ids:
+        advance_port_in_batch(batch_id, queued_through, queued_through, done=True)
+        return f"Port-in batch {batch_id} has nothing to submit"
+
+    interval = 60 / max(1, settings.BULK_PORT_IN_SUBMIT_PER_MINUTE)
+    first_slot, reserved = _reserve_send_slots(len(request_ids), interval, _dispatch_horizon(time.time()))
+    if not reserved:
+        return f"Port-in batch {batch_id}: no send slot left before the horizon, left for the sweep"
+
+    done = reserved == len(request_ids)
+    request_ids = request_ids[:reserved]
+    if not advance_port_in_batch(batch_id, queued_through, request_ids[-1], done):
+        return f"Port-in batch {batch_id} advanced by another run"
+
+    now = time.time()
+    for index, request_id in enumerate(request_ids):
+        submit_port_in_batch_item.apply_async(
+            args=[request_id],
+            countdown=max(0.0, first_slot + index * interval - now)
+        )
+    last_countdown = max(0.0, first_slot + (len(request_ids) - 1) * interval - now)
+    logger.info("Port-in batch %s: %s submissions queued over %.0f s%s", batch_id, len(request_ids),
+                last_countdown, "" if done else ", rest left for the sweep")
+    return f"Port-in batch {batch_id}: {len(request_ids)} submissions queued"
+
+
+@app.task
+def submit_port_in_batch_item(mnp_request_id):
+    """Submit one request of a bulk port-in to NC; the result is stored on the request row"""
+    # A redelivered or duplicated task finds the request already claimed
+    if not claim_port_in_batch_item(mnp_request_id):
+        return f"Port-in request {mnp_request_id} already submitted"
+    result = submit_to_central_node_online(mnp_request_id)
+    success, response_code = result[0], result[1]
+    if not success:
+        logger.warning("Bulk port-in request %s not accepted by NC: %s", mnp_request_id, response_code)
+    return f"Port-in request {mnp_request_id}: {response_code}"
+
+
+@app.task
+def sweep_port_in_batches():
+    """
+    Celery Beat task: dispatch bulk port-ins not (fully) queued yet (enqueue failed, outside
+    working hours, or beyond the horizon of the previous run), and fail items whose worker died
+    while submitting them
+    """
+    stuck_ids = fail_stuck_port_in_batch_items(settings.BULK_PORT_IN_SUBMIT_TIMEOUT_SECONDS)
+    if stuck_ids:
+        logger.error("Bulk port-in requests %s stuck in SUBMITTING, marked ERROR", stuck_ids)
+
+    if not settings.IGNORE_WORKING_HOURS and not is_working_hours_now():
+        return "Outside working hours, no port-in batches dispatched"
+    batch_ids = find_undispatched_port_in_batches()
+    for batch_id in batch_ids:
+        dispatch_port_in_batch(batch_id)
+    if not batch_ids:
+        return "No port-in batches to dispatch"
+    return f"Dispatched {len(batch_ids)} port-in batches"
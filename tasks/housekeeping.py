@@ -0,0 +1,34 @@
+from celery_app import app
+from services.database_service import close_expired_portout_msisdn_ranges
+from services.idempotency import purge_expired
+from services.logger_simple import logger
+
+PURGE_BATCH_SIZE = 1000
+
+
+@app.task
+def purge_idempotency_keys():
+    """Celery Beat task: delete expired idempotency keys (services/idempotency.py) in bounded batches"""
+    total = 0
+    while True:
+        deleted = purge_expired(PURGE_BATCH_SIZE)
+        total += deleted
+        if deleted < PURGE_BATCH_SIZE:
+            break
+    if total:
+        logger.info("Purged %s expired idempotency keys", total)
+    return f"Purged {total} expired idempotency keys"
+
+
+@app.task
+def close_expired_portout_ranges():
+    """Celery Beat task: close port-out MSISDN ranges whose port window has passed (/portout-msisdn)"""
+    total = 0
+    while True:
+        closed = close_expired_portout_msisdn_ranges(PURGE_BATCH_SIZE)
+        total += closed
+        if closed < PURGE_BATCH_SIZE:
+            break
+    if total:
+        logger.info("Closed %s expired port-out MSISDN ranges", total)
+    return f"Closed {total} expired port-out MSISDN ranges"
@@ -0,0 +1,63 @@
+import time
+import uuid
+
+from celery_app import app
+from config import settings
+from services.bss_outbox import claim_batch, complete_batch, deliver_batch, purge_delivered
+from services.database_service import get_db_connection
+from services.logger_simple import logger
+from services.portability_cache import invalidate_portability_requests
+from services.portout_seen import mark_submitted
+from services.redis_client import acquire_lock, release_lock
+
+DISPATCH_LOCK_KEY = "mnp:bss-outbox:dispatch-lock"
+
+
+@app.task(bind=True)
+def dispatch_bss_outbox(self):
+    """
+    Celery Beat task: deliver pending BSS callbacks from bss_outbox (services/bss_outbox.py).
+
+    Claims batches until the outbox has nothing due or BSS_OUTBOX_RUN_BUDGET_SECONDS is spent.
+    One dispatcher runs at a time (Redis lock); without Redis, SKIP LOCKED still keeps
+    concurrent dispatchers from claiming the same rows.
+    """
+    token = uuid.uuid4().hex
+    lock_ttl = settings.BSS_OUTBOX_RUN_BUDGET_SECONDS + settings.BSS_OUTBOX_LEASE_SECONDS
+    try:
+        if not acquire_lock(DISPATCH_LOCK_KEY, token, lock_ttl):
+            return "BSS outbox dispatcher already running"
+    except Exception as e:
+        logger.warning("BSS outbox dispatch lock unavailable, running unlocked: %s", e)
+
+    deadline = time.monotonic() + settings.BSS_OUTBOX_RUN_BUDGET_SECONDS
+    totals = {"delivered": 0, "failed": 0, "deferred": 0}
+    connection = None
+    try:
+        connection = get_db_connection()
+        while time.monotonic() < deadline:
+            rows = claim_batch(connection)
+            if not rows:
+                break
+            outcomes = deliver_batch(rows)
+            summary = complete_batch(connection, rows, outcomes)
+            mark_submitted(summary.pop("port_out_delivered"))
+            invalidate_portability_requests(summary.pop("port_in_delivered"))
+            for key in totals:
+                totals[key] += summary[key]
+            logger.info("BSS outbox batch: %s claimed, %s delivered, %s failed, %s deferred",
+                        len(rows), summary["delivered"], summary["failed"], summary["deferred"])
+            if len(rows) < settings.BSS_OUTBOX_BATCH_SIZE:
+                break
+        purge_delivered(connection)
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+        try:
+            release_lock(DISPATCH_LOCK_KEY, token)
+        except Exception as e:
+            logger.warning("Could not release BSS outbox dispatch lock: %s", e)
+
+    if not any(totals.values()):
+        return "No BSS callbacks due"
+    return f"BSS outbox: {totals['delivered']} delivered, {totals['failed']} failed, {totals['deferred']} deferred"
@@ -17,6 +17,7 @@ from tasks.tasks import submit_to_central_node, check_status, callback_bss, subm
 # from services.logger import logger
 from services.logger_simple import log_payload, logger
 from config import settings
+from services.polling_policy import dispatch_countdown
 
 @app.task
 def print_periodic_message():
@@ -64,7 +65,8 @@ def process_pending_requests():
                 check_single_request.delay(request['id'], request['status_nc'], 
                                            request['session_code'], request['msisdn'], 
                                            request['response_status'], request.get('status_bss'), 
-                                           request.get('reference_code'), request.get('request_type'), request.get('response_code'))
+                                           request.get('reference_code'), request.get('request_type'), request.get('response_code'),
+                                           porting_window=request['porting_window'].isoformat() if request.get('porting_window') else None)
                 processed_count += 1
                 
             except (mysql.connector.Error, requests.exceptions.RequestException) as e:
@@ -83,7 +85,7 @@ def process_pending_requests():
 
 from tasks.tasks import check_status_port_out
 @app.task
-def check_single_request(request_id, status_nc, session_code, msisdn, response_status, status_bss,reference_code, request_type, response_code):
+def check_single_request(request_id, status_nc, session_code, msisdn, response_status, status_bss,reference_code, request_type, response_code, porting_window=None):
     """Check a single MNP request and schedule next check if needed"""
     logger.debug("ENTER check_single_request() with req_id: %s, status_nc %s, status_bss %s, msisdn %s, reference_code %s response_code %s", request_id, status_nc, status_bss, msisdn, reference_code, response_code)
     # logger.debug("Func: check single request -- %s reference_code %s", request_id, reference_code)
@@ -118,7 +120,8 @@ def check_single_request(request_id, status_nc, session_code, msisdn, response_s
                     return "Port-in request submitted for request ID %s", str(request_id)
 
         if status_nc in ["PENDING_RESPONSE","PORT_IN_CONFIRMED","SUBMITTED"]:
-            a_seconds = 0  # for status check we want to process asap
+            # Due checks are spread a little, except near the porting window where we want them asap
+            a_seconds = dispatch_countdown(datetime.fromisoformat(porting_window) if porting_window else None)
             check_status.apply_async(
                 args=[request_id,session_code,msisdn, reference_code], 
                 countdown=a_seconds
@@ -203,7 +206,7 @@ def get_due_requests():
         response_status, 
         status_bss, 
         reference_code, 
-        request_type, response_code
+        request_type, response_code, porting_window
     FROM portability_requests
     WHERE country_code = 'ESP'
     AND (scheduled_at IS NULL OR scheduled_at <= NOW())
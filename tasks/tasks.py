@@ -14,9 +14,16 @@ from datetime import datetime, timedelta
 import logging
 import pytz
 # from db_utils import get_db_connection
-from services.database_service import get_db_connection
+from services.database_service import get_db_connection, allocate_send_slot, load_portout_requests
+from services.database_service import find_submitted_portout_codes, mark_portout_requests_submitted
+from services.bss_outbox import enqueue_port_in_callback, port_in_payload, port_in_status_bss, return_payload
+from services.bss_webhook import post_webhooks
 from config import settings
 from services.time_services import calculate_countdown_working_hours, normalize_datetime
+from services.polling_policy import next_poll_delay
+from services.nc_records import NcStatus, PortOutNotification
+from services.portout_seen import lookup_seen, mark_submitted
+from services.portability_cache import invalidate_portability_request
 # from services.logger import logger
 from services.logger_simple import log_payload, logger
 from porting.spain_nc import initiate_session, callback_bss_online
@@ -104,7 +111,7 @@ def submit_to_central_node(self, mnp_request_id):
         # soap_payload = json_from_db_to_soap_new(mnp_request)  # function to create SOAP
         soap_payload = json_from_db_to_soap_online(mnp_request, session_code)
         # Conditional payload logging
-        log_payload('NC', 'PORT_IN', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'PORT_IN', 'REQUEST', soap_payload, request_id=mnp_request_id)
         logger.debug("PORT_IN_REQUEST->NC:\n%s", str(soap_payload))
 
         # 4. Try to send the request to Central Node
@@ -129,10 +136,10 @@ def submit_to_central_node(self, mnp_request_id):
 
         # 5. Parse the SOAP response (use your existing logic)
         # session_code, status = parse_soap_response_list(response.text,)
-        response_code, description, reference_code,porting_window_date = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia","fechaVentanaCambio"])
+        response_code, description, reference_code,porting_window_date = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia","fechaVentanaCambio"])
 
         # Conditional payload logging
-        log_payload('NC', 'PORT_IN', 'RESPONSE', str(response.text))
+        log_payload('NC', 'PORT_IN', 'RESPONSE', response.content, request_id=mnp_request_id)
         logger.debug("PORT_IN_RESPONSE<-NC:\n%s", str(response.text))
 
         if response_code is not None:  # Check if parsing was successful
@@ -163,28 +170,19 @@ def submit_to_central_node(self, mnp_request_id):
             WHERE id = %s
         """        
         cursor.execute(update_query, (status_nc,session_code, status_bss, response_code, description, reference_code,mnp_request_id))
-        connection.commit()
 
                  # Check if status actually changed
         status_changed = (response_code != response_code_old)
 
         # Updated BSS in case status_nc changed
         if status_changed:
-            a, _, _ = calculate_countdown_working_hours(
-                timedelta(minutes=0), 
-                with_jitter=True)
-            a_seconds = int(a.total_seconds())
-            a_seconds = 0 # TODO - remove after testing
-
             logger.debug("Call back BSS happen: yes status_nc change %s response_code %s description %s", status_nc, response_code, description)
-            callback_bss.apply_async(
-                    args=[mnp_request_id, reference_code,session_code,response_status, msisdn, response_code, description, porting_window_date, None],
-                    countdown=a_seconds
-                )
-        
-        # def callback_bss(self, mnp_request_id, reference_code, reject_code, session_code, response_status, msisdn, response_code, description, porting_window_date, error_fields=None):
+            # Stored with the status change, delivered by tasks/outbox.py
+            enqueue_port_in_callback(cursor, mnp_request_id, reference_code, response_status, msisdn, response_code, description,
+                                     porting_window_date=porting_window_date)
         else:
             logger.debug("Call back BSS happen: no %s, response_code %s response_code_old %s no callback to BSS needed.", mnp_request_id, response_code, response_code_old)
+        connection.commit()
 
         # callbsck bss will raise upon above chnaged status 
         return success, response_code, description, reference_code
@@ -274,6 +272,7 @@ def submit_to_central_node(self, mnp_request_id):
             if cursor:
                 cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 @app.task(bind=True, max_retries=3)
 def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
@@ -291,7 +290,7 @@ def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
         connection = get_db_connection()
         cursor = connection.cursor(dictionary=True)
         
-        cursor.execute("SELECT status_nc, session_code, msisdn, response_status FROM portability_requests WHERE id = %s",(mnp_request_id,))
+        cursor.execute("SELECT status_nc, session_code, msisdn, response_status, request_type, poll_count, porting_window, created_at FROM portability_requests WHERE id = %s",(mnp_request_id,))
         # cursor.execute("SELECT * FROM portability_requests WHERE id = %s AND NOW() > scheduled_at",(mnp_request_id,))
         mnp_request = cursor.fetchone()
         status_nc_old = mnp_request['status_nc'] if mnp_request else 'NOT_FOUND'
@@ -326,25 +325,17 @@ def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
         # fields = ["codigoRespuesta", "descripcion","codigoReferencia","estado"]
         # response_code, description, reference_code, estado  = parse_soap_response_nested_multi(response.text, fields) 
 
-        fields = ["tipoProceso", "codigoRespuesta", "descripcion", "codigoReferencia", "estado","fechaVentanaCambio","fechaCreacion","causaRechazo","fechaRechazo"]
-        result = parse_soap_response_nested_multi(response.text, fields, reference_code)
-
-        # Ensure result is an iterable (the parser may return None) to avoid typing/None issues
-        if result is None:
-            result = [None] * len(fields)
-
-        # Create a dictionary using dict comprehension
-        result_dict = {field: value for field, value in zip(fields, result)}
-
-        # Access by field name safely
-        estado = result_dict.get("estado")
-        reference_code = result_dict.get("codigoReferencia")
-        reject_code = result_dict.get("causaRechazo")
-        description = result_dict.get("descripcion")
-        response_code = result_dict.get("codigoRespuesta")
-        porting_window = result_dict.get("fechaVentanaCambio")
-        reject_reason = result_dict.get("causaRechazo")
-        reject_date = result_dict.get("fechaRechazo")
+        # Registro of this reference code; all fields None if NC did not return it
+        nc_status = NcStatus.from_response(response.content, reference_code) or NcStatus()
+
+        estado = nc_status.state
+        reference_code = nc_status.reference_code
+        reject_code = nc_status.reject_reason
+        description = nc_status.description
+        response_code = nc_status.response_code
+        porting_window = nc_status.porting_window
+        reject_reason = nc_status.reject_reason
+        reject_date = nc_status.reject_date
         porting_window_db = convert_for_mysql_env_tz(porting_window) if porting_window else None
 
          
@@ -363,11 +354,19 @@ def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
         # If it's still pending, queue the next check during working hours
         # if estado == 'ASOL':
         status_nc = 'PENDING_RESPONSE'# request confirmed, now shedule another updates
+        status_changed = (estado != estado_old)
+        # Back off while NC reports the same status, poll densely near the porting window
+        poll_count = 0 if status_changed else (mnp_request.get('poll_count') or 0) + 1
+        poll_delay = next_poll_delay(
+                                    mnp_request.get('request_type'),
+                                    estado,
+                                    poll_count,
+                                    porting_window=porting_window_db or mnp_request.get('porting_window'),
+                                    created_at=mnp_request.get('created_at')
+                                    )
             # Still same status, updated scheduled_at for next check - within same timenad
-        _, _, scheduled_datetime = calculate_countdown_working_hours(
-                                                        delta=settings.TIME_DELTA_FOR_STATUS_CHECK, 
-                                                        with_jitter=True
-                                                                                    )
+        # Final NC status: no next check, status_nc is set below
+        scheduled_datetime = allocate_send_slot(poll_delay, with_jitter=True) if poll_delay is not None else None
             # Update database with the actual scheduled time
         update_query = """
                 UPDATE portability_requests 
@@ -375,49 +374,40 @@ def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
                 response_code= %s,
                 description = %s,
                 reference_code = %s,
-                scheduled_at = %s,
+                scheduled_at = COALESCE(%s, scheduled_at),
                 porting_window = %s,
                 reject_reason = %s,
+                poll_count = %s,
                 updated_at = NOW() 
                 WHERE id = %s
             """
-        logger.debug("Update query %s, estado_old %s estado %s, status_nc %s, mnp_request_id %s, porting_window_db %s", 
-        update_query, estado_old, estado, status_nc, mnp_request_id, porting_window_db)
-        cursor.execute(update_query, (estado,response_code, description, reference_code, scheduled_datetime, porting_window_db, reject_reason, mnp_request_id))
+        logger.debug("Update query %s, estado_old %s estado %s, status_nc %s, mnp_request_id %s, porting_window_db %s, poll_count %s", 
+        update_query, estado_old, estado, status_nc, mnp_request_id, porting_window_db, poll_count)
+        cursor.execute(update_query, (estado,response_code, description, reference_code, scheduled_datetime, porting_window_db, reject_reason, poll_count, mnp_request_id))
+        if status_changed:
+            # Stored with the status change, delivered by tasks/outbox.py
+            enqueue_port_in_callback(cursor, mnp_request_id, reference_code, estado, msisdn, response_code, description,
+                                     reject_reason, reject_date, porting_window_db)
         connection.commit()
         
-        status_changed = (estado != estado_old)    # callback_bss.delay(mnp_request_id)
         # logger.debug("check_status: ref: %s estado %s, estado_old %s status_chnaged %s ",reference_code, estado, estado_old, status_changed)
         if status_changed:
             logger.debug("check_status: ref: %s estado %s, estado_old %s status_chnaged %s ",reference_code, estado, estado_old, status_changed)
 
-            log_payload('NC', 'CHECK_STATUS', 'REQUEST', str(consultar_payload))
+            log_payload('NC', 'CHECK_STATUS', 'REQUEST', consultar_payload, request_id=mnp_request_id)
             logger.debug("STATUS_CHECK_REQUEST->NC:\n%s", str(consultar_payload))
 
-            log_payload('NC', 'CHECK_STATUS', 'RESPONSE', str(response.text))
+            log_payload('NC', 'CHECK_STATUS', 'RESPONSE', response.content, request_id=mnp_request_id)
             logger.debug("STATUS_CHECK_RESPONSE<-NC:\n%s", str(response.text))
             logger.debug("estado %s, estado_old %s status_chnaged %s ",estado, estado_old, status_changed)
             logger.debug("ENTER callback_bss_status_changed: %s",reference_code)
-# def callback_bss(self, mnp_request_id, reference_code, session_code, response_status, msisdn, response_code, description, porting_window_date, error_fields=None):
-            callback_bss.delay(
-                mnp_request_id,
-                reference_code,
-                session_code_bss,
-                estado,
-                msisdn,
-                response_code,
-                description,
-                reject_reason,
-                reject_date,
-                porting_window_date=porting_window_db,
-                error_fields=None
-                )
             # callback_bss.apply_async(
             #         args=[mnp_request_id, reference_code,session_code,response_status, msisdn, response_code, description, porting_window_date, None],
             #         countdown=a_seconds
             #     )
 
-            return "Scheduled next check for id: %s at %s", mnp_request_id, scheduled_datetime
+            if poll_delay is not None:
+                return "Scheduled next check for id: %s at %s", mnp_request_id, scheduled_datetime
 
         if estado in ('ACON', 'APOR', 'AREC','ACAN'):
             if estado == 'ACON':
@@ -481,12 +471,15 @@ def check_status(self, mnp_request_id, session_code, msisdn,reference_code):
         if connection and connection.is_connected():
             cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 @app.task(bind=True, max_retries=3)
 def callback_bss(self, mnp_request_id, reference_code, session_code, response_status, msisdn, response_code, description, reject_reason, reject_date, porting_window_date, error_fields=None):
     """
                  args=[mnp_request_id, reference_code, session_code, response_status, msisdn, response_code, description, porting_window_date, None],
     REST JSON POST to BSS Webhook with updated English field names
+    New callbacks go through bss_outbox (tasks/outbox.py); this task delivers messages
+    queued before that.
     
     Args:
         mnp_request_id: Unique identifier for the MNP request
@@ -503,24 +496,9 @@ def callback_bss(self, mnp_request_id, reference_code, session_code, response_st
     logger.debug("ENTER callback_bss_self() with request_id %s nsisdn %s reference_code %s response_status %s",
                  mnp_request_id, msisdn, reference_code, response_status)
     
-    # Convert datetime to string for JSON payload
-    porting_window_str = porting_window_date.isoformat() if porting_window_date else ""
-    # Prepare JSON payload with new English field names
-    request_type = "Port-IN status update"
-    payload = {
-        "request_id": mnp_request_id,
-        "request_type": request_type,
-        # "session_code": session_code,
-        "reference_code":reference_code,
-        "msisdn": msisdn,
-        "response_code": response_code,
-        "response_status": response_status,
-        "description": description or f"Status update for MNP request {mnp_request_id}",
-        "reject_reason": reject_reason or "",
-        "reject_date": reject_date or "",
-        "error_fields": error_fields or [],
-        "porting_window_date": porting_window_str or ""
-    }
+    # Prepare JSON payload with new English field names (same body as the bss_outbox rows)
+    payload = port_in_payload(mnp_request_id, reference_code, response_status, msisdn, response_code, description,
+                              reject_reason, reject_date, porting_window_date, error_fields)
    
     logger.debug("Call back BSS happen: %s", payload)
     # print(f"Webhook payload being sent: {payload}")
@@ -558,10 +536,7 @@ def callback_bss(self, mnp_request_id, reference_code, session_code, response_st
                 
                 # Map response_code to appropriate status_bss value
                 # status_bss="CANCEL_REQUEST_COMPLETED" if response_status=="ACAN" else "NO_RESPONSE_ON CANCEL_RESPONSE"
-                if response_status == "":
-                    status_bss = "STATUS_UPDATED_TO_" + response_code.upper()
-                else:
-                    status_bss = "STATUS_UPDATED_TO_" + response_status.upper()    
+                status_bss = port_in_status_bss(response_status, response_code)
                 # status_bss = f"STATUS_UPDATED_TO_{response_code}"
                 # status_bss = self._map_response_to_status(response_status)
                 cursor.execute(update_query, (status_bss, mnp_request_id))
@@ -599,145 +574,84 @@ def callback_bss(self, mnp_request_id, reference_code, session_code, response_st
         if 'connection' in locals() and connection and connection.is_connected():
             cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 @app.task(bind=True, max_retries=3)
 def callback_bss_portout(self, parsed_data):
     """
     REST JSON POST to BSS Webhook port-out with updated English field names
+
+    parsed_data carries the portout_metadata id and the portout_request "ids" to
+    deliver; the rows are loaded in one query. Messages queued before that carry the
+    page response_info and "records" (compact PortOutNotification.to_message() lists)
+    or legacy "requests" dicts and are still accepted.
+
+    The webhooks go out concurrently (services/bss_webhook.py), the delivered ones are
+    flagged with one UPDATE, and only the failed ones are retried.
     """
-    meta = parsed_data["response_info"]
-    request_code = meta.get("paged_request_code")
-    logger.debug("ENTER callback_bss_portout() with paged_request_code %s", request_code)
-    connection = None
-    cursor = None
+    metadata_id = parsed_data.get("metadata_id")
+    request_code = (parsed_data.get("response_info") or {}).get("paged_request_code")
+    logger.debug("ENTER callback_bss_portout() with metadata_id %s paged_request_code %s", metadata_id, request_code)
+    ids = {}
 
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        for req in parsed_data["requests"]:
-            reference_code = req.get("reference_code")
-            check_if_submitted_query = "SELECT submitted_to_bss FROM portout_request WHERE reference_code = %s"
-            cursor.execute(check_if_submitted_query, (reference_code,))
-            existing_record = cursor.fetchone()
-            if existing_record and existing_record.get('submitted_to_bss') == 1:
-                logger.debug("Request %s already submitted to BSS - skipping", reference_code)
-                continue
-
-            sub = req["subscriber"]
-            company_name = sub.get("razon_social")
-            if company_name:  # This checks for non-empty and non-None
-                subscriber_type = "COMPANY"
+        if "ids" in parsed_data:
+            rows = load_portout_requests(parsed_data["ids"])
+            # The rows already carry submitted_to_bss, no extra check needed
+            mark_submitted(row["reference_code"] for row in rows if row.get("submitted_to_bss") == 1)
+            rows = [row for row in rows if row.get("submitted_to_bss") != 1]
+            ids = {row["reference_code"]: row["id"] for row in rows}
+            records = [PortOutNotification.from_row(row) for row in rows]
+        else:
+            if "records" in parsed_data:
+                records = [PortOutNotification.from_message(message) for message in parsed_data["records"]]
             else:
-                subscriber_type = "PERSON"
-
-            request_type = "Port-OUT"
-            payload = {
-                "request_type": request_type,
-                "notification_id": req.get("notification_id"),
-                "creation_date": normalize_datetime(req.get("creation_date")),
-                "synchronized": 1 if str(req.get("synchronized")).lower() in ("true", "1") else 0,
-                "reference_code": reference_code,
-                "status": req.get("status"),
-                "state_date": normalize_datetime(req.get("state_date")),
-                "creation_date_request": normalize_datetime(req.get("creation_date_request")),
-                "reading_mark_date": normalize_datetime(req.get("reading_mark_date")),
-                "state_change_deadline": normalize_datetime(req.get("state_change_deadline")),
-                "subscriber_request_date": normalize_datetime(req.get("subscriber_request_date")),
-                "donor_operator_code": req.get("donor_operator_code"),
-                "receiver_operator_code": req.get("receiver_operator_code"),
-                "extraordinary_donor_activation": 1 if str(req.get("extraordinary_donor_activation")).lower() in ("true", "1") else 0,
-                "contract_code": req.get("contract_code"),
-                "receiver_NRN": req.get("receiver_NRN"),
-                "port_window_date": normalize_datetime(req.get("port_window_date")),
-                "port_window_by_subscriber": 1 if str(req.get("port_window_by_subscriber")).lower() in ("true", "1") else 0,
-                "msisdn_single": req.get("msisdn_single", []),  # This should work fine with single MSISDN
-                "msisdn_ranges": req.get("msisdn_ranges", []),  # This should work fine with ranges
-                "subscriber_type": subscriber_type,
-                "company_name": company_name,
-                "subscriber": {
-                    "id_type": sub.get("id_type"),
-                    "id_number": sub.get("id_number"),
-                    "first_name": sub.get("first_name"),
-                    "last_name_1": sub.get("last_name_1"),
-                    "last_name_2": sub.get("last_name_2")
-                }
-            }
+                records = [PortOutNotification.from_dict(req) for req in parsed_data.get("requests", [])]
+            # Reference codes the seen-set knows as submitted are skipped without a query
+            _, submitted = lookup_seen(record.reference_code for record in records)
+            records = [record for record in records if record.reference_code not in submitted]
+            submitted = find_submitted_portout_codes(record.reference_code for record in records)
+            mark_submitted(submitted)
+            records = [record for record in records if record.reference_code not in submitted]
+    except Exception as e:
+        logger.error("Could not load port-out requests for metadata_id %s: %s", metadata_id, str(e))
+        self.retry(exc=e, countdown=120)
+        return False
 
-            logger.debug("callback_bss_portout payload: %s", payload)
-            bss_webhook_port_out = settings.BSS_WEBHOOK_PORT_OUT_URL
-            json_payload = json.dumps(payload, ensure_ascii=False)
-            
-            try:
-                response = requests.post(
-                    bss_webhook_port_out,
-                    data=json_payload,
-                    headers=settings.get_headers_bss(),
-                    timeout=settings.APIGEE_API_QUERY_TIMEOUT,
-                    verify=settings.SSL_VERIFICATION
-                )
+    if not records:
+        logger.debug("callback_bss_portout: all requests already submitted to BSS - skipping")
+        return "No port-out requests to submit"
 
-                # Check if request was successful
-                if response.status_code == 200:
-                    logger.info(
-                        "Webhook sent successfully for reference_code %s", reference_code
-                    )
+    results = post_webhooks(
+        settings.BSS_WEBHOOK_PORT_OUT_URL,
+        ((record.reference_code, record.to_bss_json()) for record in records)
+    )
+    delivered = [result.key for result in results if result.ok]
+    retry = {result.key for result in results if result.retryable}
 
-                    # Update database with the actual scheduled time
-                    try: 
-                        update_query = """
-                            UPDATE portout_request 
-                            SET status_bss = %s,
-                            submitted_to_bss = 1,
-                            updated_at = NOW() 
-                            WHERE reference_code = %s
-                        """
-                        cursor.execute(update_query, ("PORT_OUT_REQUEST_SUBMITTED", reference_code))
-                        connection.commit()
-                        
-                        logger.debug(
-                            "Database updated for reference_code %s with status_bss: %s", 
-                            reference_code, "PORT_OUT_REQUEST_SUBMITTED"
-                        )
-                  
-                    except Exception as db_error:
-                        logger.error("Database update failed for reference_code %s: %s", reference_code, str(db_error))
-                        # Don't return False here, continue with other requests
-                        continue
-                else:
-                    logger.error(
-                        "Webhook failed for reference_code %s with status code: %s", 
-                        reference_code, response.status_code
-                    )
-                    # Continue with next request even if this one fails
-                    continue
-                
-            except requests.exceptions.Timeout as exc:
-                logger.error("Webhook timeout for reference_code %s: %s", reference_code, str(exc))
-                self.retry(exc=exc, countdown=120)
-                break  # Break the loop and retry the entire task
-            except requests.exceptions.ConnectionError as exc:
-                logger.error("Webhook connection error for reference_code %s: %s", reference_code, str(exc))
-                self.retry(exc=exc, countdown=120)
-                break  # Break the loop and retry the entire task
-            except requests.exceptions.RequestException as exc:
-                logger.error("Webhook error for reference_code %s: %s", reference_code, str(exc))
-                self.retry(exc=exc, countdown=120)
-                break  # Break the loop and retry the entire task
+    if delivered:
+        try:
+            updated = mark_portout_requests_submitted(delivered)
+            mark_submitted(delivered)
+            logger.info("Webhook sent successfully for %s port-out requests (%s rows updated to %s)",
+                        len(delivered), updated, "PORT_OUT_REQUEST_SUBMITTED")
+        except Exception as db_error:
+            # Delivered but not flagged: the next poll sends them again (BSS sees a duplicate, not a gap)
+            logger.error("Database update failed for %s delivered port-out requests: %s", len(delivered), str(db_error))
+
+    if retry:
+        failed = [record for record in records if record.reference_code in retry]
+        if ids:
+            message = {"metadata_id": metadata_id, "ids": [ids[record.reference_code] for record in failed]}
+        else:
+            message = {"response_info": parsed_data.get("response_info"),
+                       "records": [record.to_message() for record in failed]}
+        logger.warning("Retrying %s of %s port-out webhooks for metadata_id %s",
+                       len(failed), len(records), metadata_id)
+        self.retry(args=(message,), countdown=120)
 
-    except Exception as e:
-        logger.error("Unexpected error in callback_bss_portout: %s", str(e))
-        if connection:
-            connection.rollback()
-        self.retry(exc=e, countdown=120)
-        return False
+    return f"Port-out webhooks: {len(delivered)} delivered, {len(records) - len(delivered)} failed"
 
-    finally:
-        # Close connection outside the loop - FIXED PLACEMENT
-        if cursor:
-            cursor.close()
-        if connection and connection.is_connected():
-            connection.close()
 
 @app.task(bind=True, max_retries=3)
 def callback_bss_portout_01(self,parsed_data):
@@ -975,6 +889,7 @@ def callback_bss_1(self, mnp_request_id, session_code, msisdn, response_status):
         if connection and connection.is_connected():
             cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 @app.task(bind=True, max_retries=3)
 def submit_to_central_node_cancel(self, mnp_request_id):
@@ -1016,7 +931,7 @@ def submit_to_central_node_cancel(self, mnp_request_id):
         soap_payload = json_from_db_to_soap_cancel(mnp_request)
         # print(soap_payload)
         # Conditional payload logging
-        log_payload('NC', 'CANCEL', 'REQUEST', str(soap_payload))
+        log_payload('NC', 'CANCEL', 'REQUEST', soap_payload, request_id=mnp_request_id)
         logger.debug("CANCEL_REQUEST->NC:\n%s", str(soap_payload))
 
         # 4. Try to send the request to Central Node
@@ -1035,11 +950,11 @@ def submit_to_central_node_cancel(self, mnp_request_id):
 
         # 5. Parse the SOAP response (use your existing logic)
         # session_code, status = parse_soap_response_list(response.text,)
-        response_code, description, reference_code = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
+        response_code, description, reference_code = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         print(f"Cancel to NC: Received response: response_code={response_code}, description={description}, reference_code={reference_code}")
 
         # Conditional payload logging
-        log_payload('NC', 'CANCEL', 'RESPONSE', str(response.text))
+        log_payload('NC', 'CANCEL', 'RESPONSE', response.content, request_id=mnp_request_id)
         logger.debug("CANCEL_RESPONSE<-NC:\n%s", str(response.text))
 # Received response: 
 # response_code=400, description=Campos obligatorios faltantes: fechaSolicitudPorAbonado, codigoOperadorDonante, 
@@ -1105,9 +1020,10 @@ def submit_to_central_node_cancel(self, mnp_request_id):
                     WHERE id = %s
                     """
                 cursor.execute(update_query, (status_nc, response_code, reference_code, description, mnp_request_id))
+                # Stored with the status change, delivered by tasks/outbox.py
+                enqueue_port_in_callback(cursor, mnp_request_id, reference_code, response_code, mnp_request.get('msisdn'),
+                                         response_code, description)
                 connection.commit()
-
-                callback_bss.delay(mnp_request_id, reference_code, None, response_code, description, None, None)
         else:
             # Should not come here normally, but just in case 
             logger.info("No status change for request %s", mnp_request_id)
@@ -1167,6 +1083,7 @@ def submit_to_central_node_cancel(self, mnp_request_id):
         if connection and connection.is_connected():
             cursor.close()
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 @app.task(bind=True, max_retries=3, default_retry_delay=60)
 def submit_to_central_node_task(self, mnp_request_id: int) -> Tuple[bool, Optional[str], Optional[str], Optional[str]]:
@@ -1203,7 +1120,7 @@ def submit_to_central_node_task(self, mnp_request_id: int) -> Tuple[bool, Option
         response.raise_for_status()
 
         # Parse SOAP response
-        result = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion", "codigoReferencia"])
+        result = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion", "codigoReferencia"])
         response_code, description, reference_code = (result if result and len(result) == 3 else (None, None, None))
 
         # Assign status based on response_code
@@ -1288,6 +1205,7 @@ def submit_to_central_node_task(self, mnp_request_id: int) -> Tuple[bool, Option
             cursor.close()
         if connection and connection.is_connected():
             connection.close()
+        invalidate_portability_request(mnp_request_id)
 
 from services.soap_services import create_status_check_port_out_soap_nc
 @app.task(bind=True, max_retries=3)
@@ -1322,7 +1240,7 @@ def check_status_port_out_1(self):
         
         consultar_payload = create_status_check_port_out_soap_nc(session_code,operator_code, page_count)  # Check status request SOAP
         # Conditional payload logging
-        log_payload('NC', 'CHECK_STATUS_PORT_OUT_NC', 'REQUEST', str(consultar_payload))
+        log_payload('NC', 'CHECK_STATUS_PORT_OUT_NC', 'REQUEST', consultar_payload)
         logger.debug("STATUS_CHECK_PORT_OUT_REQUEST->NC:\n%s", str(consultar_payload))
         headers=settings.get_soap_headers('obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar')
         print("Check status headers:", headers)
@@ -1336,7 +1254,7 @@ def check_status_port_out_1(self):
                                timeout=settings.APIGEE_API_QUERY_TIMEOUT)
         response.raise_for_status()
 
-        log_payload('NC', 'CHECK_STATUS_PORT_OUT', 'RESPONSE', str(response.text))
+        log_payload('NC', 'CHECK_STATUS_PORT_OUT', 'RESPONSE', response.content)
         logger.debug("STATUS_CHECK_PORT_OUT_RESPONSE<-NC:\n%s", str(response.text))
 
         fields = [
@@ -1347,7 +1265,7 @@ def check_status_port_out_1(self):
             "ultimaPagina"
                 ]
 
-        xml_data = response.text
+        xml_data = response.content
         response_code, description, page_code, total_reg, last_page  = parse_soap_response_nested(xml_data, fields)   
 
         # print(f"NC Response Code: {codigoRespuesta}")
@@ -1394,13 +1312,15 @@ def check_status_port_out_1(self):
             cursor.close()
             connection.close()
 
-from services.soap_services import parse_portout_response
-from services.database_service import insert_portout_response_to_db, check_if_port_out_request_in_db
+from services.database_service import insert_portout_records_to_db
+from services.portout_paging import PortOutCursor, iter_portout_pages
 from services.time_services import is_working_hours_now
 @app.task(bind=True, max_retries=3)
 def check_status_port_out(self):
     """
     Task to check the status of port-out requests at the Central Node.
+    Pages through all pending notifications within PORT_OUT_RUN_BUDGET_SECONDS, prefetching
+    the next page while the current one is persisted (services/portout_paging.py).
     """
     if settings.IGNORE_WORKING_HOURS:
         # Process regardless of working hours
@@ -1422,66 +1342,60 @@ def check_status_port_out(self):
     operator_code=settings.APIGEE_OPERATOR_CODE
     page_count=settings.PAGE_COUNT_PORT_OUT
 
-    connection = None
-    cursor = None
-
-    try:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-          
-        consultar_payload = create_status_check_port_out_soap_nc(session_code,operator_code, page_count)  # Check status request SOAP
-        # Conditional payload logging
-        # log_payload('NC', 'CHECK_STATUS_PORT_OUT_NC', 'REQUEST', str(consultar_payload))
-        # logger.debug("STATUS_CHECK_PORT_OUT_REQUEST->NC:\n%s", str(consultar_payload))
-        # headers=settings.get_soap_headers('obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar')
-        # print("Check status headers:", headers)
+    if not APIGEE_PORT_OUT_URL:
+        raise ValueError("APIGEE_PORT_OUT_URL environment variable is not set.")
 
-        if not APIGEE_PORT_OUT_URL:
-            raise ValueError("APIGEE_PORT_OUT_URL environment variable is not set.")
-        
+    def fetch_page(paged_request_code):
+        """One NC page; runs on the prefetch thread while the previous page is persisted"""
+        consultar_payload = create_status_check_port_out_soap_nc(session_code, operator_code, page_count, paged_request_code)  # Check status request SOAP
         response = requests.post(APIGEE_PORT_OUT_URL,
                                data=consultar_payload,
                                headers=settings.get_soap_headers('obtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar'),
                                timeout=settings.APIGEE_API_QUERY_TIMEOUT)
         response.raise_for_status()
+        return consultar_payload, response.content
 
-        # log_payload('NC', 'CHECK_STATUS_PORT_OUT', 'RESPONSE', str(response.text))
-        # logger.debug("STATUS_CHECK_PORT_OUT_RESPONSE<-NC:\n%s", str(response.text))
-
-        parsed = parse_portout_response(response.text)
-        meta = parsed["response_info"]
-        total_records=int(meta.get("total_records"))
-       
-        if total_records > 0:
-                # if not check_if_port_out_request_in_db(parsed):    
-            log_payload('NC', 'CHECK_STATUS_PORT_OUT_NC', 'REQUEST', str(consultar_payload))
-            logger.debug("STATUS_CHECK_PORT_OUT_REQUEST->NC:\n%s", str(consultar_payload))
-
-            log_payload('NC', 'CHECK_STATUS_PORT_OUT', 'RESPONSE', str(response.text))
-            logger.debug("STATUS_CHECK_PORT_OUT_RESPONSE<-NC total records %s:\n%s", total_records,str(response.text))
-            insert_portout_response_to_db(parsed) # in the insert check if records with such reference_code exist
-            callback_bss_portout.delay(parsed)
-        else:
+    paging_cursor = PortOutCursor()
+    if not paging_cursor.acquire():
+        logger.info("check_status_port_out: previous run still paging, skipping this tick")
+        return "Port-out paging already running"
+
+    pages = 0
+    total_pending = 0
+
+    try:
+        # Resume mid-sequence when the previous run stopped (budget, crash) before the last page
+        start_code = paging_cursor.load()
+        if start_code:
+            logger.info("check_status_port_out: resuming paging from checkpoint %s", start_code)
+
+        for page in iter_portout_pages(fetch_page, start_code):
+            pages += 1
+            consultar_payload = page.request_payload
+            meta = page.meta
+            total_records = page.total_records
+
+            if total_records > 0:
+                log_payload('NC', 'CHECK_STATUS_PORT_OUT_NC', 'REQUEST', consultar_payload)
+                logger.debug("STATUS_CHECK_PORT_OUT_REQUEST->NC:\n%s", str(consultar_payload))
+
+                log_payload('NC', 'CHECK_STATUS_PORT_OUT', 'RESPONSE', page.content)
+                logger.debug("STATUS_CHECK_PORT_OUT_RESPONSE<-NC page %s total records %s", page.number, total_records)
+                # Stream the page: notifications are parsed and bulk-inserted batch by batch while
+                # the next page is already being fetched; existing reference codes are skipped
+                metadata_id, pending_ids = insert_portout_records_to_db(meta, page.stream)
+                logger.info("Port-out page %s metadata_id=%s: %s notifications parsed, %s pending for BSS",
+                            page.number, metadata_id, page.stream.count, len(pending_ids))
+                # Their BSS callbacks were written to bss_outbox with the rows (tasks/outbox.py delivers them)
+                total_pending += len(pending_ids)
+
+            # Checkpoint only once the page is persisted: a crash from here on resumes at the next page
+            paging_cursor.save(None if page.is_last else page.next_code)
+
+        if not total_pending:
             logger.info("No new port-out records to process from NC.")
             return "No port-out records to process"
-
-        # _, _, scheduled_datetime = calculate_countdown_working_hours(
-        #                                                 delta=settings.TIME_DELTA_FOR_PORT_OUT_STATUS_CHECK, 
-        #                                                 with_jitter=True
-        #                                                                             )
-        # # Update database with the actual scheduled time
-        # update_query = """
-        #         UPDATE portability_requests 
-        #         SET response_code= %s,
-        #         description = %s,
-        #         reference_code = %s,
-        #         session_code = %s,
-        #         scheduled_at = %s,
-        #         updated_at = NOW() 
-        #         WHERE request_type = %s
-        #     """
-        # cursor.execute(update_query, (response_code,description, page_code, session_code, scheduled_datetime, request_type))
-        # connection.commit()
+        return f"Port-out: {pages} pages, {total_pending} records queued for BSS"
 
     except requests.exceptions.RequestException as exc:
         print(f"Status check failed, retrying: {exc}")
@@ -1490,10 +1404,7 @@ def check_status_port_out(self):
         print(f"Database error during status check: {e}")
         self.retry(exc=e, countdown=30)
     finally:
-        if connection and connection.is_connected():
-            if cursor:
-                cursor.close()
-            connection.close()
+        paging_cursor.release()
 
 @app.task(bind=True, max_retries=3)
 def submit_to_central_node_cancel_new(self, mnp_request_id):
@@ -1565,8 +1476,8 @@ def submit_to_central_node_cancel_new(self, mnp_request_id):
         response.raise_for_status()
 
         # 6️.Parse SOAP response
-        response_code, description = parse_soap_response_list(response.text, ["codigoRespuesta", "descripcion"])
-        log_payload('NC', 'CANCEL', 'RESPONSE', str(response.text))
+        response_code, description = parse_soap_response_list(response.content, ["codigoRespuesta", "descripcion"])
+        log_payload('NC', 'CANCEL', 'RESPONSE', response.content, request_id=mnp_request_id)
         logger.debug("SOAP CANCEL response received for %s: %s - %s", mnp_request_id, response_code, description)
 
         # 7️.Interpret response code -> internal status
@@ -1590,7 +1501,7 @@ def submit_to_central_node_cancel_new(self, mnp_request_id):
         if response_code != response_code_old:
             logger.info("Status change for %s: %s → %s : %s", mnp_request_id, response_code_old, response_code, response_code_upper)
             
-            log_payload('NC', 'CANCEL', 'REQUEST', str(soap_payload))
+            log_payload('NC', 'CANCEL', 'REQUEST', soap_payload, request_id=mnp_request_id)
             logger.debug("SOAP CANCEL request payload generated for %s", mnp_request_id)
             status_bss = "STATUS_UPDATED_TO_" + (response_code or "")
             logger.debug("status_bss value: %s", status_bss)
@@ -1603,23 +1514,10 @@ def submit_to_central_node_cancel_new(self, mnp_request_id):
                     WHERE id = %s
                 """
             cursor.execute(update_query, (status_nc, response_code, description, status_bss, mnp_request_id))
+            # Notify BSS: stored with the status change, delivered by tasks/outbox.py
+            enqueue_port_in_callback(cursor, mnp_request_id, reference_code, response_status, msisdn, response_code, description)
             connection.commit()
 
-                # Notify BSS asynchronously
-                #callback_bss.delay(mnp_request_id, reference_code, None, response_code, description, None, None)
-            session_code_bss = ""
-            callback_bss.delay(
-                mnp_request_id,
-                reference_code,
-                session_code_bss,
-                response_status,
-                msisdn,
-                response_code,
-                description,
-                porting_window_date=None,
-                error_fields=None
-                    )
-
         else:
             logger.info("No status change for %s — scheduling next check", mnp_request_id)
             initial_delta = timedelta(seconds=PENDING_REQUESTS_TIMEOUT)
@@ -1666,61 +1564,117 @@ def submit_to_central_node_cancel_new(self, mnp_request_id):
         else:
             logger.critical("Max retries exceeded for request %s: %s", mnp_request_id, exc)
             raise exc
+    finally:
+        invalidate_portability_request(mnp_request_id)
 
 from typing import List, Dict, Any
+from celery import group
 
 # Celery app instance
 # app = Celery('mnp_tasks')
 
 # @app.task(bind=True)
 @app.task(bind=True, max_retries=3)
-def process_pending_return_status_checks(self) -> None:
+def process_pending_return_status_checks(self) -> str:
     """
     Celery task to check status of pending return requests
     Finds records where request_type=RETURN, response_status != BDEF and current_time > scheduled_at
+
+    Due rows are claimed page by page (scheduled_at is pushed forward by a lease so the next
+    beat run does not pick them up again) and fanned out as a group of check_single_return_status
+    tasks. The number of items dispatched per run is capped by RETURN_STATUS_CHECK_MAX_IN_FLIGHT,
+    anything left over is claimed on the next run.
     """
+    batch_size = max(1, settings.RETURN_STATUS_CHECK_BATCH_SIZE)
+    max_in_flight = max(batch_size, settings.RETURN_STATUS_CHECK_MAX_IN_FLIGHT)
+
+    dispatched_count = 0
+    batch_count = 0
+
     try:
         logger.info("--- Starting pending return status checks ---")
-        
-        # 1. Get due requests from database
-        due_requests = get_due_return_requests()
-        
-        if not due_requests:
+
+        while dispatched_count < max_in_flight:
+            # 1. Claim the next page of due requests
+            due_requests = get_due_return_requests(limit=min(batch_size, max_in_flight - dispatched_count))
+
+            if not due_requests:
+                break
+
+            # 2. Fan out one task per request, each acknowledged individually by its worker
+            group(check_single_return_status.s(request) for request in due_requests).apply_async()
+
+            dispatched_count += len(due_requests)
+            batch_count += 1
+            logger.debug("Dispatched return status check batch %d with %d requests", batch_count, len(due_requests))
+
+        if not dispatched_count:
             logger.info("No due return requests found")
-            return
-        
-        logger.info("Found %d due return requests to process", len(due_requests))
-        
-        # 2. Process each request
-        successful_count = 0
-        failed_count = 0
-        
-        for request in due_requests:
-            try:
-                process_single_return_status_check(request)
-                successful_count += 1
-            except Exception as e:
-                logger.error("Failed to process return status check for reference_code %s: %s", 
-                           request['reference_code'], str(e))
-                failed_count += 1
-                # The failed request will automatically be picked up in the next run
-                # since its scheduled_at won't be updated to a future time
-                
-        logger.info("--- Completed pending return status checks: %d successful, %d failed ---", 
-                   successful_count, failed_count)
-        
+            return "No due return requests found"
+
+        message = f"Dispatched {dispatched_count} return status checks in {batch_count} batches"
+        logger.info("--- %s ---", message)
+        return message
+
     except Exception as exc:
         logger.error("Celery task failed: %s", str(exc))
         # No retry for the main task - it will run again on the next schedule
+        return f"Dispatched {dispatched_count} return status checks before error: {exc}"
 
 
-def get_due_return_requests() -> List[Dict[str, Any]]:
+RETURN_STATUS_RETRY_COUNTDOWN = 60  # seconds
+
+
+def renew_return_status_lease(request_id: int, seconds: int) -> None:
+    """Keep a claimed return request hidden from get_due_return_requests() for another `seconds`"""
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE return_requests SET scheduled_at = GREATEST(scheduled_at, %s) WHERE id = %s",
+            (datetime.now() + timedelta(seconds=seconds), request_id)
+        )
+        connection.commit()
+    finally:
+        if cursor:
+            cursor.close()
+        if connection and connection.is_connected():
+            connection.close()
+
+
+@app.task(bind=True, max_retries=3, acks_late=True)
+def check_single_return_status(self, request: Dict[str, Any]) -> None:
+    """
+    Worker side of the return status check fan-out: process one claimed return request.
+    The message is acknowledged only after the check finished, so a worker crash re-delivers it.
+    A retry renews the claim lease first, so the next beat run does not dispatch the row again.
+    """
+    try:
+        process_single_return_status_check(request)
+    except Exception as exc:
+        if self.request.retries < self.max_retries:
+            try:
+                renew_return_status_lease(request['id'], RETURN_STATUS_RETRY_COUNTDOWN + settings.RETURN_STATUS_CHECK_LEASE_SECONDS)
+            except Exception as e:
+                logger.warning("Could not renew lease of return request %s: %s", request.get('id'), str(e))
+            raise self.retry(exc=exc, countdown=RETURN_STATUS_RETRY_COUNTDOWN)
+        # Give up here; the claim lease expires and the row is picked up by a later beat run
+        logger.error("Max retries exceeded for return status check reference_code %s: %s",
+                     request.get('reference_code'), str(exc))
+
+
+def get_due_return_requests(limit: int = 50) -> List[Dict[str, Any]]:
     """
-    Get return requests that need status checking:
+    Claim return requests that need status checking:
     - request_type = 'RETURN'
     - reference_code IS NOT NULL
     - response_status != 'BDEF' (or NULL)
     - scheduled_at <= current_time
+
+    Claimed rows get scheduled_at moved RETURN_STATUS_CHECK_LEASE_SECONDS ahead so that
+    repeated calls page through the backlog and in-flight rows are not dispatched twice.
     """
     connection = None
     cursor = None
@@ -1729,24 +1683,41 @@ def get_due_return_requests() -> List[Dict[str, Any]]:
         cursor = connection.cursor(dictionary=True)
         
         query = """
-        SELECT reference_code, msisdn, response_status, scheduled_at, status_nc, status_bss, retry_count
+        SELECT id, reference_code, msisdn, response_status, scheduled_at, status_nc, status_bss, retry_count
         FROM return_requests 
         WHERE request_type = 'RETURN'
           AND reference_code IS NOT NULL
           AND (response_status IS NULL OR response_status != 'BDEF')
           AND scheduled_at <= %s
-        ORDER BY scheduled_at ASC
-        LIMIT 100  -- Process in batches to avoid overloading
+        ORDER BY scheduled_at ASC, id ASC
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
         """
         
-        cursor.execute(query, (datetime.now(),))
+        now = datetime.now()
+        cursor.execute(query, (now, limit))
         results = cursor.fetchall()
-        
-        logger.debug("Found %d due return requests", len(results))
+
+        if results:
+            ids = [row['id'] for row in results]
+            placeholders = ", ".join(["%s"] * len(ids))
+            claim_query = f"UPDATE return_requests SET scheduled_at = %s WHERE id IN ({placeholders})"
+            lease_until = now + timedelta(seconds=settings.RETURN_STATUS_CHECK_LEASE_SECONDS)
+            cursor.execute(claim_query, (lease_until, *ids))
+        connection.commit()
+
+        # datetime is not JSON serializable for the Celery message
+        for row in results:
+            if isinstance(row.get('scheduled_at'), datetime):
+                row['scheduled_at'] = row['scheduled_at'].isoformat()
+
+        logger.debug("Claimed %d due return requests", len(results))
         return results
         
     except Exception as e:
         logger.error("Failed to get due return requests: %s", str(e))
+        if connection:
+            connection.rollback()
         return []
     finally:
         if cursor:
@@ -1774,7 +1745,7 @@ def process_single_return_status_check(request: Dict[str, Any]) -> None:
         response_dict = submit_to_central_node_return_status_check(reference_code)
         
         # 3. Log the response payload
-        log_payload('NC', 'RETURN_STATUS', 'RESPONSE', str(response_dict))
+        log_payload('NC', 'RETURN_STATUS', 'RESPONSE', response_dict)
         
         # 4. Convert to English field names
         response_dict_eng = convert_spanish_to_english(response_dict)
@@ -1785,23 +1756,15 @@ def process_single_return_status_check(request: Dict[str, Any]) -> None:
         # 6. Check if response_status has changed
         status_changed = current_response_status != new_response_status
         
-        # 7. Update status in return_requests
-        update_return_request_with_nc_response(reference_code, response_dict_eng)
-        
-        # 8. Call BSS callback ONLY if response_status changed
+        # 7. Update status in return_requests; the BSS callback (ONLY if response_status changed)
+        # is written to bss_outbox in the same transaction and delivered by tasks/outbox.py
+        update_return_request_with_nc_response(reference_code, response_dict_eng,
+                                               notify_bss=status_changed, msisdn=msisdn)
+
+        # 8. Log the BSS callback decision
         if status_changed:
             logger.info("Response status changed from %s to %s, triggering BSS callback for reference_code: %s",
                        current_response_status, new_response_status, reference_code)
-            
-            # Call the Celery task for BSS callback with full NC response
-            # from .tasks import callback_bss_return  # Import your task
-            
-            # Call the Celery task asynchronously with full NC response dict
-            callback_bss_return.delay(
-                reference_code=reference_code,
-                msisdn=msisdn,
-                nc_response_dict=response_dict_eng  # Send the full converted NC response dictionary
-            )
         else:
             logger.info("No status change for reference_code: %s (current: %s, new: %s). Skipping BSS callback.",
                        reference_code, current_response_status, new_response_status)
@@ -1818,6 +1781,8 @@ def process_single_return_status_check(request: Dict[str, Any]) -> None:
 def callback_bss_return(self, reference_code, msisdn, nc_response_dict):
     """
     REST JSON POST to BSS Webhook for RETURN requests with full NC response data
+    New callbacks go through bss_outbox (tasks/outbox.py); this task delivers messages
+    queued before that.
     
     Args:
         reference_code: codigoreferencia - assigned by NC
@@ -1828,13 +1793,7 @@ def callback_bss_return(self, reference_code, msisdn, nc_response_dict):
                  reference_code, msisdn)
 
     # Prepare JSON payload with the full NC response data
-    request_type = "Return"
-    payload = {
-        "reference_code": reference_code,
-        "request_type":request_type,
-        "msisdn": msisdn,
-        **nc_response_dict  # Unpack all NC response fields
-    }
+    payload = return_payload(reference_code, msisdn, nc_response_dict)
    
     logger.debug("Call back BSS for RETURN with full NC response: %s", payload)
     bss_webhook_url = settings.BSS_WEBHOOK_URL_RETURN  # You might want a separate webhook for returns
@@ -164,6 +164,8 @@ CHECK_PORT_OUT_STATUS_TEMPLATE  = """
       <buz:peticionObtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar>
          <v1:codigoSesion>{session_code}</v1:codigoSesion>
          <!--Optional:-->
+         {paged_request_optional}
+         <!--Optional:-->
          <v1:registrosPorPagina>{page_count}</v1:registrosPorPagina>
          <buz:codigoOperadorObjeto>{operator_code}</buz:codigoOperadorObjeto>
          <buz:marcarComoSincronizadas>false</buz:marcarComoSincronizadas>
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one port-out page of BSS webhooks, sequential requests.post vs post_webhooks.
+
+Starts a local HTTP server that answers every POST after WEBHOOK_LATENCY seconds.
+
+Run with: python -m tests.bss_webhook_benchmark
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # type: ignore
+
+from config import settings
+from services.bss_webhook import post_webhooks
+
+NOTIFICATIONS = 500
+WEBHOOK_LATENCY = 0.02
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(WEBHOOK_LATENCY)
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def payload(n):
+    return {"reference_code": f"2997981125121013{n:07d}", "msisdn": f"6{n:08d}", "status": "ASOL"}
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/portout"
+
+    started = time.perf_counter()
+    for n in range(NOTIFICATIONS):
+        requests.post(url, data=json.dumps(payload(n)), headers=settings.get_headers_bss(),
+                      timeout=settings.APIGEE_API_QUERY_TIMEOUT)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = post_webhooks(url, ((n, payload(n)) for n in range(NOTIFICATIONS)))
+    concurrent = time.perf_counter() - started
+    server.shutdown()
+
+    assert len(results) == NOTIFICATIONS and all(result.ok for result in results)
+    assert [result.key for result in results] == list(range(NOTIFICATIONS))
+    print(f"{NOTIFICATIONS} webhooks, {WEBHOOK_LATENCY * 1000:.0f} ms per response")
+    print("-" * 60)
+    print(f"{'sequential requests.post':40} {sequential:10.2f} s")
+    print(f"{f'post_webhooks (concurrency {settings.BSS_WEBHOOK_CONCURRENCY})':40} {concurrent:10.2f} s")
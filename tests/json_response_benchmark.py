@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialising an /orders-search result, previous path vs FastJSONResponse.
+
+previous   dictionary cursor rows, isoformat() loop, SearchResponse validation,
+           jsonable_encoder, JSONResponse (json.dumps)
+fast       tuple cursor rows, rows_as_objects(), FastJSONResponse (orjson)
+
+Run with: python -m tests.json_response_benchmark
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.core.responses import FastJSONResponse, rows_as_objects
+from api.v1.orders import SearchResponse
+from services.database_service import PORTABILITY_REQUEST_FIELDS
+
+ROWS = 20000
+ROUNDS = 3
+
+
+def row(n):
+    created = datetime(2025, 10, 28, 10, 25, 3) + timedelta(minutes=n)
+    return (
+        n, "ESP", "PORT_IN", f"2997981125103010{n:07d}", f"SESSION_{n}",
+        "PROCESSING", "PENDING_RESPONSE", "0000 00000", "ASOL", "Solicitud en curso",
+        f"6{n:08d}", "NIF", f"{n:08d}Z", "Nombre Apellido", f"299-TRAC_{n}",
+        "798", "299", "2025-11-12",
+        created, created + timedelta(hours=1), None, created, created,
+    )
+
+
+def previous(rows):
+    results = [dict(zip(PORTABILITY_REQUEST_FIELDS, r)) for r in rows]  # cursor(dictionary=True)
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, datetime):
+                result[key] = value.isoformat()
+    content = {"total_records": len(results), "data": results}
+    validated = SearchResponse.model_validate(content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast(rows):
+    return FastJSONResponse({"total_records": len(rows), "data": rows_as_objects(PORTABILITY_REQUEST_FIELDS, rows)}).body
+
+
+def best_of(fn, rows):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        body = fn(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+if __name__ == "__main__":
+    rows = [row(n) for n in range(ROWS)]
+    previous_time, previous_body = best_of(previous, rows)
+    fast_time, fast_body = best_of(fast, rows)
+
+    assert json.loads(previous_body) == json.loads(fast_body)
+    print(f"{ROWS} rows, best of {ROUNDS}, {len(fast_body) / 1e6:.1f} MB of JSON")
+    print("-" * 60)
+    print(f"{'previous (isoformat + jsonable_encoder)':40} {previous_time * 1000:10.1f} ms")
+    print(f"{'FastJSONResponse (orjson)':40} {fast_time * 1000:10.1f} ms")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload archive size and lookup latency vs a plain payload.log scan.
+
+Run with: python -m tests.payload_archive_benchmark
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.payload_archive import PayloadArchive, extract_keys
+from services.payload_log import minify_payload
+from templates.soap_templates import CHECK_PORT_IN_STATUS_TEMPLATE
+
+EXCHANGES = 20000
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+RESPONSE = """<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>
+<ns2:respuestaConsultarProcesosPortabilidadMovil xmlns:ns2="http://nc.aopm.es/v1-10/portabilidad" xmlns="http://nc.aopm.es/v1-10">
+  <ns2:codigoRespuesta>0000 00000</ns2:codigoRespuesta>
+  <ns2:descripcion>La operación se ha realizado con éxito</ns2:descripcion>
+  <ns2:registro>
+    <ns2:codigoReferencia>{reference}</ns2:codigoReferencia>
+    <ns2:estado>ACON</ns2:estado>
+    <ns2:tipoProceso>ALTA_PORTABILIDAD_MOVIL</ns2:tipoProceso>
+    <ns2:MSISDN>{msisdn}</ns2:MSISDN>
+    <ns2:fechaVentanaCambio>2025-12-15T02:00:00+01:00</ns2:fechaVentanaCambio>
+    <ns2:fechaCreacion>2025-12-05T16:37:11.764+01:00</ns2:fechaCreacion>
+  </ns2:registro>
+</ns2:respuestaConsultarProcesosPortabilidadMovil></S:Body></S:Envelope>"""
+
+
+def request_payload(n):
+    body = CHECK_PORT_IN_STATUS_TEMPLATE.format(reference_code=f"2997981125121013{n:07d}", msisdn=f"6{n:08d}")
+    return body.encode("utf-8")
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as archive_dir:
+        archive = PayloadArchive(archive_dir, segment_bytes=SEGMENT_BYTES, retention_days=0)
+        log_path = os.path.join(archive_dir, "payload.log")
+
+        started = time.perf_counter()
+        with open(log_path, "wb") as log:
+            for n in range(EXCHANGES):
+                reference, msisdn = f"2997981125121013{n:07d}", f"6{n:08d}"
+                for direction, payload in (("REQUEST", request_payload(n)),
+                                           ("RESPONSE", RESPONSE.format(reference=reference, msisdn=msisdn).encode("utf-8"))):
+                    data = minify_payload(payload)
+                    log.write(b"NC_CHECK_STATUS_" + direction.encode() + b": " + data + b"\n")
+                    header = {"ts": time.time(), "service": "NC", "operation": "CHECK_STATUS",
+                              "direction": direction, "request_id": str(n)}
+                    archive.append(header, data, extract_keys(data, request_id=n))
+        archive.seal()
+        written = time.perf_counter() - started
+
+        log_size = os.path.getsize(log_path)
+        archive_size = directory_size(archive_dir) - log_size
+        print(f"{EXCHANGES * 2} payloads written in {written:.2f}s")
+        print("-" * 60)
+        print(f"{'payload.log (minified, uncompressed)':40} {log_size / 1e6:10.2f} MB")
+        print(f"{'archive (segments + indexes)':40} {archive_size / 1e6:10.2f} MB")
+        print(f"{'ratio':40} {log_size / archive_size:10.1f}x")
+
+        wanted = EXCHANGES - 17
+        reference = f"2997981125121013{wanted:07d}"
+
+        started = time.perf_counter()
+        pattern = re.compile(re.escape(reference.encode()))
+        with open(log_path, "rb") as log:
+            scanned = [line for line in log if pattern.search(line)]
+        scan = time.perf_counter() - started
+
+        reader = PayloadArchive(archive_dir, retention_days=0)
+        started = time.perf_counter()
+        found = reader.find("reference_code", reference)
+        lookup = time.perf_counter() - started
+        by_msisdn = reader.find("msisdn", f"6{wanted:08d}")
+        by_request = reader.find("request_id", wanted)
+
+        assert len(found) == len(scanned) == 2, (len(found), len(scanned))
+        assert [e["direction"] for e in found] == ["REQUEST", "RESPONSE"]
+        assert by_msisdn and by_request and reference in found[1]["payload"]
+        print()
+        print("Lookup of one reference code")
+        print("-" * 60)
+        print(f"{'payload.log scan':40} {scan * 1000:10.2f} ms")
+        print(f"{'archive index (mmap)':40} {lookup * 1000:10.2f} ms")
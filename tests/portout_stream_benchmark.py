@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tree-based port-out parser vs streaming PortOutNotificationStream on large pages.
+
+Run with: python -m tests.portout_stream_benchmark
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.portout_stream import PortOutNotificationStream
+from services.soap_services import parse_portout_response_001
+
+PAGE_SIZES = (10, 500, 5000)
+
+HEADER = (
+    "<?xml version='1.0' encoding='UTF-8'?>"
+    '<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Header/><S:Body>'
+    '<ns7:respuestaObtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar '
+    'xmlns:ns7="http://nc.aopm.es/v1-10/buzon" xmlns:ns14="http://nc.aopm.es/v1-10">'
+    "<ns14:codigoRespuesta>0000 00000</ns14:codigoRespuesta>"
+    "<ns14:descripcion>La operación se ha realizado con éxito</ns14:descripcion>"
+    "<ns14:codigoPeticionPaginada>b63653087d60ebca0afd81001dea65e4</ns14:codigoPeticionPaginada>"
+    "<ns14:totalRegistros>{total}</ns14:totalRegistros>"
+    "<ns14:ultimaPagina>true</ns14:ultimaPagina>"
+)
+
+NOTIFICATION = (
+    "<ns7:notificacion><ns14:fechaCreacion>2025-10-31T17:25:33.038+01:00</ns14:fechaCreacion>"
+    "<ns14:sincronizada>false</ns14:sincronizada><ns14:codigoNotificacion>{n}</ns14:codigoNotificacion>"
+    '<ns14:solicitud><ns14:fechaCreacion>2025-10-31T17:25:33.038+01:00</ns14:fechaCreacion>'
+    "<ns14:fechaEstado>2025-10-31T17:25:33.038+01:00</ns14:fechaEstado>"
+    "<ns14:codigoReferencia>7982991125103117{n:07d}</ns14:codigoReferencia>"
+    "<ns14:fechaMarcaLectura>2025-10-31T17:25:33.038+01:00</ns14:fechaMarcaLectura>"
+    "<ns14:estado>ASOL</ns14:estado><ns14:fechaLimiteCambioEstado>2025-11-03T14:00:00+01:00</ns14:fechaLimiteCambioEstado>"
+    "<ns14:fechaSolicitudPorAbonado>2025-10-31T00:00:00+01:00</ns14:fechaSolicitudPorAbonado>"
+    "<ns14:codigoOperadorDonante>299</ns14:codigoOperadorDonante>"
+    "<ns14:operadorDonanteAltaExtraordinaria>false</ns14:operadorDonanteAltaExtraordinaria>"
+    "<ns14:codigoOperadorReceptor>798</ns14:codigoOperadorReceptor>"
+    "<ns14:abonado><ns14:documentoIdentificacion><ns14:tipo>NIE</ns14:tipo><ns14:documento>Y3037876D</ns14:documento>"
+    "</ns14:documentoIdentificacion><ns14:datosPersonales><ns14:nombre>Oleg</ns14:nombre>"
+    "<ns14:primerApellido>Cabrerra</ns14:primerApellido><ns14:segundoApellido>Belousov</ns14:segundoApellido>"
+    "</ns14:datosPersonales></ns14:abonado><ns14:codigoContrato>798-TRAC_12</ns14:codigoContrato>"
+    "<ns14:NRNReceptor>704914</ns14:NRNReceptor><ns14:fechaVentanaCambio>2025-11-04T02:00:00+01:00</ns14:fechaVentanaCambio>"
+    "<ns14:fechaVentanaCambioPorAbonado>false</ns14:fechaVentanaCambioPorAbonado>"
+    "<ns14:rangoMSISDN><ns14:valorInicial>621800011</ns14:valorInicial><ns14:valorFinal>621800012</ns14:valorFinal></ns14:rangoMSISDN>"
+    "</ns14:solicitud></ns7:notificacion>"
+)
+
+FOOTER = "</ns7:respuestaObtenerNotificacionesAltaPortabilidadMovilComoDonantePendientesConfirmarRechazar></S:Body></S:Envelope>"
+
+
+def build_page(total):
+    body = "".join(NOTIFICATION.format(n=n) for n in range(total))
+    return (HEADER.format(total=total) + body + FOOTER).encode("utf-8")
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def tree_parse(content):
+    return len(parse_portout_response_001(content.decode("utf-8"))["requests"])
+
+
+def stream_parse(content):
+    # Records are consumed one by one, as insert_portout_records_to_db does per batch
+    count = 0
+    for _ in PortOutNotificationStream(content):
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    print(f"{'notifications':>13} {'parser':8} {'ms':>10} {'us/record':>10} {'peak KiB':>10}")
+    for total in PAGE_SIZES:
+        content = build_page(total)
+        for label, func in (("tree", tree_parse), ("stream", stream_parse)):
+            count, elapsed, peak = measure(lambda: func(content))
+            assert count == total
+            print(f"{total:>13} {label:8} {elapsed * 1000:>10.1f} {elapsed / total * 1e6:>10.1f} {peak / 1024:>10.0f}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: precompiled SoapEnvelope vs str.format templates vs ElementTree/minidom.
+
+SoapEnvelope is about on par with str.format + encode (measured 1.05-1.3x, within run-to-run
+noise), while str.format does not escape anything; the reason for SoapEnvelope is the escaping,
+not speed. It is about 30x faster than building the body with ElementTree + minidom.
+
+Run with: python -m tests.soap_envelope_benchmark
+"""
+import os
+import sys
+import timeit
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from templates.soap_templates import PORTABILITY_REQUEST_TEMPLATE, CONSULT_PROCESS_PORT_IN
+from services.soap_envelope import SoapEnvelope, xml_element
+from services.soap_services import json_to_soap_request
+
+ITERATIONS = 20000
+REPEAT = 5  # best of REPEAT runs, single runs vary by +-30 %
+
+PORT_IN_VALUES = {
+    "session_code": "1234567890",
+    "request_date": "2025-10-30",
+    "donor_operator": "299",
+    "recipient_operator": "798",
+    "document_type": "NIE",
+    "document_number": "Y3037876D",
+    "first_name": "José",
+    "first_surname": "Peña & Hijos",
+    "second_surname": "Núñez",
+    "nationality": "ESP",
+    "contract_code": "299-TRAC_12",
+    "nrn_receptor": "704914",
+    "fecha_ventana_optional": xml_element("por:fechaVentanaCambio", "2025-11-04"),
+    "iccid_optional": xml_element("por:ICCID", "8934071234567890123"),
+    "msisdn": "621800000",
+}
+
+STATUS_CHECK_VALUES = {"session_code": "1234567890", "msisdn": "621800000"}
+
+JSON_REQUEST = {
+    "codigoSesion": "1234567890",
+    "fechaSolicitudPorAbonado": "2025-10-30",
+    "codigoOperadorDonante": "299",
+    "codigoOperadorReceptor": "798",
+    "codigoContrato": "299-TRAC_12",
+    "NRNReceptor": "704914",
+    "fechaVentanaCambio": "2025-11-04",
+    "ICCID": "8934071234567890123",
+    "MSISDN": "621800000",
+    "abonado": {"documentoIdentificacion": {"tipo": "NIE", "documento": "Y3037876D"}},
+}
+
+
+def bench(label, func):
+    seconds = min(timeit.repeat(func, number=ITERATIONS, repeat=REPEAT))
+    print(f"{label:45} {seconds / ITERATIONS * 1e6:8.2f} us/call")
+    return seconds
+
+
+if __name__ == "__main__":
+    port_in_envelope = SoapEnvelope(PORTABILITY_REQUEST_TEMPLATE)
+    status_check_envelope = SoapEnvelope(CONSULT_PROCESS_PORT_IN)
+
+    print(f"SOAP envelope builders, {ITERATIONS} iterations, best of {REPEAT}")
+    print("-" * 66)
+    fmt = bench("port-in str.format + encode", lambda: PORTABILITY_REQUEST_TEMPLATE.format(**PORT_IN_VALUES).encode("utf-8"))
+    env = bench("port-in SoapEnvelope.render", lambda: port_in_envelope.render(**PORT_IN_VALUES))
+    etree = bench("port-in ElementTree + minidom", lambda: json_to_soap_request(JSON_REQUEST).encode("utf-8"))
+    print(f"{'speedup vs str.format':45} {fmt / env:8.2f}x")
+    print(f"{'speedup vs ElementTree + minidom':45} {etree / env:8.2f}x")
+    print("-" * 66)
+    fmt = bench("status check str.format + encode", lambda: CONSULT_PROCESS_PORT_IN.format(**STATUS_CHECK_VALUES).encode("utf-8"))
+    env = bench("status check SoapEnvelope.render", lambda: status_check_envelope.render(**STATUS_CHECK_VALUES))
+    print(f"{'speedup vs str.format':45} {fmt / env:8.2f}x")
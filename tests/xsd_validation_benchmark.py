@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MnpSchemaValidator (lxml) vs xmlschema.XMLSchema per worker boot.
+
+Run with: python -m tests.xsd_validation_benchmark
+"""
+import os
+import sys
+import timeit
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xmlschema  # type: ignore
+
+from config import settings
+from services.italy import xsd_validation
+from services.italy.xsd_validation import MnpSchemaValidator, validate_mnp_files
+
+ITERATIONS = 500
+BATCH_FILES = 40
+
+HEADER = """<?xml version="1.0" encoding="ISO-8859-1"?><LISTA_MNP_RECORD><FILENAME><MITTENTE>PMOB</MITTENTE><DATA>2025-10-20</DATA><ORA>12:00:55</ORA><DESTINATARIO>LMIT</DESTINATARIO><ID_FILE>99137</ID_FILE></FILENAME>"""
+RECORD = """<ATTIVAZIONE><TIPO_MESSAGGIO>1</TIPO_MESSAGGIO><CODICE_OPERATORE_RECIPIENT>PMOB</CODICE_OPERATORE_RECIPIENT><CODICE_OPERATORE_DONATING>LMIT</CODICE_OPERATORE_DONATING><CODICE_RICHIESTA_RECIPIENT>1-1ZSQ{n:04d}</CODICE_RICHIESTA_RECIPIENT><MSISDN>39350822{n:04d}</MSISDN><CODICE_FISCALE_PARTITA_IVA>KMRBAU95L02Z344U</CODICE_FISCALE_PARTITA_IVA><DATA_CUT_OVER>2025-10-22</DATA_CUT_OVER><NOME_CLIENTE>NICOLÒ</NOME_CLIENTE><COGNOME_CLIENTE>KAMARA</COGNOME_CLIENTE><IMSI>222337987134047</IMSI><FLAG_TRASFERIMENTO_CREDITO>Y</FLAG_TRASFERIMENTO_CREDITO><ROUTING_NUMBER>741</ROUTING_NUMBER><PREVALIDAZIONE>Y</PREVALIDAZIONE><FURTO>N</FURTO></ATTIVAZIONE>"""
+FOOTER = "</LISTA_MNP_RECORD>"
+
+
+def build_file(records):
+    text = HEADER + "".join(RECORD.format(n=n) for n in range(records)) + FOOTER
+    return text.encode("iso-8859-1")
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+if __name__ == "__main__":
+    single = build_file(1)
+    full = build_file(100)  # maxOccurs of a record list in mnp_schema.xsd
+
+    print("Schema load (worker boot)")
+    print("-" * 60)
+    seconds, reference = timed(lambda: xmlschema.XMLSchema(settings.MNP_SCHEMA_PATH))
+    print(f"{'xmlschema.XMLSchema build':40} {seconds * 1000:10.1f} ms")
+    seconds, validator = timed(MnpSchemaValidator)
+    print(f"{'MnpSchemaValidator (' + validator.backend + ')':40} {seconds * 1000:10.1f} ms")
+    lxml_etree, xsd_validation.lxml_etree = xsd_validation.lxml_etree, None
+    seconds, fallback = timed(MnpSchemaValidator)
+    xsd_validation.lxml_etree = lxml_etree
+    print(f"{'xmlschema fallback':40} {seconds * 1000:10.1f} ms")
+
+    print()
+    print(f"Validation, {ITERATIONS} iterations")
+    print("-" * 60)
+    for label, content in (("1 record", single), ("100 records", full)):
+        # Current path: decode, patch the declaration, pure-Python validation
+        text = content.decode("iso-8859-1").replace("ISO-8859-1", "UTF-8")
+        old = timeit.timeit(lambda: reference.is_valid(text), number=ITERATIONS // 10) / (ITERATIONS // 10)
+        new = timeit.timeit(lambda: validator.validate(content), number=ITERATIONS) / ITERATIONS
+        assert validator.validate(content) == (True, []) and fallback.validate(content)[0]
+        print(f"{label + ' xmlschema.is_valid':40} {old * 1e6:10.1f} us/file")
+        print(f"{label + ' MnpSchemaValidator.validate':40} {new * 1e6:10.1f} us/file")
+        print(f"{'speedup':40} {old / new:10.1f}x")
+
+    print()
+    print(f"Batch of {BATCH_FILES} x 100-record files")
+    print("-" * 60)
+    batch = [full] * BATCH_FILES
+    settings.MNP_XSD_POOL_THRESHOLD_BYTES = len(full) * 10
+    serial, _ = timed(lambda: validate_mnp_files(batch))
+    settings.MNP_XSD_POOL_THRESHOLD_BYTES = 0
+    validate_mnp_files(batch[:settings.MNP_XSD_POOL_WORKERS])  # start pool workers
+    pooled, results = timed(lambda: validate_mnp_files(batch))
+    assert all(ok for ok, _ in results)
+    xsd_validation.shutdown_validation_pool()
+    print(f"{'in-process':40} {serial * 1000:10.1f} ms")
+    print(f"{f'process pool ({settings.MNP_XSD_POOL_WORKERS} workers)':40} {pooled * 1000:10.1f} ms")